@@ -1,183 +1,119 @@
 import json
+import os
+import sys
 from typing import Dict, List
 from datetime import datetime
 
-class EventMatcher:
-    def __init__(self):
-        self.team_aliases = {
-            'manchester united': ['man united', 'man u'],
-            'manchester city': ['man city'],
-            'tottenham': ['spurs', 'tottenham hotspur'],
-            'chelsea': [],
-            'galatasaray': [],
-            'sporting': ['sporting lisbon'],
-        }
-    
-    def normalize_team_name(self, name: str) -> str:
-        if not name:
-            return ""
-        if '(' in name and ')' in name:
-            name = name.split('(')[0].strip()
-        name = name.lower().strip()
-        return name
-    
-    def find_team_canonical(self, norm: str) -> str:
-        if norm in self.team_aliases:
-            return norm
-        for canonical, aliases in self.team_aliases.items():
-            if norm in aliases:
-                return canonical
-        return norm
-    
-    def normalize_match(self, match: Dict) -> Dict:
-        home_norm = self.normalize_team_name(match.get('home_team', ''))
-        away_norm = self.normalize_team_name(match.get('away_team', ''))
-        home_can = self.find_team_canonical(home_norm)
-        away_can = self.find_team_canonical(away_norm)
-        teams_sorted = sorted([home_can, away_can])
-        sig = f"{teams_sorted[0]}_{teams_sorted[1]}"
-        return {'home_norm': home_norm, 'away_norm': away_norm, 'signature': sig, 'provider': match.get('provider'), 'odds': match.get('odds')}
-    
-    def match_events(self, data: Dict) -> Dict:
-        grouped = {}
-        for provider, matches in data.items():
-            for match in matches:
-                match['provider'] = provider
-                norm = self.normalize_match(match)
-                sig = norm['signature']
-                if sig not in grouped:
-                    grouped[sig] = {'providers': {}, 'match_info': {'home': norm['home_norm'], 'away': norm['away_norm']}}
-                grouped[sig]['providers'][provider] = norm
-        return grouped
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'worker'))
 
-
-class ArbitrageDetector:
-    def __init__(self, settings: Dict = None):
-        self.settings = settings or {
-            'min_percent': 5,
-            'max_percent': 120,
-            'minute_limit_ht': 35,
-            'minute_limit_ft': 75,
-            'market_filter': {'ft_hdp': True, 'ft_ou': True, 'ht_hdp': True, 'ht_ou': True},
-            'round_off': 5
-        }
-    
-    def parse_time_to_minutes(self, time_str: str) -> int:
-        if not time_str:
-            return 0
-        try:
-            parts = time_str.split()
-            if 'H' in time_str:
-                h = int(parts[0].replace('H', ''))
-                m = int(parts[1]) if len(parts) > 1 else 0
-                return h * 60 + m
-            return int(time_str)
-        except:
-            return 0
-    
-    def apply_time_filter(self, match_info: Dict) -> bool:
-        time_str = match_info.get('time', '')
-        minutes = self.parse_time_to_minutes(time_str)
-        is_ht = minutes < 45
-        limit = self.settings['minute_limit_ht'] if is_ht else self.settings['minute_limit_ft']
-        return minutes <= limit
-    
-    def calculate_margin(self, odds1: float, odds2: float) -> float:
-        if not odds1 or not odds2 or odds1 <= 0 or odds2 <= 0:
-            return None
-        try:
-            total_implied = (1 / odds1) + (1 / odds2)
-            margin = (total_implied - 1) * 100
-            return round(margin, 2)
-        except:
-            return None
-    
-    def check_market_filter(self, market: str) -> bool:
-        return self.settings['market_filter'].get(market, False)
-    
-    def detect_opportunities(self, grouped_matches: Dict) -> List[Dict]:
-        opportunities = []
-        for match_sig, event_data in grouped_matches.items():
-            providers = event_data['providers']
-            if len(providers) < 2:
-                continue
-            
-            match_info = event_data['match_info']
-            for market in ['ft_hdp', 'ft_ou', 'ht_hdp', 'ht_ou']:
-                if not self.check_market_filter(market):
-                    continue
-                
-                odds_by_provider = {}
-                for provider, match_data in providers.items():
-                    odds = match_data.get('odds', {}).get(market)
-                    if odds:
-                        odds_by_provider[provider] = odds
-                
-                if len(odds_by_provider) < 2:
-                    continue
-                
-                home_overs = []
-                away_unders = []
-                
-                for provider, odds in odds_by_provider.items():
-                    home_val = odds.get('home') or odds.get('over')
-                    away_val = odds.get('away') or odds.get('under')
-                    if home_val:
-                        home_overs.append({'value': home_val, 'provider': provider})
-                    if away_val:
-                        away_unders.append({'value': away_val, 'provider': provider})
-                
-                if not home_overs or not away_unders:
-                    continue
-                
-                home_overs.sort(key=lambda x: x['value'])
-                away_unders.sort(key=lambda x: x['value'], reverse=True)
-                
-                best_home = home_overs[0]
-                best_away = away_unders[0]
-                
-                margin = self.calculate_margin(best_home['value'], best_away['value'])
-                
-                if not margin or margin < self.settings['min_percent'] or margin > self.settings['max_percent']:
-                    continue
-                
-                opportunity = {
-                    'match_id': match_sig,
-                    'home': match_info.get('home', 'Unknown'),
-                    'away': match_info.get('away', 'Unknown'),
-                    'market': market,
-                    'margin': margin,
-                    'leg_1': {'provider': best_home['provider'], 'odds': best_home['value'], 'side': 'home/over'},
-                    'leg_2': {'provider': best_away['provider'], 'odds': best_away['value'], 'side': 'away/under'}
-                }
-                opportunities.append(opportunity)
-        
-        return opportunities
+from arbcore import ArbitrageDetector, EventIndex, EventMatcher, FuzzyEventMatcher
+from odds_protocol import OddsStateReceiver
 
 
 class BackendEngine:
     def __init__(self):
         self.event_matcher = EventMatcher()
+        # Fuzzy: nama tim beda antar provider ("Chelsea FC" vs "Chelsea") tetap jadi satu event
+        self.event_index = EventIndex(self.event_matcher, fuzzy=FuzzyEventMatcher(self.event_matcher))
         self.arb_detector = ArbitrageDetector()
+        self.receiver = OddsStateReceiver()  # state per provider dari message worker (ingest)
     
     def process_odds(self, odds_by_provider: Dict) -> Dict:
-        """Main flow: odds → matching → arbitrage"""
+        """
+        Main flow: odds → matching → arbitrage
+        odds_by_provider = {provider: [matches]} - full feed per provider yang ada di dict.
+        Provider yang tidak ada di dict tetap memakai data terakhirnya (lihat remove_provider).
+        Hanya event yang berubah sejak tick sebelumnya yang di-detect ulang.
+        """
         result = {
             'timestamp': datetime.now().isoformat(),
             'providers': len(odds_by_provider),
             'events_matched': 0,
+            'events_changed': 0,
             'opportunities_found': 0,
-            'opportunities': []
+            'opportunities': [],
+            'changes': []
         }
         
-        grouped = self.event_matcher.match_events(odds_by_provider)
-        result['events_matched'] = len(grouped)
+        for provider, matches in odds_by_provider.items():
+            self.event_index.sync_provider(provider, matches)
+        
+        changed, expired, providers = self.event_index.pop_changes()
+        result['changes'] = self.arb_detector.update_events(changed, expired, providers)
         
-        opportunities = self.arb_detector.detect_opportunities(grouped)
+        opportunities = self.arb_detector.get_open_opportunities()
+        result['events_matched'] = len(self.event_index.events)
+        result['events_changed'] = len(changed)
         result['opportunities_found'] = len(opportunities)
         result['opportunities'] = opportunities
         
         return result
     
+    def ingest(self, message: Dict) -> bool:
+        """
+        Apply satu message worker (odds_snapshot / odds_update / odds_delta) ke index, tanpa detect.
+        Message harus hasil decode frame (receiver memakai match-nya tanpa copy).
+        Delta hanya meng-upsert match yang berubah, snapshot di-diff dengan state sebelumnya.
+        Return False kalau delta ditolak (out-of-order / belum ada snapshot): odds provider
+        dibuang sampai worker resync.
+        """
+        provider = message['provider']
+        previous = self.receiver.matches.get(provider)
+        if not self.receiver.apply(message):
+            self.event_index.remove_provider(provider)
+            return False
+        
+        state = self.receiver.matches[provider]
+        if message.get('type') == 'odds_delta':
+            for changes in message.get('upserts', []):
+                self.event_index.upsert(provider, state[changes['match_id']])
+            for match_id in message.get('removed', []):
+                self.event_index.remove(provider, str(match_id))
+        elif previous is None:
+            self.event_index.sync_provider(provider, list(state.values()))
+        else:
+            # Snapshot periodik biasanya hampir sama dengan state: upsert yang beda saja
+            for match_id, match in state.items():
+                if previous.get(match_id) != match:
+                    self.event_index.upsert(provider, match)
+            for match_id in previous:
+                if match_id not in state:
+                    self.event_index.remove(provider, str(match_id))
+        return True
+    
+    def detect(self) -> List[Dict]:
+        """Detect ulang event yang berubah sejak detect/process_odds terakhir, return perubahan opportunity"""
+        return self.arb_detector.update_events(*self.event_index.pop_changes())
+    
+    def remove_provider(self, provider: str):
+        """Provider disconnect: event yang hanya berisi provider ini ikut expired"""
+        self.event_index.remove_provider(provider)
+        self.receiver.matches.pop(provider, None)
+        self.receiver.last_seq.pop(provider, None)
+    
     def update_settings(self, new_settings: Dict):
         self.arb_detector.settings.update(new_settings)
+        # Filter berubah -> semua event perlu di-detect ulang
+        self.event_index.mark_all_dirty()
+
+
+def test_time_filter():
+    """Regresi: event live C-Sport ("1H x" / "HT" / "2H x") tetap terdeteksi di engine"""
+    def feed(time_str):
+        return {
+            'nova': [{'match_id': 1, 'home_team': 'Chelsea (hotShot)', 'away_team': 'Tottenham (GianniKid)',
+                      'time': time_str, 'odds': {'ft_hdp': {'home': 1.85, 'away': 1.85}}}],
+            'saba': [{'match_id': 2, 'home_team': 'Chelsea', 'away_team': 'Tottenham',
+                      'time': time_str, 'odds': {'ft_hdp': {'home': 1.88, 'away': 1.88}}}]
+        }
+    
+    # (time C-Sport, jumlah opportunity): limit default HT 35 menit, FT 75 menit
+    cases = [('1H 3', 1), ('1H 20', 1), ('1H 35', 1), ('1H 40', 0), ('HT', 1), ('2H 10', 1), ('2H 30', 1), ('2H 31', 0)]
+    for time_str, expected in cases:
+        result = BackendEngine().process_odds(feed(time_str))
+        assert result['opportunities_found'] == expected, (time_str, result['opportunities_found'])
+        print(f"[✓] {time_str:>6}: {result['opportunities_found']} opportunity")
+
+
+if __name__ == '__main__':
+    test_time_filter()
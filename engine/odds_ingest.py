@@ -0,0 +1,381 @@
+"""
+Streaming ingest odds worker -> BackendEngine
+Worker (ws_transport.OddsTransport) connect via WebSocket: hello (negosiasi codec), lalu
+odds_snapshot / odds_delta / odds_update per provider. Setiap message langsung di-apply ke
+index (BackendEngine.ingest, hanya match yang berubah); detect jalan sekali per window sehingga
+update yang datang berdekatan dari banyak provider digabung jadi satu pass, dan perubahan
+opportunity di-publish ke subscriber (queue in-process, atau client WebSocket yang kirim
+{'type': 'subscribe'}).
+
+Delta yang ditolak (seq loncat / belum ada snapshot) dibalas {'type': 'resync'}.
+Provider yang putus lebih lama dari stale_after detik dihapus dari index.
+
+Latency ingest -> opportunity = frame diterima sampai detect selesai (p50/p95/p99).
+
+Usage:
+    python odds_ingest.py serve [port]
+    python odds_ingest.py bench [providers] [seconds]
+"""
+
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional
+
+# backend_engine menambahkan ../worker ke sys.path (arbcore, odds_protocol, utils.codec)
+from backend_engine import BackendEngine
+from utils.codec import JsonCodec, negotiate
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+ODDS_TYPES = ('odds_snapshot', 'odds_delta', 'odds_update')
+
+
+class OddsIngest:
+    """Apply message ke BackendEngine, detect per window, publish perubahan opportunity"""
+
+    def __init__(self, engine: BackendEngine = None, window_ms: float = 10, subscriber_queue: int = 1000):
+        """
+        window_ms: lama mengumpulkan update sebelum detect (trade-off latency vs kerja per update)
+        subscriber_queue: kapasitas queue per subscriber, yang lambat kehilangan event terlama
+        """
+        self.engine = engine or BackendEngine()
+        self.window = window_ms / 1000
+        self.subscriber_queue = subscriber_queue
+
+        self._arrivals = []  # perf_counter message yang belum di-detect
+        self._pending = asyncio.Event()
+        self._subscribers = set()
+        self._task: Optional[asyncio.Task] = None
+        self.latencies = deque(maxlen=10000)  # ingest -> opportunity (ms)
+        self.stats = {'messages': 0, 'rejected': 0, 'detect_runs': 0, 'changes': 0, 'dropped': 0}
+
+    async def start(self):
+        self._task = asyncio.create_task(self._detect_loop())
+
+    def submit(self, message: Dict, received_at: float = None) -> bool:
+        """Apply satu message provider; False = delta ditolak, worker harus kirim snapshot"""
+        accepted = self.engine.ingest(message)
+        self.stats['messages'] += 1
+        if not accepted:
+            self.stats['rejected'] += 1
+        # Delta ditolak juga mengubah index (odds provider dibuang) -> tetap detect
+        self._mark(received_at)
+        return accepted
+
+    def remove_provider(self, provider: str):
+        self.engine.remove_provider(provider)
+        self._mark()
+
+    def _mark(self, received_at: float = None):
+        self._arrivals.append(received_at or time.perf_counter())
+        self._pending.set()
+
+    async def _detect_loop(self):
+        while True:
+            await self._pending.wait()
+            await asyncio.sleep(self.window)
+            self._pending.clear()
+            arrivals, self._arrivals = self._arrivals, []
+
+            changes = self.engine.detect()
+            done = time.perf_counter()
+            self.latencies.extend((done - received_at) * 1000 for received_at in arrivals)
+            self.stats['detect_runs'] += 1
+            self.stats['changes'] += len(changes)
+            if changes:
+                self._publish({'type': 'opportunities', 'timestamp': int(time.time() * 1000), 'changes': changes})
+
+    def subscribe(self) -> asyncio.Queue:
+        """Queue event {'type': 'opportunities', 'changes': [...]} (opened / updated / closed)"""
+        queue = asyncio.Queue(maxsize=self.subscriber_queue)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def _publish(self, event: Dict):
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+                self.stats['dropped'] += 1
+            queue.put_nowait(event)
+
+    def latency_summary(self) -> Dict[str, float]:
+        """p50/p95/p99/max latency ingest -> opportunity (ms)"""
+        if not self.latencies:
+            return {}
+        ordered = sorted(self.latencies)
+        pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+        return {'p50': pick(0.50), 'p95': pick(0.95), 'p99': pick(0.99), 'max': ordered[-1]}
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+class Connection:
+    """State satu koneksi worker: codec hasil negosiasi + provider"""
+
+    __slots__ = ('send', 'codec', 'provider')
+
+    def __init__(self, send: Callable[[object], Awaitable]):
+        self.send = send
+        self.codec = JsonCodec()
+        self.provider = None
+
+
+class OddsIngestServer:
+    """WebSocket server untuk OddsTransport worker (dan subscriber opportunity)"""
+
+    def __init__(self, ingest: OddsIngest, host: str = '0.0.0.0', port: int = 8000,
+                 stale_after: float = 30.0, max_size: int = 64 * 1024 * 1024):
+        """
+        stale_after: provider tanpa koneksi selama ini (detik) dihapus dari index
+        max_size: batas ukuran frame (snapshot ribuan match bisa beberapa MB)
+        """
+        self.ingest = ingest
+        self.host = host
+        self.port = port
+        self.stale_after = stale_after
+        self.max_size = max_size
+        self.connections: Dict[str, int] = {}  # provider -> jumlah koneksi aktif
+        self._server = None
+
+    async def start(self):
+        if websockets is None:
+            raise RuntimeError("websockets is required for OddsIngestServer (pip install websockets)")
+        await self.ingest.start()
+        self._server = await websockets.serve(self._handler, self.host, self.port, max_size=self.max_size)
+        self.port = self._server.sockets[0].getsockname()[1]
+        print(f"[✓] Odds ingest listening on ws://{self.host}:{self.port}")
+
+    async def handle_frame(self, conn: Connection, raw) -> Optional[str]:
+        """Proses satu frame dari worker, return type message (None kalau tidak bisa di-decode)"""
+        received_at = time.perf_counter()
+        try:
+            message = conn.codec.loads(raw)
+        except Exception:
+            return None
+        msg_type = message.get('type')
+
+        if msg_type == 'hello':
+            # hello_ack selalu json, frame sesudahnya pakai codec terpilih
+            codec = negotiate(message.get('codecs'))
+            await conn.send(json.dumps({'type': 'hello_ack', 'codec': codec.name}))
+            conn.codec = codec
+            self._attach(conn, message.get('provider'))
+        elif msg_type in ODDS_TYPES:
+            self._attach(conn, message['provider'])
+            if not self.ingest.submit(message, received_at):
+                await conn.send(conn.codec.dumps({'type': 'resync', 'provider': message['provider']}))
+        return msg_type
+
+    def _attach(self, conn: Connection, provider: Optional[str]):
+        if provider and conn.provider is None:
+            conn.provider = provider
+            self.connections[provider] = self.connections.get(provider, 0) + 1
+
+    def _detach(self, conn: Connection):
+        provider = conn.provider
+        if provider is None:
+            return
+        self.connections[provider] -= 1
+        if self.connections[provider] <= 0:
+            asyncio.get_running_loop().call_later(self.stale_after, self._expire, provider)
+
+    def _expire(self, provider: str):
+        if self.connections.get(provider, 0) <= 0:
+            self.connections.pop(provider, None)
+            self.ingest.remove_provider(provider)
+            print(f"[!] Provider {provider} disconnected > {self.stale_after}s - removed from index")
+
+    async def _handler(self, ws, path: str = None):
+        conn = Connection(ws.send)
+        try:
+            async for raw in ws:
+                if await self.handle_frame(conn, raw) == 'subscribe':
+                    await self._serve_subscriber(conn)
+                    return
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self._detach(conn)
+
+    async def _serve_subscriber(self, conn: Connection):
+        """Kirim opportunity yang sedang open, lalu stream perubahan"""
+        queue = self.ingest.subscribe()
+        try:
+            await conn.send(conn.codec.dumps({
+                'type': 'opportunities_snapshot',
+                'opportunities': self.ingest.engine.arb_detector.get_open_opportunities()
+            }))
+            while True:
+                await conn.send(conn.codec.dumps(await queue.get()))
+        finally:
+            self.ingest.unsubscribe(queue)
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        await self.ingest.close()
+
+
+def make_matches(provider_index: int, events: int, rng: random.Random) -> list:
+    """Match sintetis: semua provider meliput event yang sama (nama tim sama, match_id beda)"""
+    return [{
+        'match_id': f"{provider_index}-{i}",
+        'league': 'BENCH LEAGUE',
+        'home_team': f"Home {i}",
+        'away_team': f"Away {i}",
+        'time': '1H 10',
+        'odds': {
+            'ft_hdp': {'home': round(rng.uniform(1.7, 2.05), 2), 'away': round(rng.uniform(1.7, 2.05), 2)},
+            'ft_ou': {'over': round(rng.uniform(1.7, 2.05), 2), 'under': round(rng.uniform(1.7, 2.05), 2)}
+        }
+    } for i in range(events)]
+
+
+async def run_provider(provider_index: int, send: Callable[[Dict], Awaitable], streaming: 'BenchClock',
+                       events: int = 300, interval: float = 0.1, changes: int = 20):
+    """Satu provider: snapshot, tunggu semua provider siap, lalu odds_delta (changes match) tiap ~interval detik"""
+    rng = random.Random(provider_index)
+    provider = f"bench-{provider_index}"
+    matches = make_matches(provider_index, events, rng)
+    seq = 1
+    await send({'type': 'odds_snapshot', 'provider': provider, 'seq': seq, 'timestamp': int(time.time()),
+                'total_matches': len(matches), 'matches': matches})
+
+    stop_at = await streaming.wait()
+    while time.monotonic() < stop_at:
+        await asyncio.sleep(interval * rng.uniform(0.5, 1.5))
+        seq += 1
+        upserts = []
+        for match in rng.sample(matches, changes):
+            odds = {'ft_hdp': {'home': round(rng.uniform(1.7, 2.05), 2)}}
+            match['odds']['ft_hdp'].update(odds['ft_hdp'])
+            upserts.append({'match_id': match['match_id'], 'odds': odds})
+        await send({'type': 'odds_delta', 'provider': provider, 'seq': seq, 'timestamp': int(time.time()),
+                    'total_matches': len(matches), 'upserts': upserts, 'removed': []})
+
+
+class BenchClock:
+    """Fase streaming bench: mulai setelah semua snapshot awal di-ingest, berhenti setelah seconds"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.stop_at = None
+        self._started = asyncio.Event()
+
+    def start(self):
+        self.stop_at = time.monotonic() + self.seconds
+        self._started.set()
+
+    async def wait(self) -> float:
+        await self._started.wait()
+        return self.stop_at
+
+
+async def bench(providers: int = 60, seconds: float = 10.0, interval: float = 0.1):
+    """
+    Load test: N provider konkuren, masing-masing snapshot lalu delta tiap ~interval detik.
+    Pakai WebSocket lokal kalau websockets ter-install, selain itu frame langsung ke handle_frame
+    (tanpa network, decode + ingest + detect tetap dihitung).
+    Snapshot awal (connect + index kosong) diukur terpisah; throughput dan latency = fase streaming.
+    """
+    ingest = OddsIngest()
+    server = OddsIngestServer(ingest, host='127.0.0.1', port=0)
+    subscriber = ingest.subscribe()
+    streaming = BenchClock(seconds)
+    codec = negotiate(['msgpack', 'orjson', 'json'])
+
+    if websockets is not None:
+        await server.start()
+        mode = f"websocket ({codec.name})"
+
+        async def provider_task(index):
+            async with websockets.connect(f"ws://127.0.0.1:{server.port}", max_size=None) as ws:
+                await ws.send(json.dumps({'type': 'hello', 'codecs': [codec.name], 'provider': f"bench-{index}"}))
+                await ws.recv()
+                await run_provider(index, lambda message: ws.send(codec.dumps(message)), streaming,
+                                   interval=interval)
+    else:
+        await ingest.start()
+        mode = f"in-process, websockets not installed ({codec.name})"
+
+        async def provider_task(index):
+            async def reply(payload):
+                pass
+            conn = Connection(reply)
+            conn.codec = codec
+            await run_provider(index, lambda message: server.handle_frame(conn, codec.dumps(message)), streaming,
+                               interval=interval)
+
+    async def start_streaming():
+        started = time.perf_counter()
+        while ingest.stats['messages'] < providers or ingest._arrivals:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(ingest.window * 2)
+        warmup = (time.perf_counter() - started, ingest.latency_summary().get('max', 0.0))
+        ingest.latencies.clear()
+        snapshots = ingest.stats['messages']
+        streaming.start()
+        return warmup, snapshots
+
+    tasks = [asyncio.create_task(provider_task(i)) for i in range(providers)]
+    (warmup, warmup_max), snapshots = await start_streaming()
+    await asyncio.gather(*tasks)
+    await asyncio.sleep(ingest.window * 2)
+
+    published = subscriber.qsize()
+    open_count = len(ingest.engine.arb_detector.get_open_opportunities())
+    await server.close()
+
+    streamed = ingest.stats['messages'] - snapshots
+    print(f"{providers} providers x {seconds:.0f}s, mode {mode}")
+    print(f"  initial snapshots: {snapshots} in {warmup * 1000:.0f} ms (max latency {warmup_max:.0f} ms)")
+    print(f"  messages: {streamed} ({streamed / seconds:,.0f}/s, offered ~{providers / interval:,.0f}/s), "
+          f"rejected: {ingest.stats['rejected']}")
+    print(f"  detect runs: {ingest.stats['detect_runs']}, opportunity changes: {ingest.stats['changes']} "
+          f"({published} events published, {open_count} open)")
+    summary = ingest.latency_summary()
+    print("  ingest -> opportunity (ms): " + ", ".join(f"{k} {v:.2f}" for k, v in summary.items()))
+
+
+async def serve(port: int):
+    server = OddsIngestServer(OddsIngest(), port=port)
+    await server.start()
+    try:
+        while True:
+            await asyncio.sleep(30)
+            print(f"[INGEST] {server.ingest.stats} latency {server.ingest.latency_summary()}")
+    finally:
+        await server.close()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] not in ('serve', 'bench'):
+        print("Usage:")
+        print("  python odds_ingest.py serve [port]")
+        print("  python odds_ingest.py bench [providers] [seconds]")
+        sys.exit(1)
+
+    if sys.argv[1] == 'serve':
+        asyncio.run(serve(int(sys.argv[2]) if len(sys.argv) > 2 else 8000))
+    else:
+        asyncio.run(bench(int(sys.argv[2]) if len(sys.argv) > 2 else 60,
+                          float(sys.argv[3]) if len(sys.argv) > 3 else 10.0))
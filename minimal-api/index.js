@@ -236,38 +236,40 @@ app.post('/api/scan/start', async (req, res) => {
 });
 
 // Worker result handler
+async function handleWorkerResult(type, data) {
+  if (type === 'login_success') {
+    await pool.query(
+      'UPDATE accounts SET status = $1, balance = $2, updated_at = CURRENT_TIMESTAMP WHERE id = $3',
+      ['online', data.balance || 0, data.accountId]
+    );
+    broadcast('login', { accountId: data.accountId, status: 'online', balance: data.balance });
+  } else if (type === 'login_failed') {
+    await pool.query(
+      'UPDATE accounts SET status = $1, updated_at = CURRENT_TIMESTAMP WHERE id = $2',
+      ['offline', data.accountId]
+    );
+    broadcast('login', { accountId: data.accountId, status: 'offline' });
+  } else if (type === 'scan_result') {
+    broadcast('scan', data);
+  } else if (type === 'bet_executed') {
+    await pool.query(
+      'UPDATE bets SET status = $1 WHERE id = $2',
+      ['accepted', data.betId]
+    );
+    broadcast('bet_executed', data);
+  } else if (type === 'bet_failed') {
+    await pool.query(
+      'UPDATE bets SET status = $1 WHERE id = $2',
+      ['failed', data.betId]
+    );
+    broadcast('bet_failed', data);
+  }
+}
+
 app.post('/api/worker/result', async (req, res) => {
   try {
     const { type, data } = req.body;
-    
-    if (type === 'login_success') {
-      await pool.query(
-        'UPDATE accounts SET status = $1, balance = $2, updated_at = CURRENT_TIMESTAMP WHERE id = $3',
-        ['online', data.balance || 0, data.accountId]
-      );
-      broadcast('login', { accountId: data.accountId, status: 'online', balance: data.balance });
-    } else if (type === 'login_failed') {
-      await pool.query(
-        'UPDATE accounts SET status = $1, updated_at = CURRENT_TIMESTAMP WHERE id = $2',
-        ['offline', data.accountId]
-      );
-      broadcast('login', { accountId: data.accountId, status: 'offline' });
-    } else if (type === 'scan_result') {
-      broadcast('scan', data);
-    } else if (type === 'bet_executed') {
-      await pool.query(
-        'UPDATE bets SET status = $1 WHERE id = $2',
-        ['accepted', data.betId]
-      );
-      broadcast('bet_executed', data);
-    } else if (type === 'bet_failed') {
-      await pool.query(
-        'UPDATE bets SET status = $1 WHERE id = $2',
-        ['failed', data.betId]
-      );
-      broadcast('bet_failed', data);
-    }
-    
+    await handleWorkerResult(type, data);
     res.json({ success: true });
   } catch (error) {
     console.error('Worker result error:', error);
@@ -275,6 +277,22 @@ app.post('/api/worker/result', async (req, res) => {
   }
 });
 
+// Batched worker results (in order); on error `processed` tells the worker where to resume
+app.post('/api/worker/results', async (req, res) => {
+  const results = req.body.results || [];
+  let processed = 0;
+  try {
+    for (const { type, data } of results) {
+      await handleWorkerResult(type, data);
+      processed++;
+    }
+    res.json({ success: true, processed });
+  } catch (error) {
+    console.error('Worker results error:', error);
+    res.status(500).json({ error: error.message, processed });
+  }
+});
+
 // HTTP Server
 const PORT = process.env.PORT || 3001;
 const server = app.listen(PORT, () => {
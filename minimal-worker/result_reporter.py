@@ -0,0 +1,331 @@
+"""
+Async result reporter: kirim hasil job ke API tanpa pernah block event loop
+report() cuma enqueue (non-blocking); task background mengumpulkan hasil selama
+beberapa ms jadi satu POST /api/worker/results lewat aiohttp session (keep-alive),
+retry dengan backoff, dan spill ke file JSONL kalau API down / queue penuh.
+Spill di-replay otomatis begitu API bisa dihubungi lagi. Semua I/O file spill jalan di
+thread (asyncio.to_thread), satu per satu lewat lock, jadi disk lambat tidak menahan event loop.
+
+Benchmark event-loop stall (requests.post sync vs reporter) terhadap stub API lokal
+(butuh requests, tidak ada di requirements.txt: pip install requests):
+    python result_reporter.py bench [jumlah_result]
+"""
+
+import asyncio
+import json
+import os
+import time
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class ResultReporter:
+    def __init__(self, api_url, max_queue=10000, batch_size=50, linger_ms=5,
+                 spill_path='result_spill.jsonl', max_retries=3, retry_base=0.5, timeout=5):
+        self.url = f'{api_url}/api/worker/results'
+        self.batch_size = batch_size
+        self.linger = linger_ms / 1000
+        self.spill_path = spill_path
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.timeout = timeout
+
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.stats = {'sent': 0, 'batches': 0, 'retries': 0, 'spilled': 0, 'replayed': 0}
+        self._client = None
+        self._task = None
+        self._inflight = None  # batch yang sedang di-POST (di-spill kalau close() memotongnya)
+        self._overflow = []    # result dari report() saat queue penuh, menunggu di-spill
+        self._overflow_task = None
+        self._file_lock = asyncio.Lock()  # operasi file spill (di thread) tidak boleh overlap
+        self._has_spill = False  # spill file ada (dicek sekali saat start, lalu dilacak di memory)
+
+    async def start(self):
+        if aiohttp is None:
+            raise RuntimeError('aiohttp is required for ResultReporter (pip install aiohttp)')
+        # Replay yang terpotong (crash/restart) dikembalikan ke spill file
+        await self._file_op(self._restore_replay)
+        self._has_spill = await self._file_op(os.path.exists, self.spill_path)
+        self._client = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=4, keepalive_timeout=60),
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+        self._task = asyncio.create_task(self._run())
+
+    def report(self, type_name, data):
+        """Enqueue satu result (tidak pernah block); queue penuh -> di-spill ke disk di background"""
+        item = {'type': type_name, 'data': data, 'ts': int(time.time() * 1000)}
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self._overflow.append(item)
+            if self._overflow_task is None or self._overflow_task.done():
+                self._overflow_task = asyncio.create_task(self._spill_overflow())
+
+    async def _spill_overflow(self):
+        while self._overflow:
+            batch, self._overflow = self._overflow, []
+            await self._spill(batch)
+
+    async def _file_op(self, func, *args):
+        """Jalankan I/O file spill di thread, serial (append / prepend / replay tidak saling potong)"""
+        async with self._file_lock:
+            op = asyncio.ensure_future(asyncio.to_thread(func, *args))
+            try:
+                return await asyncio.shield(op)
+            except asyncio.CancelledError:
+                # Thread tetap jalan sampai selesai: lock baru dilepas sesudahnya
+                await asyncio.wait([op])
+                raise
+
+    async def _next_batch(self):
+        """Tunggu result pertama, lalu kumpulkan sampai batch_size atau linger habis"""
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.linger
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = self._inflight = await self._next_batch()
+            # Spill (result lebih lama) dikirim dulu supaya urutan ke API tetap terjaga;
+            # selama spill belum habis, batch baru ikut di-spill di belakangnya
+            if self._has_spill and not await self._replay_spill():
+                unsent = batch
+            else:
+                unsent = await self._send(batch)
+            self._inflight = None
+            if unsent:
+                await self._spill(unsent)
+
+    async def _post(self, batch):
+        """Satu POST; return jumlah result (dari depan) yang sudah diproses API"""
+        async with self._client.post(self.url, json={'results': batch}) as response:
+            if response.status < 300:
+                return len(batch)
+            try:
+                body = await response.json(content_type=None)
+                return int(body.get('processed', 0))
+            except Exception:
+                return 0
+
+    async def _send(self, batch):
+        """POST batch dengan retry + exponential backoff; return result yang tetap gagal terkirim"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                processed = await self._post(batch)
+            except Exception as e:
+                processed = 0
+                print(f'[REPORTER] Send failed ({len(batch)} results): {e}')
+            # Result yang sudah diproses tidak dikirim ulang
+            self.stats['sent'] += processed
+            batch = batch[processed:]
+            if not batch:
+                self.stats['batches'] += 1
+                return []
+            if attempt < self.max_retries:
+                self.stats['retries'] += 1
+                await asyncio.sleep(self.retry_base * (2 ** attempt))
+        return batch
+
+    async def _spill(self, batch):
+        try:
+            await self._file_op(self._append_spill, batch)
+            self._has_spill = True
+            self.stats['spilled'] += len(batch)
+            print(f'[REPORTER] API unreachable, spilled {len(batch)} results to {self.spill_path}')
+        except OSError as e:
+            print(f'[REPORTER] Spill failed, dropping {len(batch)} results: {e}')
+
+    def _append_spill(self, batch):
+        with open(self.spill_path, 'a') as f:
+            f.write(''.join(json.dumps(item, separators=(',', ':')) + '\n' for item in batch))
+
+    def _prepend_spill(self, text):
+        """Taruh text di depan spill file (result yang di-spill selama replay tetap di belakang)"""
+        rest = ''
+        if os.path.exists(self.spill_path):
+            with open(self.spill_path) as f:
+                rest = f.read()
+        with open(self.spill_path, 'w') as f:
+            f.write(text + rest)
+
+    def _restore_replay(self):
+        replay_path = f'{self.spill_path}.replay'
+        if os.path.exists(replay_path):
+            with open(replay_path) as f:
+                self._prepend_spill(f.read())
+            os.remove(replay_path)
+
+    def _take_spill(self):
+        """Pindahkan spill file ke .replay (spill baru masuk file baru), return isinya (None = tidak ada)"""
+        replay_path = f'{self.spill_path}.replay'
+        if not os.path.exists(self.spill_path):
+            return None
+        os.replace(self.spill_path, replay_path)
+        with open(replay_path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def _finish_replay(self, rest):
+        """Selesai replay: yang belum terkirim (rest) kembali ke depan spill file"""
+        if rest:
+            self._prepend_spill(''.join(json.dumps(item, separators=(',', ':')) + '\n' for item in rest))
+        os.remove(f'{self.spill_path}.replay')
+        return os.path.exists(self.spill_path)
+
+    async def _replay_spill(self):
+        """Kirim ulang isi spill file (urut) setelah API kembali; return True kalau habis terkirim"""
+        self._has_spill = False
+        items = await self._file_op(self._take_spill)
+        if items is None:
+            return True
+        rest = []
+        for i in range(0, len(items), self.batch_size):
+            batch = items[i:i + self.batch_size]
+            unsent = await self._send(batch)
+            if unsent:
+                rest = unsent + items[i + self.batch_size:]
+                break
+            self.stats['replayed'] += len(batch)
+        # Spill yang masuk selama replay (report() saat queue penuh) tetap di belakang
+        self._has_spill = await self._file_op(self._finish_replay, rest) or self._has_spill
+        return not rest
+
+    async def close(self, timeout=5):
+        """Flush queue (maks timeout detik), sisanya di-spill"""
+        if self._task is not None:
+            deadline = time.monotonic() + timeout
+            while (not self.queue.empty() or self._inflight) and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._overflow_task is not None:
+            await self._overflow_task
+            self._overflow_task = None
+        # Replay yang terpotong close() tetap di depan result yang belum terkirim
+        await self._file_op(self._restore_replay)
+
+        leftover = list(self._inflight or [])
+        self._inflight = None
+        while not self.queue.empty():
+            leftover.append(self.queue.get_nowait())
+        leftover.extend(self._overflow)
+        self._overflow = []
+        if leftover:
+            await self._spill(leftover)
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+def start_stub_api(delay_ms=20):
+    """Stub API lokal (stdlib) dengan latency tetap per request, return (server, url)"""
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            time.sleep(delay_ms / 1000)
+            body = b'{"success":true}'
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+async def _measure_stall(report_all):
+    """Max lag event loop (ms) dari ticker 1ms selama report_all() jalan"""
+    max_lag = 0.0
+    running = True
+
+    async def ticker():
+        nonlocal max_lag
+        while running:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            max_lag = max(max_lag, (time.perf_counter() - start - 0.001) * 1000)
+
+    tick_task = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await report_all()
+    elapsed = (time.perf_counter() - start) * 1000
+    running = False
+    await tick_task
+    return elapsed, max_lag
+
+
+async def bench(count=200):
+    try:
+        import requests
+    except ImportError:
+        print('[!] bench needs requests for the sync baseline (pip install requests)')
+        return
+
+    server, api_url = start_stub_api()
+    data = {'accountId': 1, 'balance': 1000.0}
+
+    async def sync_posts():
+        # Cara lama: requests.post per result, dipanggil langsung dari coroutine
+        for _ in range(count):
+            requests.post(f'{api_url}/api/worker/result', json={'type': 'scan_result', 'data': data}, timeout=5)
+            await asyncio.sleep(0)
+
+    reporter = ResultReporter(api_url, spill_path='/tmp/result_reporter_bench.jsonl')
+    await reporter.start()
+
+    async def async_reports():
+        for _ in range(count):
+            reporter.report('scan_result', data)
+            await asyncio.sleep(0)
+
+    sync_ms, sync_lag = await _measure_stall(sync_posts)
+    async_ms, async_lag = await _measure_stall(async_reports)
+    flush_start = time.perf_counter()
+    await reporter.close(timeout=30)
+    flush_ms = (time.perf_counter() - flush_start) * 1000
+    server.shutdown()
+
+    print(f'{count} results, stub API latency 20ms')
+    print(f'  requests.post : {sync_ms:8.1f} ms in job code, max loop stall {sync_lag:7.1f} ms')
+    print(f'  ResultReporter: {async_ms:8.1f} ms in job code, max loop stall {async_lag:7.1f} ms '
+          f'(delivered in {reporter.stats["batches"]} POSTs, flush {flush_ms:.0f} ms)')
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) < 2 or sys.argv[1] != 'bench':
+        print('Usage:')
+        print('  python result_reporter.py bench [count]')
+        sys.exit(1)
+    asyncio.run(bench(int(sys.argv[2]) if len(sys.argv) > 2 else 200))
@@ -2,25 +2,62 @@ import asyncio
 import json
 import os
 import random
+import signal
+import socket
+import sys
 import time
 from datetime import datetime
 from playwright.async_api import async_playwright
 import redis.asyncio as aioredis
-import requests
+from result_reporter import ResultReporter
+
+# Modul bersama dengan worker/ (di image, worker/utils disalin ke ./utils)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'worker'))
+
+from utils.browser_pool import BrowserPool
+from utils.reliable_queue import ReliableQueue
 
 API_URL = os.getenv('API_URL', 'http://api:3001')
 REDIS_URL = os.getenv('REDIS_URL', 'redis://redis:6379')
+WORKER_ID = os.getenv('WORKER_ID') or socket.gethostname()
+
+# reliable = job dipindah ke processing list dan baru dihapus setelah selesai; simple = BLPOP biasa
+QUEUE_MODE = os.getenv('QUEUE_MODE', 'reliable')
+VISIBILITY_TIMEOUT = float(os.getenv('QUEUE_VISIBILITY_TIMEOUT', '60'))
+# Job yang masih jalan lebih lama dari ini (detik) di worker hidup dianggap hang -> di-requeue
+MAX_RUNTIME = float(os.getenv('QUEUE_MAX_RUNTIME', '600'))
 
-# Browser sessions (account_id -> browser context)
+# Logged-in accounts (account_id -> login info); page/context ada di browser_pool
 sessions = {}
 
+# Browser + warm page per account, dibuat di process_queue
+browser_pool = None
+BROWSERS = int(os.getenv('BROWSERS', '1'))
+MAX_CONTEXTS = int(os.getenv('MAX_CONTEXTS', '16'))
+
+# Batas atas (ms) untuk wait berbasis kondisi di login
+GOTO_TIMEOUT_MS = int(os.getenv('LOGIN_GOTO_TIMEOUT_MS', '30000'))
+CHALLENGE_TIMEOUT_MS = int(os.getenv('LOGIN_CHALLENGE_TIMEOUT_MS', '15000'))
+LOGIN_TIMEOUT_MS = int(os.getenv('LOGIN_TIMEOUT_MS', '20000'))
+# Elemen yang hanya ada setelah login sukses (mis. '#balance'); job bisa override lewat 'successSelector'
+LOGIN_SUCCESS_SELECTOR = os.getenv('LOGIN_SUCCESS_SELECTOR', '')
+
+# True kalau halaman bukan (lagi) Cloudflare challenge
+CHALLENGE_CLEARED_JS = """() => !document.title.includes('Just a moment')
+    && !document.querySelector('#challenge-form, #cf-challenge-running, #challenge-running')"""
+
+
+# Result ke API: di-batch per beberapa ms, retry, spill ke disk kalau API down (started di process_queue)
+reporter = ResultReporter(
+    API_URL,
+    linger_ms=float(os.getenv('RESULT_LINGER_MS', '5')),
+    spill_path=os.getenv('RESULT_SPILL_PATH', 'result_spill.jsonl')
+)
+
 
 def send_result(type_name, data):
-    """Send result to API backend"""
-    try:
-        requests.post(f'{API_URL}/api/worker/result', json={'type': type_name, 'data': data}, timeout=5)
-    except Exception as e:
-        print(f'Error sending result: {e}')
+    """Send result to API backend (non-blocking, cuma enqueue)"""
+    reporter.report(type_name, data)
 
 
 def round_stake(stake):
@@ -37,62 +74,73 @@ async def login_worker(job_data):
     
     print(f'[LOGIN] Account {account_id}: Starting login to {url}')
     
+    started = time.perf_counter()
+    timings = {}  # step -> ms sejak mulai
+    
+    def mark(step):
+        timings[step] = int((time.perf_counter() - started) * 1000)
+    
     try:
-        async with async_playwright() as p:
-            # Launch browser with Cloudflare bypass settings
-            browser = await p.chromium.launch(
-                headless=True,
-                args=['--disable-blink-features=AutomationControlled']
-            )
+        # Warm page account ini kalau masih ada di pool, kalau tidak context baru (tanpa launch browser)
+        async with browser_pool.page(str(account_id)) as page:
+            mark('page')
             
-            context = await browser.new_context(
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                viewport={'width': 1920, 'height': 1080}
-            )
+            # Navigate to login page (DOM cukup, step berikutnya menunggu kondisinya sendiri)
+            await page.goto(url, wait_until='domcontentloaded', timeout=GOTO_TIMEOUT_MS)
+            mark('goto')
             
-            page = await context.new_page()
-            
-            # Navigate to login page
-            await page.goto(url, wait_until='networkidle', timeout=30000)
-            
-            # Wait for Cloudflare challenge (if any)
-            await asyncio.sleep(5)
+            # Wait for Cloudflare challenge (if any) - langsung lanjut kalau tidak ada
+            await page.wait_for_function(CHALLENGE_CLEARED_JS, timeout=CHALLENGE_TIMEOUT_MS)
+            mark('challenge')
             
             # Mock login (replace with actual selectors)
             # await page.fill('#username', username)
             # await page.fill('#password', password)
             # await page.click('#login-button')
             
-            # Simulate successful login
-            await asyncio.sleep(2)
+            # Tunggu tanda login sukses, bukan sleep (tanpa selector = mock, tidak ada yang ditunggu)
+            success_selector = job_data.get('successSelector') or LOGIN_SUCCESS_SELECTOR
+            if success_selector:
+                await page.wait_for_selector(success_selector, timeout=LOGIN_TIMEOUT_MS)
             
             # Mock balance
             balance = round(random.uniform(1000, 5000), 2)
-            
-            # Store session
-            sessions[account_id] = {'context': context, 'page': page, 'browser': browser}
-            
-            print(f'[LOGIN] Account {account_id}: Login successful, balance: {balance}')
-            
-            send_result('login_success', {
-                'accountId': account_id,
-                'balance': balance
-            })
-            
-            # Keep session alive
-            asyncio.create_task(keep_alive(account_id, page))
+            mark('login')
+        
+        # Store session (page tetap warm di pool)
+        already_alive = account_id in sessions
+        sessions[account_id] = {'balance': balance, 'logged_in_at': time.time()}
+        
+        print(f'[LOGIN] Account {account_id}: Login successful, balance: {balance} (timings ms: {timings})')
+        
+        send_result('login_success', {
+            'accountId': account_id,
+            'balance': balance,
+            'timings': timings
+        })
+        
+        # Keep session alive
+        if not already_alive:
+            asyncio.create_task(keep_alive(account_id))
             
     except Exception as e:
-        print(f'[LOGIN] Account {account_id}: Login failed - {e}')
-        send_result('login_failed', {'accountId': account_id, 'error': str(e)})
+        print(f'[LOGIN] Account {account_id}: Login failed - {e} (timings ms: {timings})')
+        send_result('login_failed', {'accountId': account_id, 'error': str(e), 'timings': timings})
+
+
+def drop_session(account):
+    """browser_pool on_evict: page account ditutup (LRU / tidak sehat) -> harus login ulang"""
+    for account_id in [a for a in sessions if str(a) == account]:
+        sessions.pop(account_id, None)
 
 
-async def keep_alive(account_id, page):
+async def keep_alive(account_id):
     """Keep session alive by periodic checks"""
     while account_id in sessions:
         await asyncio.sleep(60)
         try:
-            await page.evaluate('() => window.location.href')
+            async with browser_pool.page(str(account_id), create=False) as page:
+                await page.evaluate('() => window.location.href')
             print(f'[KEEP-ALIVE] Account {account_id}: Session active')
         except Exception as e:
             print(f'[KEEP-ALIVE] Account {account_id}: Session lost - {e}')
@@ -152,15 +200,14 @@ async def bet_worker(job_data):
         return
     
     try:
-        page = sessions[account_id]['page']
-        
-        # Mock bet execution (replace with actual selectors)
-        # await page.click(f'text={match_name}')
-        # await page.fill('#stake-input', str(stake))
-        # await page.click('#place-bet-button')
-        
-        # Simulate bet placement
-        await asyncio.sleep(2)
+        async with browser_pool.page(str(account_id), create=False) as page:
+            # Mock bet execution (replace with actual selectors)
+            # await page.click(f'text={match_name}')
+            # await page.fill('#stake-input', str(stake))
+            # await page.click('#place-bet-button')
+            
+            # Simulate bet placement
+            await asyncio.sleep(2)
         
         print(f'[BET] Bet {bet_id} executed successfully')
         
@@ -179,35 +226,134 @@ async def bet_worker(job_data):
         send_result('bet_failed', {'betId': bet_id, 'error': str(e)})
 
 
+# Queue + handler + max job bersamaan, urut prioritas (BLPOP multi-key pop dari key pertama yang tidak kosong)
+QUEUES = (
+    ('bull:bet:wait', bet_worker, int(os.getenv('BET_CONCURRENCY', '8'))),
+    ('bull:login:wait', login_worker, int(os.getenv('LOGIN_CONCURRENCY', '2'))),
+    ('bull:scan:wait', scan_worker, int(os.getenv('SCAN_CONCURRENCY', '1'))),
+)
+HANDLERS = {queue: handler for queue, handler, _ in QUEUES}
+
+# Timeout BLPOP (detik); queue yang penuh baru ikut di-poll lagi setelah BLPOP berikutnya
+BLPOP_TIMEOUT = float(os.getenv('BLPOP_TIMEOUT', '0.5'))
+
+# SIGTERM/SIGINT: berhenti ambil job, tunggu job jalan (maks detik ini), flush result lalu tutup
+SHUTDOWN_TIMEOUT = float(os.getenv('SHUTDOWN_TIMEOUT', '30'))
+
+
 async def process_queue():
-    """Process jobs from Redis queues"""
+    """Process jobs from Redis queues: satu BLPOP untuk semua queue, job jalan sebagai task"""
+    global browser_pool
+    
     redis_client = await aioredis.from_url(REDIS_URL, decode_responses=True)
     
     print('[WORKER] Connected to Redis, processing queues...')
     
-    while True:
+    playwright = await async_playwright().start()
+    browser_pool = BrowserPool(
+        playwright,
+        size=BROWSERS,
+        max_contexts=MAX_CONTEXTS,
+        # Launch browser with Cloudflare bypass settings
+        launch_options={'headless': True, 'args': ['--disable-blink-features=AutomationControlled']},
+        context_options={
+            'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            'viewport': {'width': 1920, 'height': 1080}
+        },
+        on_evict=drop_session
+    )
+    await browser_pool.start()
+    await reporter.start()
+    
+    job_queue = None
+    if QUEUE_MODE == 'reliable':
+        job_queue = ReliableQueue(redis_client, [queue for queue, _, _ in QUEUES], WORKER_ID,
+                                  visibility_timeout=VISIBILITY_TIMEOUT, max_runtime=MAX_RUNTIME)
+        await job_queue.start()
+        print(f'[WORKER] Reliable queue mode as {WORKER_ID} (visibility timeout {VISIBILITY_TIMEOUT}s)')
+    
+    running = {queue: 0 for queue, _, _ in QUEUES}
+    tasks = set()
+    slot_freed = asyncio.Event()
+    stopping = asyncio.Event()
+    
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopping.set)
+    
+    async def run_job(queue, raw, job_data):
+        try:
+            await HANDLERS[queue](job_data)
+        except Exception as e:
+            print(f'[WORKER] Job from {queue} failed: {e}')
+        finally:
+            running[queue] -= 1
+            slot_freed.set()
+        if job_queue is not None:
+            try:
+                await job_queue.ack(queue, raw)
+            except Exception as e:
+                print(f'[WORKER] Ack failed for {queue}: {e}')
+    
+    while not stopping.is_set():
+        # Queue yang sudah di cap tidak di-pop dulu
+        keys = [queue for queue, _, limit in QUEUES if running[queue] < limit]
+        if not keys:
+            slot_freed.clear()
+            waits = [asyncio.create_task(slot_freed.wait()), asyncio.create_task(stopping.wait())]
+            _, pending = await asyncio.wait(waits, return_when=asyncio.FIRST_COMPLETED)
+            for waiter in pending:
+                waiter.cancel()
+            continue
+        
         try:
-            # Check login queue
-            login_job = await redis_client.blpop('bull:login:wait', timeout=1)
-            if login_job:
-                job_data = json.loads(login_job[1])
-                await login_worker(job_data.get('data', {}))
+            if job_queue is not None:
+                job = await job_queue.pop_from(keys, timeout=BLPOP_TIMEOUT)
+            else:
+                job = await redis_client.blpop(keys, timeout=BLPOP_TIMEOUT)
+            if not job:
+                continue
             
-            # Check scan queue
-            scan_job = await redis_client.blpop('bull:scan:wait', timeout=1)
-            if scan_job:
-                job_data = json.loads(scan_job[1])
-                await scan_worker(job_data.get('data', {}))
+            queue, raw = job
+            try:
+                job_data = json.loads(raw)
+            except ValueError:
+                print(f'[WORKER] Dropping malformed job from {queue}')
+                if job_queue is not None:
+                    await job_queue.ack(queue, raw)
+                continue
             
-            # Check bet queue
-            bet_job = await redis_client.blpop('bull:bet:wait', timeout=1)
-            if bet_job:
-                job_data = json.loads(bet_job[1])
-                await bet_worker(job_data.get('data', {}))
+            # Bull job timestamp (ms) -> latency dari enqueue sampai dispatch
+            enqueued = job_data.get('timestamp')
+            if enqueued:
+                print(f'[WORKER] {queue} dispatched after {time.time() * 1000 - enqueued:.0f} ms')
+            
+            running[queue] += 1
+            task = asyncio.create_task(run_job(queue, raw, job_data.get('data', {})))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
             
         except Exception as e:
             print(f'[WORKER] Error processing queue: {e}')
             await asyncio.sleep(1)
+    
+    print(f'[WORKER] Shutting down, waiting for {len(tasks)} running jobs...')
+    if tasks:
+        _, pending = await asyncio.wait(tasks, timeout=SHUTDOWN_TIMEOUT)
+        # Job yang dipotong tidak di-ack -> job_queue.close() mengembalikannya ke queue
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    
+    # Result dulu (flush / spill ke disk), baru queue (requeue job yang belum di-ack)
+    await reporter.close()
+    print(f'[WORKER] Reporter stats: {reporter.stats}')
+    if job_queue is not None:
+        await job_queue.close()
+    await browser_pool.close()
+    await playwright.stop()
+    await redis_client.close()
+    print('[WORKER] Shutdown complete')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,24 @@
+"""
+arbcore - matcher + detector yang dipakai bersama worker dan engine (backend_engine.py)
+Import package ini tidak punya side effect; NumPy baru di-import saat batch path dipakai.
+"""
+
+from .detector import MARGIN_TIERS, ArbitrageDetector
+from .fuzzy import FuzzyEventMatcher
+from .matcher import EventIndex, EventMatcher
+from .models import MARKET_SIDES, MARKETS, Match, Odds
+from .price_book import MarketBook, PriceBook
+
+__all__ = [
+    'ArbitrageDetector',
+    'EventIndex',
+    'EventMatcher',
+    'FuzzyEventMatcher',
+    'MARGIN_TIERS',
+    'MARKETS',
+    'MARKET_SIDES',
+    'MarketBook',
+    'Match',
+    'Odds',
+    'PriceBook',
+]
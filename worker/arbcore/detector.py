@@ -0,0 +1,291 @@
+"""
+Arbitrage detection: full scan, incremental (update_events) dan kernel margin NumPy (batch_margins)
+"""
+
+from bisect import bisect_right
+from typing import Dict, Iterable, List
+
+from .models import MARKETS, parse_minute
+from .price_book import MarketBook
+
+_np = None
+
+# Threshold margin (%) untuk margin_tier: < 10 -> 0, 10-25 -> 1, 25-50 -> 2, >= 50 -> 3
+MARGIN_TIERS = (10, 25, 50)
+
+
+def _numpy():
+    """Import NumPy saat pertama dipakai (batch path saja), None kalau tidak terinstall"""
+    global _np
+    if _np is None:
+        try:
+            import numpy
+        except ImportError:
+            _np = False
+        else:
+            _np = numpy
+    return _np or None
+
+
+class ArbitrageDetector:
+    def __init__(self, settings: Dict = None):
+        self.settings = settings or {
+            'min_percent': 5,
+            'max_percent': 120,
+            'minute_limit_ht': 35,
+            'minute_limit_ft': 75,
+            'market_filter': {'ft_hdp': True, 'ft_ou': True, 'ht_hdp': True, 'ht_ou': True},
+            'round_off': 5
+        }
+        self.open_opportunities = {}  # (signature, market) -> opportunity
+        self.books = {}               # signature -> {market: MarketBook}
+        self.book_odds = {}           # signature -> {provider: (Odds yang sudah masuk books, rank)}
+    
+    def parse_time_to_minutes(self, time_str: str) -> int:
+        """Menit pertandingan ("1H 20" -> 20, "2H 10" -> 55), 0 kalau tidak bisa dibaca"""
+        return parse_minute(time_str) or 0
+    
+    def apply_time_filter(self, match_info: Dict) -> bool:
+        time_str = match_info.get('time', '')
+        minutes = self.parse_time_to_minutes(time_str)
+        is_ht = minutes < 45
+        limit = self.settings['minute_limit_ht'] if is_ht else self.settings['minute_limit_ft']
+        return minutes <= limit
+    
+    def calculate_margin(self, odds1: float, odds2: float) -> float:
+        if not odds1 or not odds2 or odds1 <= 0 or odds2 <= 0:
+            return None
+        try:
+            total_implied = (1 / odds1) + (1 / odds2)
+            margin = (total_implied - 1) * 100
+            return round(margin, 2)
+        except:
+            return None
+    
+    def check_market_filter(self, market: str) -> bool:
+        return self.settings['market_filter'].get(market, False)
+    
+    def best_prices(self, prices_by_provider: Dict) -> tuple:
+        """
+        prices_by_provider = {provider: (home/over, away/under)}
+        ((provider, home/over terendah), (provider, away/under tertinggi)) tanpa sort
+        """
+        best_home = best_away = None
+        for provider, (home_val, away_val) in prices_by_provider.items():
+            if home_val and (best_home is None or home_val < best_home[1]):
+                best_home = (provider, home_val)
+            if away_val and (best_away is None or away_val > best_away[1]):
+                best_away = (provider, away_val)
+        return best_home, best_away
+    
+    def sync_books(self, books: Dict, book_odds: Dict, providers: Dict, changed: Iterable = None):
+        """
+        Update books = {market: MarketBook} hanya untuk provider yang Odds-nya berganti
+        (EventIndex memasang Match/Odds baru saat odds berubah) atau hilang dari event.
+        book_odds = {provider: (Odds yang terakhir dimasukkan ke books, rank)}; rank = urutan
+        provider masuk event, tie-break harga sama seperti urutan dict di best_prices.
+        changed = provider yang berganti sejak sync terakhir (None = cek semua provider event)
+        """
+        if changed is None:
+            changed = [p for p in book_odds if p not in providers]
+            changed.extend(providers)
+        
+        added = []
+        for provider in changed:
+            match = providers.get(provider)
+            if match is None:
+                if book_odds.pop(provider, None) is not None:
+                    for book in books.values():
+                        book.remove(provider)
+                continue
+            entry = book_odds.get(provider)
+            if entry is None:
+                added.append(provider)
+            elif entry[0] is not match.odds:
+                self._book_update(books, book_odds, provider, match.odds, entry[1])
+        
+        if added:
+            # Provider baru dapat rank sesuai urutan masuk event (changed bisa set tanpa urutan)
+            if len(added) > 1:
+                order = {p: i for i, p in enumerate(providers)}
+                added.sort(key=order.get)
+            rank = max((r for _, r in book_odds.values()), default=-1) + 1
+            for provider in added:
+                self._book_update(books, book_odds, provider, providers[provider].odds, rank)
+                rank += 1
+    
+    def _book_update(self, books: Dict, book_odds: Dict, provider: str, odds, rank: int):
+        book_odds[provider] = (odds, rank)
+        for market in MARKETS:
+            pair = odds.get(market)
+            book = books.get(market)
+            if book is None:
+                if pair is None:
+                    continue
+                book = books[market] = MarketBook()
+            book.update(provider, pair, rank)
+    
+    def market_prices(self, event_data: Dict, books: Dict = None) -> List[tuple]:
+        """
+        [(market, best_home, best_away)] untuk market yang punya >= 2 provider dan dua sisi.
+        books = {market: MarketBook} persisten untuk event ini, sudah di-sync_books (mode incremental)
+        """
+        result = []
+        providers = event_data['providers']
+        if len(providers) < 2:
+            return result
+        
+        if not self.apply_time_filter(event_data['match_info']):
+            return result
+        
+        for market in MARKETS:
+            if not self.check_market_filter(market):
+                continue
+            
+            if books is not None:
+                book = books.get(market)
+                if book is not None and len(book.providers) >= 2:
+                    best_home, best_away = book.best()
+                    if best_home and best_away:
+                        result.append((market, best_home, best_away))
+                continue
+            
+            prices_by_provider = {}
+            for provider, match in providers.items():
+                prices = match.odds.get(market)
+                if prices:
+                    prices_by_provider[provider] = prices
+            
+            if len(prices_by_provider) < 2:
+                continue
+            
+            best_home, best_away = self.best_prices(prices_by_provider)
+            
+            if best_home and best_away:
+                result.append((market, best_home, best_away))
+        
+        return result
+    
+    def build_opportunity(self, match_sig: str, match_info: Dict, market: str, margin: float,
+                          best_home: tuple, best_away: tuple) -> Dict:
+        return {
+            'match_id': match_sig,
+            'home': match_info.get('home', 'Unknown'),
+            'away': match_info.get('away', 'Unknown'),
+            'market': market,
+            'margin': margin,
+            'margin_tier': self.margin_tier(margin),
+            'leg_1': {'provider': best_home[0], 'odds': best_home[1], 'side': 'home/over'},
+            'leg_2': {'provider': best_away[0], 'odds': best_away[1], 'side': 'away/under'}
+        }
+    
+    def detect_event(self, match_sig: str, event_data: Dict, books: Dict = None) -> Dict[str, Dict]:
+        """Opportunity per market untuk satu event (market -> opportunity)"""
+        found = {}
+        min_pct = self.settings.get('min_percent', 5)
+        max_pct = self.settings.get('max_percent', 120)
+        
+        for market, best_home, best_away in self.market_prices(event_data, books):
+            margin = self.calculate_margin(best_home[1], best_away[1])
+            
+            if not margin:
+                continue
+            
+            if margin < min_pct or margin > max_pct:
+                continue
+            
+            found[market] = self.build_opportunity(match_sig, event_data['match_info'], market, margin, best_home, best_away)
+        
+        return found
+    
+    def detect_opportunities(self, grouped_matches: Dict) -> List[Dict]:
+        opportunities = []
+        
+        for match_sig, event_data in grouped_matches.items():
+            opportunities.extend(self.detect_event(match_sig, event_data).values())
+        
+        return opportunities
+    
+    def update_events(self, changed: Dict, expired: List = (), providers: Dict = None) -> List[Dict]:
+        """
+        Incremental detection: hanya event di `changed` yang dihitung ulang.
+        State per (event, market) disimpan di open_opportunities.
+        providers = {signature: provider yang berganti} (EventIndex.pop_changes): book harga event
+        hanya di-update untuk provider itu; None = cek semua provider event yang berubah.
+        Return list {'event': 'opened' | 'updated' | 'closed', 'opportunity': {...}}
+        """
+        changes = []
+        for match_sig in expired:
+            self.books.pop(match_sig, None)
+            self.book_odds.pop(match_sig, None)
+            for market in MARKETS:
+                old = self.open_opportunities.pop((match_sig, market), None)
+                if old is not None:
+                    changes.append({'event': 'closed', 'opportunity': old})
+        
+        for match_sig, event_data in changed.items():
+            books = self.books.setdefault(match_sig, {})
+            book_odds = self.book_odds.get(match_sig)
+            if book_odds is None:
+                # Event baru untuk detector ini: book dibangun dari semua provider
+                book_odds = self.book_odds[match_sig] = {}
+                touched = None
+            else:
+                touched = providers.get(match_sig) if providers is not None else None
+            self.sync_books(books, book_odds, event_data['providers'], touched)
+            found = self.detect_event(match_sig, event_data, books)
+            for market in MARKETS:
+                key = (match_sig, market)
+                old = self.open_opportunities.get(key)
+                new = found.get(market)
+                if new is None:
+                    if old is not None:
+                        del self.open_opportunities[key]
+                        changes.append({'event': 'closed', 'opportunity': old})
+                elif old is None:
+                    self.open_opportunities[key] = new
+                    changes.append({'event': 'opened', 'opportunity': new})
+                elif new != old:
+                    self.open_opportunities[key] = new
+                    changes.append({'event': 'updated', 'opportunity': new})
+        
+        return changes
+    
+    def get_open_opportunities(self) -> List[Dict]:
+        return list(self.open_opportunities.values())
+    
+    def margin_tier(self, margin: float) -> int:
+        """Bucket margin: jumlah threshold margin_tiers yang <= margin"""
+        return bisect_right(self.settings.get('margin_tiers', MARGIN_TIERS), margin)
+    
+    def batch_margins(self, home_odds, away_odds) -> tuple:
+        """
+        Vectorized calculate_margin + filter min/max + margin_tier untuk banyak pasangan odds
+        yang sudah ada sebagai array (harga terbaik per event-market). Tidak ada wrapper
+        end-to-end: mengumpulkan harga dari dict provider lebih mahal dari margin scalar,
+        jadi detect_event / update_events tetap pakai path scalar.
+        Return (margins, mask, tiers) - margins NaN kalau odds invalid, mask = lolos filter.
+        Butuh NumPy.
+        """
+        np = _numpy()
+        home = np.asarray(home_odds, dtype=np.float64)
+        away = np.asarray(away_odds, dtype=np.float64)
+        valid = (home > 0) & (away > 0)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            raw = (1 / home + 1 / away - 1) * 100
+        raw[~valid] = np.nan
+        margins = np.round(raw, 2)
+        
+        # np.round bisa beda dengan round() untuk nilai tepat di .xx5 - hitung ulang yang itu saja
+        scaled = raw * 100
+        ambiguous = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+        for i in ambiguous:
+            margins[i] = round(float(raw[i]), 2)
+        
+        min_pct = self.settings.get('min_percent', 5)
+        max_pct = self.settings.get('max_percent', 120)
+        mask = valid & (margins != 0) & (margins >= min_pct) & (margins <= max_pct)
+        tiers = np.searchsorted(np.asarray(self.settings.get('margin_tiers', MARGIN_TIERS)), margins, side='right')
+        
+        return margins, mask, tiers
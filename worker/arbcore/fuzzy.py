@@ -0,0 +1,434 @@
+"""
+Fuzzy event matching antar provider
+Token-set + trigram similarity, dengan blocking (league, kickoff bucket) dan index token
+(trigram hanya kalau tidak ada kandidat dengan token sama) supaya tidak perlu membandingkan
+semua pasangan match (O(n*m)).
+
+League di-normalisasi (singkatan negara, urutan token) lalu di-cluster fuzzy antar nama,
+dan match yang tidak ketemu di league-nya dicari ulang di bucket kickoff yang sama di semua
+league. Kickoff diambil dari 'kickoff' kalau ada, selain itu diestimasi dari menit live
+parser ('time' + 'last_update').
+"""
+
+import gc
+import re
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from .matcher import EventMatcher
+from .models import Match, parse_minute
+
+# Token yang tidak membedakan tim ("Chelsea FC" == "Chelsea")
+STOP_TOKENS = frozenset({'fc', 'cf', 'sc', 'afc', 'ac', 'club', 'the', 'cd', 'fk', 'sk', 'bk', 'if', 'sv'})
+_TOKEN_SPLIT = re.compile(r'[^a-z0-9]+')
+
+# Singkatan / kata sifat negara di nama league -> nama negara ("ENG PREMIER LEAGUE" == "England Premier League")
+COUNTRY_ALIASES = {
+    'eng': 'england', 'english': 'england', 'esp': 'spain', 'spanish': 'spain',
+    'ger': 'germany', 'german': 'germany', 'ita': 'italy', 'italian': 'italy',
+    'fra': 'france', 'french': 'france', 'ned': 'netherlands', 'dutch': 'netherlands',
+    'holland': 'netherlands', 'por': 'portugal', 'portuguese': 'portugal', 'sco': 'scotland',
+    'scottish': 'scotland', 'bel': 'belgium', 'tur': 'turkey', 'rus': 'russia', 'bra': 'brazil',
+    'arg': 'argentina', 'jpn': 'japan', 'kor': 'korea', 'aus': 'australia', 'chn': 'china', 'mex': 'mexico',
+}
+
+
+@lru_cache(maxsize=65536)
+def _token_grams(token: str) -> frozenset:
+    """Trigram satu token (dengan padding spasi) - token seperti "real", "madrid" berulang antar tim"""
+    key = f" {token} "
+    return frozenset({key[i:i + 3] for i in range(len(key) - 2)})
+
+
+@lru_cache(maxsize=65536)
+def team_features(norm: str) -> Tuple[frozenset, frozenset]:
+    """Normalized team name -> (token set, trigram set = gabungan trigram per token)"""
+    tokens = set(_TOKEN_SPLIT.split(norm))
+    tokens.discard('')
+    significant = frozenset(tokens - STOP_TOKENS or tokens)
+    return significant, frozenset().union(*map(_token_grams, significant))
+
+
+def team_similarity(a: Tuple[frozenset, frozenset], b: Tuple[frozenset, frozenset]) -> float:
+    """0..1 - rata-rata token Jaccard dan trigram Dice"""
+    tokens_a, grams_a = a
+    tokens_b, grams_b = b
+    if tokens_a == tokens_b:
+        return 1.0
+    if not grams_a or not grams_b:
+        return 0.0
+    token_score = len(tokens_a & tokens_b) / len(tokens_a | tokens_b)
+    gram_score = 2 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b))
+    return (token_score + gram_score) / 2
+
+
+@lru_cache(maxsize=4096)
+def league_key(league: Optional[str]) -> str:
+    """Nama league -> token terurut, singkatan negara diganti nama negara"""
+    if not league or league == 'Unknown':
+        return ''
+    tokens = {COUNTRY_ALIASES.get(t, t) for t in _TOKEN_SPLIT.split(league.lower()) if t}
+    return ' '.join(sorted(tokens))
+
+
+def estimate_kickoff(time_str: Optional[str], now: float = None) -> Optional[int]:
+    """Kickoff (epoch detik) dari menit live ("1H 20" -> now - 20 menit), None kalau bukan live"""
+    minute = parse_minute(time_str)
+    if minute is None:
+        return None
+    return int((now or time.time()) - minute * 60)
+
+
+def match_kickoff(match: Dict) -> Optional[int]:
+    """Kickoff match dict: field 'kickoff', atau estimasi dari 'time' + 'last_update' parser"""
+    kickoff = match.get('kickoff')
+    if kickoff is not None:
+        return kickoff
+    return estimate_kickoff(match.get('time'), match.get('last_update'))
+
+
+class BlockIndex:
+    """
+    Event id per block (league, kickoff bucket), plus block ('*', bucket) berisi semua league
+    untuk fallback lintas league. Token postings global (dibangun saat add, token per tim cuma
+    beberapa); trigram postings per block hanya untuk block besar dan baru saat dipakai (lazy).
+    events = {event_id: {'home_features', 'away_features', 'providers', 'block'}} (dipakai bersama pemilik index)
+    """
+
+    def __init__(self, events: Dict):
+        self.events = events
+        self.blocks = {}        # block -> [event_id]
+        self.providers = {}     # block -> provider yang punya event di block itu
+        self.by_league = {}     # league -> [block]
+        self.tokens = {}        # token -> {event_id: None} (dict: urutan stabil, remove O(1))
+        self.all_providers = set()  # provider yang pernah punya event di index
+        self._postings = {}     # block -> trigram -> [event_id]
+
+    def _with_wildcard(self, block: Tuple) -> Tuple[Tuple, ...]:
+        return (block, ('*', block[1])) if block[1] is not None and block[0] != '*' else (block,)
+
+    def add(self, event_id, block: Tuple, provider: str):
+        self.all_providers.add(provider)
+        event = self.events[event_id]
+        for token in event['home_features'][0] | event['away_features'][0]:
+            ids = self.tokens.get(token)
+            if ids is None:
+                self.tokens[token] = {event_id: None}
+            else:
+                ids[event_id] = None
+
+        for b in self._with_wildcard(block):
+            event_ids = self.blocks.get(b)
+            if event_ids is None:
+                event_ids = self.blocks[b] = []
+                self.providers[b] = set()
+                self.by_league.setdefault(b[0], []).append(b)
+            event_ids.append(event_id)
+            self.providers[b].add(provider)
+
+            postings = self._postings.get(b)
+            if postings is not None:
+                self._index_event(postings, event_id)
+
+    def remove(self, event_id, block: Tuple):
+        """Event expired (panggil sebelum event dibuang dari events); postings block di-rebuild saat dipakai lagi"""
+        event = self.events.get(event_id)
+        if event is not None:
+            for token in event['home_features'][0] | event['away_features'][0]:
+                ids = self.tokens.get(token)
+                if ids is not None:
+                    ids.pop(event_id, None)
+        for b in self._with_wildcard(block):
+            event_ids = self.blocks.get(b)
+            if event_ids and event_id in event_ids:
+                event_ids.remove(event_id)
+                self._postings.pop(b, None)
+
+    def has_other(self, provider: str) -> bool:
+        """Ada event dari provider lain (kalau tidak, match provider ini pasti event baru)"""
+        return len(self.all_providers) > 1 or provider not in self.all_providers
+
+    def expand(self, query_blocks: List[Tuple], provider: str) -> List[Tuple]:
+        """Block yang ada dan berisi event dari provider lain (bucket '*' = semua bucket di league)"""
+        result = []
+        for block in query_blocks:
+            if block[1] == '*':
+                candidates = self.by_league.get(block[0], ())
+            elif block in self.blocks:
+                candidates = (block,)
+            else:
+                continue
+            for b in candidates:
+                providers = self.providers[b]
+                if len(providers) > 1 or provider not in providers:
+                    result.append(b)
+        return result
+
+    def postings(self, block: Tuple) -> Dict:
+        postings = self._postings.get(block)
+        if postings is None:
+            postings = self._postings[block] = {}
+            for event_id in self.blocks[block]:
+                self._index_event(postings, event_id)
+        return postings
+
+    def _index_event(self, postings: Dict, event_id):
+        event = self.events[event_id]
+        for gram in event['home_features'][1] | event['away_features'][1]:
+            postings.setdefault(gram, []).append(event_id)
+
+
+class FuzzyEventMatcher:
+    """
+    Group match dari beberapa provider jadi event, termasuk nama tim yang tidak persis sama.
+    Output sama dengan EventMatcher.match_events, plus 'confidence' per provider.
+    Dipakai juga oleh EventIndex (fuzzy=...) untuk resolve signature yang tidak ketemu persis.
+    """
+
+    def __init__(self, event_matcher: EventMatcher = None, threshold: float = 0.72,
+                 kickoff_bucket_seconds: int = 900, kickoff_tolerance: int = 300, use_league: bool = True,
+                 league_threshold: float = 0.8, league_fallback: bool = True,
+                 small_block: int = 16, probe_grams: int = 4, max_postings: int = 64, max_candidates: int = 8):
+        self.event_matcher = event_matcher or EventMatcher()
+        self.threshold = threshold
+        self.kickoff_bucket_seconds = kickoff_bucket_seconds
+        self.kickoff_tolerance = kickoff_tolerance  # selisih kickoff antar provider yang masih dianggap sama
+        self.use_league = use_league
+        self.league_threshold = league_threshold    # similarity nama league yang dianggap league sama
+        self.league_fallback = league_fallback      # tidak ketemu di league sendiri -> cari di semua league
+        self.small_block = small_block          # block sekecil ini di-score semua, tanpa trigram index
+        self.probe_grams = probe_grams          # trigram paling jarang yang dipakai untuk cari kandidat
+        self.max_postings = max_postings        # token lebih umum dari ini tidak dipakai cari kandidat
+        self.max_candidates = max_candidates    # kandidat yang di-score per match
+
+        self._league_canon = {}     # league_key -> league_key canonical (cluster)
+        self._canon_leagues = []    # [(league_key canonical, features)]
+
+    def features(self, norm: Match) -> Tuple[Tuple, Tuple]:
+        """(home features, away features) dari nama canonical"""
+        matcher = self.event_matcher
+        return (team_features(matcher.find_team_canonical(norm.home_norm)),
+                team_features(matcher.find_team_canonical(norm.away_norm)))
+
+    def league_block(self, league: Optional[str]) -> str:
+        """League canonical: nama yang mirip (>= league_threshold) masuk cluster yang sama"""
+        if not self.use_league:
+            return ''
+        key = league_key(league)
+        canon = self._league_canon.get(key)
+        if canon is None:
+            canon = key
+            if key:
+                features = team_features(key)
+                for other, other_features in self._canon_leagues:
+                    if team_similarity(features, other_features) >= self.league_threshold:
+                        canon = other
+                        break
+                else:
+                    self._canon_leagues.append((key, features))
+            self._league_canon[key] = canon
+        return canon
+
+    def _blocks(self, league: str, kickoff: Optional[int]) -> Tuple[Tuple, List[Tuple]]:
+        """(block untuk insert, blocks untuk query); bucket '*' = semua block di league itu"""
+        if kickoff is None:
+            return (league, None), [(league, '*')]
+        bucket = int(kickoff // self.kickoff_bucket_seconds)
+        query = [(league, bucket), (league, None)]
+        offset = kickoff - bucket * self.kickoff_bucket_seconds
+        if offset < self.kickoff_tolerance:
+            query.append((league, bucket - 1))
+        if offset > self.kickoff_bucket_seconds - self.kickoff_tolerance:
+            query.append((league, bucket + 1))
+        return (league, bucket), query
+
+    def _confidence(self, home: Tuple, away: Tuple, event: Dict) -> float:
+        straight = (team_similarity(home, event['home_features']) + team_similarity(away, event['away_features'])) / 2
+        if straight >= self.threshold:
+            return straight
+        swapped = (team_similarity(home, event['away_features']) + team_similarity(away, event['home_features'])) / 2
+        return max(straight, swapped)
+
+    def _top(self, hits: Dict) -> List:
+        if len(hits) > self.max_candidates:
+            return sorted(hits, key=hits.get, reverse=True)[:self.max_candidates]
+        return list(hits)
+
+    def _token_candidates(self, index: BlockIndex, blocks: List[Tuple], home: Tuple, away: Tuple) -> List:
+        """
+        Event di blocks yang berbagi token jarang (<= max_postings event) dengan tim home / away -
+        filter murah sebelum similarity; token umum ("real", nama kota) dilewati
+        """
+        allowed = set(blocks)
+        events = index.events
+        hits = {}
+        for team_tokens in (home[0], away[0]):
+            for token in team_tokens:
+                ids = index.tokens.get(token)
+                if not ids or len(ids) > self.max_postings:
+                    continue
+                for event_id in ids:
+                    count = hits.get(event_id)
+                    if count is None:
+                        block = events[event_id]['block']
+                        if block not in allowed and ('*', block[1]) not in allowed:
+                            hits[event_id] = 0  # di luar block query, tidak di-score
+                            continue
+                        hits[event_id] = 1
+                    elif count:
+                        hits[event_id] = count + 1
+        return self._top({event_id: count for event_id, count in hits.items() if count})
+
+    def _gram_candidates(self, index: BlockIndex, blocks: List[Tuple], home: Tuple, away: Tuple) -> List:
+        """Fallback tanpa token sama (typo, singkatan): block kecil semua, block besar lewat trigram paling jarang"""
+        candidates = []
+        hits = {}
+        for block in blocks:
+            event_ids = index.blocks[block]
+            if len(event_ids) <= self.small_block:
+                candidates.extend(event_ids)
+                continue
+            postings = index.postings(block)
+            for team_grams in (home[1], away[1]):
+                lists = sorted((postings[g] for g in team_grams if g in postings), key=len)
+                for ids in lists[:self.probe_grams]:
+                    for event_id in ids:
+                        hits[event_id] = hits.get(event_id, 0) + 1
+        candidates.extend(self._top(hits))
+        return candidates
+
+    def _score(self, index: BlockIndex, provider: str, candidates: List, home: Tuple, away: Tuple,
+               best: Tuple[Optional[object], float]) -> Tuple[Optional[object], float]:
+        best_id, best_score = best
+        for candidate in candidates:
+            event = index.events.get(candidate)
+            if event is None or provider in event['providers']:
+                continue
+            score = self._confidence(home, away, event)
+            if score > best_score:
+                best_score, best_id = score, candidate
+        return best_id, best_score
+
+    def _best(self, index: BlockIndex, provider: str, query_blocks: List[Tuple],
+              home: Tuple, away: Tuple, grams: bool = True) -> Tuple[Optional[object], float]:
+        blocks = index.expand(query_blocks, provider)
+        if not blocks:
+            return None, 0.0
+        best = self._score(index, provider, self._token_candidates(index, blocks, home, away),
+                           home, away, (None, 0.0))
+        if grams and best[1] < self.threshold:
+            best = self._score(index, provider, self._gram_candidates(index, blocks, home, away),
+                               home, away, best)
+        if best[1] < self.threshold:
+            return None, best[1]
+        return best
+
+    def find(self, index: BlockIndex, provider: str, home: Tuple, away: Tuple,
+             league: Optional[str], kickoff: Optional[int]) -> Tuple[Optional[object], float, Tuple]:
+        """
+        Event di index yang paling cocok (score >= threshold) untuk satu match
+        Return (event_id atau None, score, block untuk insert kalau jadi event baru)
+        """
+        insert_block, query_blocks = self._blocks(self.league_block(league), kickoff)
+        if not index.has_other(provider):
+            return None, 0.0, insert_block
+        event_id, score = self._best(index, provider, query_blocks, home, away)
+        if event_id is None and self.league_fallback and self.use_league and kickoff is not None:
+            # Nama league beda total antar provider: bucket kickoff yang sama di semua league,
+            # token jarang saja (trigram di block '*' yang besar terlalu mahal untuk match tanpa pasangan)
+            wildcard = [('*', block[1]) for block in query_blocks if block[1] is not None]
+            event_id, score = self._best(index, provider, wildcard, home, away, grams=False)
+        return event_id, score, insert_block
+
+    def new_index(self) -> BlockIndex:
+        """Index kosong untuk pemakaian incremental (EventIndex), event_id = signature event"""
+        return BlockIndex({})
+
+    def resolve(self, index: BlockIndex, provider: str, norm: Match) -> Tuple[Optional[object], float]:
+        """Event di index yang cocok untuk match (kickoff dari menit live), (None, score) kalau tidak ada"""
+        home, away = self.features(norm)
+        event_id, score, _ = self.find(index, provider, home, away, norm.league, estimate_kickoff(norm.time))
+        return event_id, score
+
+    def add_event(self, index: BlockIndex, event_id, norm: Match, providers: Dict):
+        """Daftarkan event baru (providers = dict providers milik event, dipakai bersama)"""
+        home, away = self.features(norm)
+        block = self._blocks(self.league_block(norm.league), estimate_kickoff(norm.time))[0]
+        index.events[event_id] = {'home_features': home, 'away_features': away,
+                                  'providers': providers, 'block': block}
+        index.add(event_id, block, norm.provider)
+
+    def remove_event(self, index: BlockIndex, event_id):
+        event = index.events.get(event_id)
+        if event is not None:
+            index.remove(event_id, event['block'])
+            del index.events[event_id]
+
+    def match_events(self, data: Dict) -> Dict:
+        """
+        data = {provider: [match, ...]}
+        Return {signature: {'providers': {provider: Match (dengan confidence)}, 'match_info': {...}}}
+        GC siklik di-pause selama build: puluhan ribu objek baru tanpa siklus, tiap pass GC cuma buang waktu
+        """
+        paused = gc.isenabled()
+        gc.disable()
+        try:
+            return self._match_events(data)
+        finally:
+            if paused:
+                gc.enable()
+
+    def _match_events(self, data: Dict) -> Dict:
+        matcher = self.event_matcher
+        events = {}
+        by_signature = {}
+        index = BlockIndex(events)
+
+        for provider, matches in data.items():
+            for match in matches:
+                norm = matcher.normalize_match(match, provider)
+                home, away = self.features(norm)
+                kickoff = match_kickoff(match)
+
+                # 1. Exact signature (murah)
+                event_id = by_signature.get(norm.signature)
+                confidence = 1.0
+                if event_id is not None and provider in events[event_id]['providers']:
+                    event_id = None
+
+                # 2. Fuzzy via blocking index
+                if event_id is None:
+                    event_id, confidence, insert_block = self.find(index, provider, home, away,
+                                                                   norm.league, kickoff)
+                    confidence = round(confidence, 3)
+
+                if event_id is None:
+                    event_id = len(events)
+                    events[event_id] = {
+                        'signature': norm.signature,
+                        'home_features': home,
+                        'away_features': away,
+                        'providers': {},
+                        'block': insert_block,
+                        'match_info': {
+                            'home': norm.home_norm,
+                            'away': norm.away_norm,
+                            'league': norm.league,
+                            'time': norm.time
+                        }
+                    }
+                    by_signature.setdefault(norm.signature, event_id)
+                    index.add(event_id, insert_block, provider)
+                    confidence = 1.0
+
+                norm.confidence = confidence
+                events[event_id]['providers'][provider] = norm
+
+        grouped = {}
+        for event in events.values():
+            signature = event['signature']
+            if signature in grouped:
+                signature = f"{signature}#{len(grouped)}"
+            grouped[signature] = {'providers': event['providers'], 'match_info': event['match_info']}
+        return grouped
@@ -0,0 +1,236 @@
+"""
+Event matching: alias index + LRU memo (EventMatcher) dan state incremental per provider (EventIndex)
+"""
+
+from functools import lru_cache
+from typing import Dict, List
+
+from .models import Match, Odds
+
+DEFAULT_TEAM_ALIASES = {
+    'manchester united': ['man united', 'man u'],
+    'manchester city': ['man city'],
+    'tottenham': ['spurs', 'tottenham hotspur'],
+    'chelsea': [],
+    'galatasaray': [],
+    'sporting': ['sporting lisbon'],
+}
+
+
+class EventMatcher:
+    def __init__(self, team_aliases: Dict = None, cache_size: int = 65536):
+        self.team_aliases = team_aliases if team_aliases is not None else {
+            canonical: list(aliases) for canonical, aliases in DEFAULT_TEAM_ALIASES.items()
+        }
+        # raw team string (dari feed) -> (normalized, canonical)
+        self._resolve_team = lru_cache(maxsize=cache_size)(self._resolve_team_uncached)
+        self._build_alias_index()
+
+    def _build_alias_index(self):
+        """Compile team_aliases jadi satu hash map alias/canonical -> canonical"""
+        index = {}
+        for canonical, aliases in self.team_aliases.items():
+            for alias in aliases:
+                index.setdefault(alias, canonical)
+        # Nama canonical selalu menang atas alias dengan string yang sama
+        for canonical in self.team_aliases:
+            index[canonical] = canonical
+        self.alias_index = index
+        self._resolve_team.cache_clear()
+
+    def update_aliases(self, team_aliases: Dict):
+        """Tambah/ganti alias lalu rebuild index (jangan mutate team_aliases langsung)"""
+        self.team_aliases.update(team_aliases)
+        self._build_alias_index()
+
+    def _resolve_team_uncached(self, name: str) -> tuple:
+        norm = self.normalize_team_name(name)
+        return norm, self.alias_index.get(norm, norm)
+
+    def normalize_team_name(self, name: str) -> str:
+        if not name:
+            return ""
+        if '(' in name and ')' in name:
+            name = name.split('(')[0].strip()
+        name = name.lower().strip()
+        return name
+
+    def find_team_canonical(self, norm: str) -> str:
+        return self.alias_index.get(norm, norm)
+
+    def normalize_match(self, match: Dict, provider: str = None) -> Match:
+        home_norm, home_can = self._resolve_team(match.get('home_team', '') or '')
+        away_norm, away_can = self._resolve_team(match.get('away_team', '') or '')
+        if home_can <= away_can:
+            sig = f"{home_can}_{away_can}"
+        else:
+            sig = f"{away_can}_{home_can}"
+        return Match(
+            provider or match.get('provider'),
+            match.get('match_id'),
+            home_norm,
+            away_norm,
+            sig,
+            Odds.from_dict(match.get('odds')),
+            match.get('league'),
+            match.get('time', '') or ''
+        )
+
+    def match_events(self, data: Dict) -> Dict:
+        """
+        data = {provider: [match, ...]}
+        Return {signature: {'providers': {provider: Match}, 'match_info': {...}}}
+        """
+        grouped = {}
+        for provider, matches in data.items():
+            for match in matches:
+                norm = self.normalize_match(match, provider)
+                event = grouped.get(norm.signature)
+                if event is None:
+                    event = grouped[norm.signature] = {
+                        'providers': {},
+                        'match_info': {'home': norm.home_norm, 'away': norm.away_norm, 'time': norm.time}
+                    }
+                event['providers'][provider] = norm
+        return grouped
+
+
+class EventIndex:
+    """
+    Stateful signature -> providers mapping, di-update per provider (upsert/remove).
+    Event yang hilang dari semua feed otomatis expired.
+    Dengan fuzzy (FuzzyEventMatcher), signature yang tidak ketemu persis di-resolve ke event
+    yang mirip ("Chelsea FC" vs "Chelsea") dan hasilnya di-cache per signature.
+    """
+
+    def __init__(self, event_matcher: EventMatcher = None, fuzzy=None):
+        self.event_matcher = event_matcher or EventMatcher()
+        self.fuzzy = fuzzy
+        self.aliases = {}         # signature match -> signature event (hasil fuzzy)
+        self._alias_sources = {}  # signature event -> [signature match yang di-alias ke sana]
+        self._fuzzy_index = fuzzy.new_index() if fuzzy is not None else None
+        self.events = {}          # signature -> {'providers': {provider: Match}, 'match_info': {...}}
+        self.provider_keys = {}   # provider -> {match_key: signature}
+        # (provider, signature) -> {match_key: Match}: satu provider bisa punya >1 match per event
+        self.provider_matches = {}
+        self.dirty = {}           # signature yang berubah sejak pop_changes terakhir -> {provider yang berganti}
+        self.expired = set()      # signature yang hilang dari semua feed sejak pop_changes terakhir
+
+    def _match_key(self, norm: Match) -> str:
+        return str(norm.match_id or norm.signature)
+
+    def upsert(self, provider: str, match: Dict) -> str:
+        """Insert/update satu match dari provider, return signature event-nya"""
+        norm = self.event_matcher.normalize_match(match, provider)
+        key = self._upsert(provider, norm)
+        return self.provider_keys[provider][key]
+
+    def _event_signature(self, provider: str, norm: Match) -> str:
+        """Signature event untuk match: persis, alias fuzzy yang sudah di-cache, atau fuzzy lookup"""
+        sig = norm.signature
+        if self.fuzzy is None or sig in self.events:
+            return sig
+        target = self.aliases.get(sig)
+        if target in self.events:
+            return target
+
+        target, score = self.fuzzy.resolve(self._fuzzy_index, provider, norm)
+        if target is None:
+            return sig
+        norm.confidence = round(score, 3)
+        self.aliases[sig] = target
+        self._alias_sources.setdefault(target, []).append(sig)
+        return target
+
+    def _upsert(self, provider: str, norm: Match) -> str:
+        sig = self._event_signature(provider, norm)
+        key = self._match_key(norm)
+        keys = self.provider_keys.setdefault(provider, {})
+
+        old_sig = keys.get(key)
+        if old_sig is not None and old_sig != sig:
+            self._detach(provider, old_sig, key)
+        keys[key] = sig
+        self.provider_matches.setdefault((provider, sig), {})[key] = norm
+
+        event = self.events.get(sig)
+        if event is None:
+            event = self.events[sig] = {
+                'providers': {},
+                'match_info': {'home': norm.home_norm, 'away': norm.away_norm, 'time': norm.time}
+            }
+            self.expired.discard(sig)
+            if self.fuzzy is not None:
+                self.fuzzy.add_event(self._fuzzy_index, sig, norm, event['providers'])
+        elif event['providers'].get(provider) == norm:
+            return key
+
+        event['providers'][provider] = norm
+        event['match_info']['time'] = norm.time
+        self.dirty.setdefault(sig, set()).add(provider)
+        return key
+
+    def remove(self, provider: str, match_key: str):
+        """Hapus satu match provider (key = match_id, atau signature kalau tanpa match_id)"""
+        sig = self.provider_keys.get(provider, {}).pop(match_key, None)
+        if sig is not None:
+            self._detach(provider, sig, match_key)
+
+    def sync_provider(self, provider: str, matches: List[Dict]):
+        """Full feed satu provider: upsert semua, hapus match yang tidak ada lagi"""
+        normalize = self.event_matcher.normalize_match
+        seen = {self._upsert(provider, normalize(match, provider)) for match in matches}
+
+        stale = [key for key in self.provider_keys.get(provider, {}) if key not in seen]
+        for key in stale:
+            self.remove(provider, key)
+
+    def remove_provider(self, provider: str):
+        for key in list(self.provider_keys.get(provider, {})):
+            self.remove(provider, key)
+        self.provider_keys.pop(provider, None)
+
+    def _detach(self, provider: str, sig: str, match_key: str):
+        matches = self.provider_matches.get((provider, sig))
+        if matches is not None:
+            matches.pop(match_key, None)
+            if matches:
+                # Provider masih punya match lain di event ini: event tetap pakai odds match itu
+                event = self.events.get(sig)
+                survivor = next(reversed(matches.values()))
+                if event is not None and event['providers'].get(provider) is not survivor:
+                    event['providers'][provider] = survivor
+                    self.dirty.setdefault(sig, set()).add(provider)
+                return
+            del self.provider_matches[(provider, sig)]
+        
+        event = self.events.get(sig)
+        if event is None or event['providers'].pop(provider, None) is None:
+            return
+        if event['providers']:
+            self.dirty.setdefault(sig, set()).add(provider)
+        else:
+            del self.events[sig]
+            self.dirty.pop(sig, None)
+            self.expired.add(sig)
+            if self.fuzzy is not None:
+                self.fuzzy.remove_event(self._fuzzy_index, sig)
+                for alias in self._alias_sources.pop(sig, ()):
+                    if self.aliases.get(alias) == sig:
+                        del self.aliases[alias]
+
+    def mark_all_dirty(self):
+        for sig in self.events:
+            self.dirty.setdefault(sig, set())
+
+    def pop_changes(self) -> tuple:
+        """
+        ({signature: event} yang berubah, [signature expired], {signature: {provider yang berganti}})
+        sejak panggilan terakhir (provider kosong = detect ulang saja, mis. setelah mark_all_dirty)
+        """
+        changed = {sig: self.events[sig] for sig in self.dirty if sig in self.events}
+        expired = list(self.expired)
+        providers = self.dirty
+        self.dirty = {}
+        self.expired = set()
+        return changed, expired, providers
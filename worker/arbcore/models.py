@@ -0,0 +1,131 @@
+"""
+Representasi compact untuk hot path matcher/detector
+Match dan Odds pakai __slots__ (tanpa __dict__ per object), harga per market
+disimpan sebagai tuple (home/over, away/under) yang sudah di-resolve sekali saat parse.
+"""
+
+from typing import Dict, Optional, Tuple
+
+MARKETS = ('ft_hdp', 'ft_ou', 'ht_hdp', 'ht_ou')
+
+# Nama sisi per market di format dict (parser / wire)
+MARKET_SIDES = {
+    'ft_hdp': ('home', 'away'),
+    'ft_ou': ('over', 'under'),
+    'ht_hdp': ('home', 'away'),
+    'ht_ou': ('over', 'under'),
+}
+
+
+def parse_minute(time_str: Optional[str]) -> Optional[int]:
+    """
+    Menit pertandingan dari format C-Sport: "1H 20" -> 20, "HT" -> 45, "2H 10" -> 55.
+    Babak kedua mulai dari menit 45, angka polos dianggap menit. None kalau tidak bisa dibaca.
+    """
+    if not time_str:
+        return None
+    try:
+        time_str = time_str.strip().upper()
+        if time_str == 'HT':
+            return 45
+        parts = time_str.split()
+        if 'H' in parts[0]:
+            half = int(parts[0].replace('H', ''))
+            minute = int(parts[1]) if len(parts) > 1 else 0
+            return (half - 1) * 45 + minute
+        return int(time_str)
+    except (ValueError, IndexError):
+        return None
+
+
+class Odds:
+    """
+    Odds satu match: per market (home/over, away/under), None kalau market tidak ada.
+    Market yang ada tapi kedua sisinya kosong tetap (None, None) - provider tetap dihitung.
+    """
+
+    __slots__ = MARKETS
+
+    def __init__(self, ft_hdp: Tuple = None, ft_ou: Tuple = None, ht_hdp: Tuple = None, ht_ou: Tuple = None):
+        self.ft_hdp = ft_hdp
+        self.ft_ou = ft_ou
+        self.ht_hdp = ht_hdp
+        self.ht_ou = ht_ou
+
+    @classmethod
+    def from_dict(cls, odds: Optional[Dict]) -> 'Odds':
+        """{'ft_hdp': {'home': x, 'away': y}, 'ft_ou': {'over': x, 'under': y}, ...} -> Odds"""
+        if isinstance(odds, Odds):
+            return odds
+        if not odds:
+            return cls()
+        pairs = []
+        for market in MARKETS:
+            sides = odds.get(market)
+            if sides:
+                pairs.append((sides.get('home') or sides.get('over'), sides.get('away') or sides.get('under')))
+            else:
+                pairs.append(None)
+        return cls(*pairs)
+
+    def get(self, market: str) -> Optional[Tuple]:
+        return getattr(self, market, None)
+
+    def to_dict(self) -> Dict:
+        result = {}
+        for market in MARKETS:
+            pair = getattr(self, market)
+            if pair is not None:
+                first, second = MARKET_SIDES[market]
+                result[market] = {first: pair[0], second: pair[1]}
+        return result
+
+    def _key(self) -> Tuple:
+        return self.ft_hdp, self.ft_ou, self.ht_hdp, self.ht_ou
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Odds):
+            return NotImplemented
+        return self._key() == other._key()
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"Odds({self.to_dict()})"
+
+
+class Match:
+    """Satu match dari satu provider setelah normalisasi nama tim"""
+
+    __slots__ = ('provider', 'match_id', 'home_norm', 'away_norm', 'signature', 'odds', 'league', 'time', 'confidence')
+
+    def __init__(self, provider: Optional[str], match_id, home_norm: str, away_norm: str, signature: str,
+                 odds: Odds = None, league: Optional[str] = None, time: str = '', confidence: float = 1.0):
+        self.provider = provider
+        self.match_id = match_id
+        self.home_norm = home_norm
+        self.away_norm = away_norm
+        self.signature = signature
+        self.odds = odds if odds is not None else Odds()
+        self.league = league
+        self.time = time
+        self.confidence = confidence
+
+    def to_dict(self) -> Dict:
+        result = {slot: getattr(self, slot) for slot in self.__slots__}
+        result['odds'] = self.odds.to_dict()
+        return result
+
+    def _key(self) -> Tuple:
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Match):
+            return NotImplemented
+        # Update odds paling sering beda di odds: cek itu dulu sebelum semua field
+        return self.odds == other.odds and self._key() == other._key()
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"Match({self.provider!r}, {self.home_norm!r} vs {self.away_norm!r}, {self.odds!r})"
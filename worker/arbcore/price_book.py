@@ -0,0 +1,118 @@
+"""
+Best-price book per (event, market, side)
+Heap dengan lazy deletion: update O(log n), best O(1) amortized,
+termasuk saat harga provider terbaik ditarik.
+"""
+
+import heapq
+from itertools import count
+from typing import Dict, Iterator, Optional, Tuple
+
+
+class PriceBook:
+    """
+    Harga per provider untuk satu sisi market.
+    maximize=False -> best = harga terendah, maximize=True -> best = harga tertinggi.
+    Harga sama: provider yang lebih dulu masuk menang (sama dengan stable sort).
+    """
+
+    def __init__(self, maximize: bool = False):
+        self._sign = -1 if maximize else 1
+        self._heap = []
+        self._prices = {}  # provider -> (value, rank)
+        self._ranks = count()
+
+    def __len__(self) -> int:
+        return len(self._prices)
+
+    def __contains__(self, provider: str) -> bool:
+        return provider in self._prices
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._prices)
+
+    def get(self, provider: str) -> Optional[float]:
+        entry = self._prices.get(provider)
+        return entry[0] if entry else None
+
+    def update(self, provider: str, value: Optional[float], rank: int = None):
+        """
+        Set harga provider; value kosong (None/0) = harga ditarik.
+        rank = urutan tie-break (default: urutan pertama kali provider masuk).
+        """
+        if not value:
+            self.remove(provider)
+            return
+
+        entry = self._prices.get(provider)
+        if rank is None:
+            rank = entry[1] if entry is not None else next(self._ranks)
+        if entry == (value, rank):
+            return
+        self._prices[provider] = (value, rank)
+        heapq.heappush(self._heap, (self._sign * value, rank, provider, value))
+        self._maybe_compact()
+
+    def remove(self, provider: str):
+        if self._prices.pop(provider, None) is not None:
+            self._maybe_compact()
+
+    def sync(self, prices: Dict[str, Optional[float]]):
+        """
+        Samakan book dengan {provider: value}; provider yang tidak ada dihapus.
+        Tie-break mengikuti urutan dict (sama dengan stable sort atas dict itu).
+        """
+        for provider in [p for p in self._prices if p not in prices]:
+            self.remove(provider)
+        for rank, (provider, value) in enumerate(prices.items()):
+            self.update(provider, value, rank)
+
+    def best(self) -> Optional[Tuple[str, float]]:
+        """(provider, value) terbaik, None kalau book kosong"""
+        heap = self._heap
+        while heap:
+            _, rank, provider, value = heap[0]
+            if self._prices.get(provider) == (value, rank):
+                return provider, value
+            heapq.heappop(heap)  # entry basi (harga berubah / ditarik)
+        return None
+
+    def _maybe_compact(self):
+        if len(self._heap) > 2 * len(self._prices) + 16:
+            self._heap = [(self._sign * value, rank, provider, value)
+                          for provider, (value, rank) in self._prices.items()]
+            heapq.heapify(self._heap)
+
+
+class MarketBook:
+    """Dua sisi satu (event, market): home/over (harga terendah) dan away/under (harga tertinggi)"""
+
+    __slots__ = ('home', 'away', 'providers')
+
+    def __init__(self):
+        self.home = PriceBook(maximize=False)
+        self.away = PriceBook(maximize=True)
+        self.providers = set()  # provider yang punya market ini (juga kalau kedua sisi kosong)
+
+    def sync(self, prices_by_provider: Dict[str, Tuple]):
+        """prices_by_provider = {provider: (home/over, away/under)} (lihat Odds)"""
+        self.providers = set(prices_by_provider)
+        self.home.sync({p: pair[0] for p, pair in prices_by_provider.items()})
+        self.away.sync({p: pair[1] for p, pair in prices_by_provider.items()})
+
+    def update(self, provider: str, pair: Optional[Tuple], rank: int = None):
+        """Harga satu provider; pair None = provider tidak punya market ini (lagi). rank: lihat PriceBook.update"""
+        if pair is None:
+            self.remove(provider)
+            return
+        self.providers.add(provider)
+        self.home.update(provider, pair[0], rank)
+        self.away.update(provider, pair[1], rank)
+
+    def remove(self, provider: str):
+        self.providers.discard(provider)
+        self.home.remove(provider)
+        self.away.remove(provider)
+
+    def best(self) -> Tuple[Optional[Tuple[str, float]], Optional[Tuple[str, float]]]:
+        return self.home.best(), self.away.best()
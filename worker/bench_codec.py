@@ -0,0 +1,43 @@
+"""
+Benchmark codec odds_update: encode / decode time dan payload size per codec
+(json, orjson, msgpack - yang tidak ter-install di-skip)
+Usage: python bench_codec.py [matches ...]
+"""
+
+import sys
+
+from bench_parser import best_of, make_feed
+from csport_parser_final_fixed import CSportOddsParser
+from utils.codec import CODECS, available_codecs, get_codec
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [5000]
+    parser = CSportOddsParser()
+    codecs = [get_codec(name) for name in available_codecs(CODECS)]
+    skipped = [name for name in CODECS if name not in available_codecs(CODECS)]
+    if skipped:
+        print(f"[!] Not installed, skipped: {', '.join(skipped)}")
+
+    for n in sizes:
+        feed = make_feed(n)
+        message = parser.parse_response(feed)
+        print(f"\nodds_update {message['total_matches']} matches")
+        print(f"{'codec':>8} | {'encode ms':>10} | {'decode ms':>10} | {'bytes':>10} | {'col.parse+to_list+encode ms':>27}")
+        print("-" * 78)
+
+        for codec in codecs:
+            payload = codec.dumps(message)
+            assert codec.loads(payload)['matches'] == message['matches'], f"{codec.name} round trip mismatch"
+
+            t_encode = best_of(lambda: codec.dumps(message))
+            t_decode = best_of(lambda: codec.loads(payload))
+            t_direct = best_of(lambda: parser.parse_response_encoded(feed, codec))
+            size = len(payload.encode() if isinstance(payload, str) else payload)
+
+            print(f"{codec.name:>8} | {t_encode * 1000:>10.2f} | {t_decode * 1000:>10.2f} | "
+                  f"{size:>10,} | {t_direct * 1000:>27.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark FuzzyEventMatcher: dua feed provider @ 10k match
+Feed kedua memakai variasi nama ("FC", tag player, typo kecil, home/away tertukar) dan
+nama league gaya lain ("England League 3" vs "ENG LEAGUE 3", sebagian nama lain sama sekali).
+Field seperti output parser: league, time live ("1H 20"), last_update - tanpa 'kickoff'.
+Usage: python bench_fuzzy_matcher.py [matches_per_feed]
+"""
+
+import random
+import sys
+import time
+
+from arbcore import FuzzyEventMatcher
+
+PREFIXES = ["Real", "Atletico", "Sporting", "Dynamo", "Olympic", "Union", "Racing", "Inter", "United", "City"]
+CITIES = ["Madrid", "Lisbon", "Kyiv", "Lyon", "Berlin", "Milan", "Porto", "Leeds", "Bergen", "Malmo",
+          "Sevilla", "Napoli", "Basel", "Gent", "Braga", "Zagreb", "Split", "Turku", "Oslo", "Riga"]
+COUNTRIES = [("England", "ENG"), ("Spain", "ESP"), ("Germany", "GER"), ("Italy", "ITA"), ("France", "FRA"),
+             ("Netherlands", "NED"), ("Portugal", "POR"), ("Brazil", "BRA"), ("Argentina", "ARG"), ("Japan", "JPN")]
+# (nama league di feed A, nama di feed B): 1 dari 8 league namanya beda total di feed B
+LEAGUES = [
+    (f"{COUNTRIES[i % 10][0]} League {i}",
+     f"{COUNTRIES[i % 10][1]} LEAGUE {i}" if i % 8 else f"{COUNTRIES[i % 10][1]} CUP SERIES {i}")
+    for i in range(40)
+]
+
+
+def make_team(rng: random.Random, i: int) -> str:
+    return f"{rng.choice(PREFIXES)} {rng.choice(CITIES)} {i}"
+
+
+def vary(rng: random.Random, name: str) -> str:
+    roll = rng.random()
+    if roll < 0.3:
+        return f"{name} FC"
+    if roll < 0.5:
+        return f"{name} (Player{rng.randint(1, 99)})"
+    if roll < 0.6 and len(name) > 6:
+        k = rng.randrange(1, len(name) - 1)
+        return name[:k] + name[k + 1:]  # typo: huruf hilang
+    return name
+
+
+def live_time(minute: int) -> str:
+    return f"1H {minute}" if minute < 45 else f"2H {minute - 45}"
+
+
+def make_feeds(n: int, seed: int = 5):
+    rng = random.Random(seed)
+    feed_a, feed_b = [], []
+    now = 1_700_000_000
+    for i in range(n):
+        home, away = make_team(rng, 2 * i), make_team(rng, 2 * i + 1)
+        league_a, league_b = rng.choice(LEAGUES)
+        minute = rng.randrange(0, 90)
+        feed_a.append({'match_id': f"a{i}", 'home_team': home, 'away_team': away, 'league': league_a,
+                       'time': live_time(minute), 'last_update': now, 'odds': {}})
+        b_home, b_away = vary(rng, home), vary(rng, away)
+        if rng.random() < 0.1:
+            b_home, b_away = b_away, b_home
+        # Jam feed B bisa telat / menit dibulatkan beda
+        feed_b.append({'match_id': f"b{i}", 'home_team': b_home, 'away_team': b_away, 'league': league_b,
+                       'time': live_time(max(0, minute + rng.randrange(-1, 2))),
+                       'last_update': now + rng.randrange(0, 5), 'odds': {}})
+    rng.shuffle(feed_b)
+    return feed_a, feed_b
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    feed_a, feed_b = make_feeds(n)
+
+    matcher = FuzzyEventMatcher()
+    start = time.perf_counter()
+    grouped = matcher.match_events({'nova': feed_a, 'saba': feed_b})
+    elapsed = time.perf_counter() - start
+
+    paired = correct = 0
+    confidences = []
+    for event in grouped.values():
+        providers = event['providers']
+        if len(providers) == 2:
+            paired += 1
+            confidences.append(providers['saba'].confidence)
+            # Ground truth: a<i> <-> b<i>
+            if providers['nova'].match_id[1:] == providers['saba'].match_id[1:]:
+                correct += 1
+
+    print(f"Feeds: 2 x {n:,} matches | events: {len(grouped):,} | paired: {paired:,} ({paired / n:.1%})")
+    print(f"  correct pairs:   {correct:,} ({correct / max(paired, 1):.1%})")
+    print(f"  min confidence:  {min(confidences, default=0):.3f}")
+    print(f"  match_events:    {elapsed * 1000:.1f} ms ({2 * n / elapsed:,.0f} matches/s)")
+
+
+if __name__ == '__main__':
+    main()
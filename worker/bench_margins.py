@@ -0,0 +1,95 @@
+"""
+Benchmark + equivalence check: scalar calculate_margin vs batch_margins (NumPy kernel)
+Kernel saja (input sudah array); detect_opportunities end-to-end ditampilkan sebagai konteks:
+di sana waktu habis untuk mengumpulkan harga dari dict provider, bukan untuk margin.
+Usage: python bench_margins.py [event_markets]
+"""
+
+import random
+import sys
+import time
+
+from arbcore import MARKETS, ArbitrageDetector, Match, Odds
+
+PROVIDERS = ['nova', 'saba', 'csport', 'sbo']
+
+
+def random_price(rng: random.Random):
+    roll = rng.random()
+    if roll < 0.05:
+        return None
+    if roll < 0.07:
+        return -999
+    return round(rng.uniform(0.4, 1.6), 2)
+
+
+def make_grouped(event_markets: int, seed: int = 9) -> dict:
+    rng = random.Random(seed)
+    grouped = {}
+    for i in range(event_markets // len(MARKETS)):
+        providers = {}
+        for provider in rng.sample(PROVIDERS, rng.randint(2, len(PROVIDERS))):
+            odds = Odds.from_dict({
+                'ft_hdp': {'home': random_price(rng), 'away': random_price(rng)},
+                'ft_ou': {'over': random_price(rng), 'under': random_price(rng)},
+                'ht_hdp': {'home': random_price(rng), 'away': random_price(rng)},
+                'ht_ou': {'over': random_price(rng), 'under': random_price(rng)},
+            })
+            providers[provider] = Match(provider, i, f"h{i}", f"a{i}", f"event_{i}", odds)
+        grouped[f"event_{i}"] = {'providers': providers, 'match_info': {'home': f"h{i}", 'away': f"a{i}", 'time': '1H 10'}}
+    return grouped
+
+
+def scalar_margins(detector: ArbitrageDetector, home_odds, away_odds):
+    min_pct = detector.settings['min_percent']
+    max_pct = detector.settings['max_percent']
+    result = []
+    for home, away in zip(home_odds, away_odds):
+        margin = detector.calculate_margin(home, away)
+        keep = bool(margin) and min_pct <= margin <= max_pct
+        result.append((margin, keep, detector.margin_tier(margin) if margin is not None else None))
+    return result
+
+
+def best_of(func, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    detector = ArbitrageDetector()
+    rng = random.Random(1)
+
+    # 1. Margin kernel
+    home_odds = [rng.choice([round(rng.uniform(0.4, 1.6), 2), -1.0, 0.0]) for _ in range(n)]
+    away_odds = [round(rng.uniform(0.4, 1.6), 2) for _ in range(n)]
+
+    expected = scalar_margins(detector, home_odds, away_odds)
+    margins, mask, tiers = detector.batch_margins(home_odds, away_odds)
+    for i, (margin, keep, tier) in enumerate(expected):
+        assert bool(mask[i]) == keep, (i, margin, margins[i])
+        if margin is not None:
+            assert float(margins[i]) == margin and int(tiers[i]) == tier, (i, margin, margins[i])
+
+    t_scalar = best_of(lambda: scalar_margins(detector, home_odds, away_odds))
+    t_batch = best_of(lambda: detector.batch_margins(home_odds, away_odds))
+
+    # 2. Full detection (scalar path, konteks)
+    grouped = make_grouped(n)
+    opportunities = detector.detect_opportunities(grouped)
+    assert all(o['margin_tier'] == detector.margin_tier(o['margin']) for o in opportunities)
+    t_detect = best_of(lambda: detector.detect_opportunities(grouped))
+
+    print(f"Event-markets: {n:,} (equivalence OK)")
+    print(f"  margin scalar:               {t_scalar * 1000:8.1f} ms")
+    print(f"  margin batch (kernel):       {t_batch * 1000:8.1f} ms  ({t_scalar / t_batch:.0f}x)")
+    print(f"  detect_opportunities:        {t_detect * 1000:8.1f} ms  ({len(opportunities):,} opportunities)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark C-Sport parser: parse_response vs parse_response_columnar
+Usage: python bench_parser.py [rows ...]
+"""
+
+import random
+import sys
+import time
+
+from csport_parser_final_fixed import CSportOddsParser
+
+TEAMS = ["Chelsea", "Tottenham Hotspur", "Galatasaray", "Sporting Lisbon", "Arsenal",
+         "Liverpool", "Real Madrid", "Barcelona", "Juventus", "Inter", "Ajax", "Porto"]
+PLAYERS = ["hotShot", "GianniKid", "Professor", "Jetli", "Kodak", "Nightmare"]
+LEAGUES = ["ESOCCER BATTLE - 8 MINS PLAY", "ESOCCER GT LEAGUES - 12 MINS PLAY", "ESOCCER H2H GG LEAGUE"]
+
+
+def random_odds(rng: random.Random):
+    return -999 if rng.random() < 0.2 else round(rng.uniform(0.5, 1.5), 2)
+
+
+def make_row(rng: random.Random, match_id: int) -> list:
+    home, away = rng.sample(TEAMS, 2)
+    return [
+        match_id, 0, 0, 64991, "Soccer", "00995000", 0, str(rng.randint(0, 5)), str(rng.randint(0, 5)), 0,
+        0.25, 0, 6.25, 0, -999, "4.5/5", -999, -999, -999, -999, -999, -999, -999, 1, 0, 1, 0, 0, 0, 0,
+        "1", "00000000", "639008818800000000", 1, "a1409798", "", ["00995000"],
+        rng.choice(LEAGUES), f"{home} ({rng.choice(PLAYERS)})", f"{away} ({rng.choice(PLAYERS)})",
+        random_odds(rng), random_odds(rng), random_odds(rng), random_odds(rng),
+        -999, -999, -999, -999, -999, -999, 0, "S",
+        rng.choice(["Live", "Pre"]), f"{rng.choice(['1H', '2H'])} {rng.randint(0, 45)}"
+    ]
+
+
+def make_feed(n: int, seed: int = 7) -> dict:
+    rng = random.Random(seed)
+    data = [make_row(rng, 23000000 + i) for i in range(n)]
+    # Edge rows: terlalu pendek, score invalid, team kosong, odds non-numeric, tanpa status/time
+    data += [
+        [1, 2, 3],
+        make_row(rng, 1)[:7] + ["x", "1"] + make_row(rng, 1)[9:],
+        make_row(rng, 2)[:38] + ["", "Away"] + make_row(rng, 2)[40:],
+        make_row(rng, 3)[:40] + ["0.9", True, None, 2.5] + make_row(rng, 3)[44:],
+        make_row(rng, 4)[:44],
+    ]
+    return {'data': data}
+
+
+def strip_timestamps(matches) -> list:
+    return [{k: v for k, v in m.items() if k != 'last_update'} for m in matches]
+
+
+def best_of(func, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+    parser = CSportOddsParser()
+
+    print(f"{'rows':>8} | {'dict rows/s':>12} | {'columnar rows/s':>15} | {'col+materialize':>15}")
+    print("-" * 60)
+
+    for n in sizes:
+        feed = make_feed(n)
+
+        expected = parser.parse_response(feed)['matches']
+        columnar = parser.parse_response_columnar(feed)['matches']
+        assert strip_timestamps(columnar) == strip_timestamps(expected), "columnar output mismatch"
+
+        t_dict = best_of(lambda: parser.parse_response(feed))
+        t_col = best_of(lambda: parser.parse_response_columnar(feed))
+        t_full = best_of(lambda: parser.parse_response_columnar(feed)['matches'].to_list())
+
+        print(f"{n:>8} | {n / t_dict:>12,.0f} | {n / t_col:>15,.0f} | {n / t_full:>15,.0f}")
+
+
+if __name__ == '__main__':
+    main()
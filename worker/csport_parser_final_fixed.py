@@ -1,11 +1,161 @@
 import json
 import time
+from collections.abc import Sequence
+from operator import itemgetter
+from typing import Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from orjson import loads as _loads
+except ImportError:
+    _loads = json.loads
+
+# Market -> (sisi index 40-43, sisi opposite)
+MARKET_SIDES = (
+    ('ft_hdp', 'home', 'away'),
+    ('ft_ou', 'over', 'under'),
+    ('ht_hdp', 'home', 'away'),
+    ('ht_ou', 'over', 'under'),
+)
+
+# Index yang dipakai parser: id, score home/away, league, teams, odds, status, time
+COLUMN_INDICES = (0, 7, 8, 37, 38, 39, 40, 41, 42, 43, 52, 53)
+_extract_columns = itemgetter(*COLUMN_INDICES)
+_ROW_WIDTH = COLUMN_INDICES[-1] + 1
+_NUMERIC_TYPES = {int, float}
+
+
+# Cell yang menentukan isi match dict (score, league, teams, odds, status, time)
+_extract_fingerprint = itemgetter(*COLUMN_INDICES[1:])
+
+
+def row_fingerprint(item: list) -> tuple:
+    """Fingerprint cell odds/score/time - row dengan fingerprint sama menghasilkan match yang sama"""
+    if len(item) < _ROW_WIDTH:
+        item = item + [None] * (_ROW_WIDTH - len(item))
+    return _extract_fingerprint(item)
+
+
+class ColumnarMatches(Sequence):
+    """
+    Lazy match list dari columnar parse.
+    Odds disimpan sebagai NumPy array (n x 4), dict per match baru dibuat saat diakses.
+    """
+    
+    def __init__(self, rows, match_ids, leagues, home_teams, away_teams,
+                 home_scores, away_scores, statuses, times, odds, opposite, last_update):
+        self.rows = rows                # index row (di data array) yang lolos filter
+        self.match_ids = match_ids
+        self.leagues = leagues
+        self.home_teams = home_teams    # sudah dinormalisasi, sejajar dengan rows
+        self.away_teams = away_teams
+        self.home_scores = home_scores  # int per row, None = row invalid
+        self.away_scores = away_scores
+        self.statuses = statuses
+        self.times = times
+        self.odds = odds                # float64 (n_rows x 4), NaN = tidak ada odds
+        self.opposite = opposite        # 2.00 - odds
+        self.last_update = last_update
+        self._cache = {}
+    
+    def __len__(self) -> int:
+        return len(self.rows)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('match index out of range')
+        
+        match = self._cache.get(index)
+        if match is None:
+            match = self._cache[index] = self._build_match(index)
+        return match
+    
+    def __eq__(self, other):
+        if isinstance(other, (list, ColumnarMatches)):
+            return list(self) == list(other)
+        return NotImplemented
+    
+    def _build_match(self, index: int) -> dict:
+        r = int(self.rows[index])
+        
+        odds = {}
+        row_odds = self.odds[r].tolist()
+        row_opposite = self.opposite[r].tolist()
+        for (market, side, opposite_side), value, opposite in zip(MARKET_SIDES, row_odds, row_opposite):
+            if value != value:  # NaN
+                odds[market] = {side: None, opposite_side: None}
+            else:
+                odds[market] = {side: round(value, 2), opposite_side: round(opposite, 2)}
+        
+        league = self.leagues[r]
+        time_str = self.times[r]
+        
+        return {
+            'match_id': str(self.match_ids[r]),
+            'league': league if isinstance(league, str) else 'Unknown',
+            'home_team': self.home_teams[index],
+            'away_team': self.away_teams[index],
+            'score': f"{self.home_scores[r]}:{self.away_scores[r]}",
+            'time': time_str if isinstance(time_str, str) else '',
+            'status': 'live' if self.statuses[r] == 'Live' else 'pre-match',
+            'odds': odds,
+            'last_update': self.last_update
+        }
+    
+    def to_list(self) -> list:
+        return list(self)
+
+
+def _to_int_column(values) -> list:
+    """int() per cell, None kalau gagal (row akan di-skip)"""
+    try:
+        return list(map(int, values))
+    except (TypeError, ValueError, OverflowError):
+        pass
+    
+    result = []
+    for value in values:
+        try:
+            result.append(int(value))
+        except (TypeError, ValueError, OverflowError):
+            result.append(None)
+    return result
+
+
+def _odds_block(columns) -> "np.ndarray":
+    """Kolom 40-43 -> float64 (n x 4), non-numeric jadi NaN"""
+    if set().union(*(map(type, col) for col in columns)) <= _NUMERIC_TYPES:
+        try:
+            return np.array(columns, dtype=np.float64).T
+        except OverflowError:
+            pass
+    
+    # Slow path: sama persis dengan extract_odds_from_array (error -> semua None)
+    block = np.full((len(columns[0]), len(columns)), np.nan)
+    for r, cells in enumerate(zip(*columns)):
+        try:
+            block[r] = [float(v) if isinstance(v, (int, float)) else np.nan for v in cells]
+        except Exception:
+            block[r] = np.nan
+    return block
+
 
 class CSportOddsParser:
     """Parse C-Sport JSON - FINAL FIXED"""
     
     def __init__(self):
         self.provider = "C-Sport"
+        self._team_cache = {}
+        self.team_cache_limit = 50000
+        self._snapshot = {}  # match_id -> (fingerprint, match dict / None)
     
     def normalize_team_name(self, name: str) -> str:
         if not name:
@@ -82,40 +232,59 @@ class CSportOddsParser:
             'time': time_str
         }
     
+    def _normalize_team_cached(self, name) -> str:
+        if type(name) is not str:
+            return self.normalize_team_name(name)
+        
+        cached = self._team_cache.get(name)
+        if cached is None:
+            if len(self._team_cache) >= self.team_cache_limit:
+                self._team_cache.clear()
+            cached = self._team_cache[name] = self.normalize_team_name(name)
+        return cached
+    
+    def parse_row(self, item: list) -> Optional[dict]:
+        """Parse satu row C-Sport, None kalau row invalid"""
+        if not isinstance(item, list) or len(item) < 44:
+            return None
+        
+        try:
+            match_id = str(item[0])
+            home_score = int(item[7]) if len(item) > 7 else 0
+            away_score = int(item[8]) if len(item) > 8 else 0
+            
+            string_info = self.extract_strings_from_array(item)
+            odds_info = self.extract_odds_from_array(item)
+            
+            match = {
+                'match_id': match_id,
+                'league': string_info['league'],
+                'home_team': string_info['home_team'],
+                'away_team': string_info['away_team'],
+                'score': f"{home_score}:{away_score}",
+                'time': string_info['time'],
+                'status': string_info['status'],
+                'odds': odds_info,
+                'last_update': int(time.time())
+            }
+            
+            if match['home_team'] != 'Unknown' and match['away_team'] != 'Unknown':
+                return match
+        
+        except Exception as e:
+            pass
+        
+        return None
+    
     def parse_response(self, api_response: dict) -> dict:
         """Parse C-Sport API response"""
         data_array = api_response.get('data', [])
         matches = []
         
         for item in data_array:
-            if not isinstance(item, list) or len(item) < 44:
-                continue
-            
-            try:
-                match_id = str(item[0])
-                home_score = int(item[7]) if len(item) > 7 else 0
-                away_score = int(item[8]) if len(item) > 8 else 0
-                
-                string_info = self.extract_strings_from_array(item)
-                odds_info = self.extract_odds_from_array(item)
-                
-                match = {
-                    'match_id': match_id,
-                    'league': string_info['league'],
-                    'home_team': string_info['home_team'],
-                    'away_team': string_info['away_team'],
-                    'score': f"{home_score}:{away_score}",
-                    'time': string_info['time'],
-                    'status': string_info['status'],
-                    'odds': odds_info,
-                    'last_update': int(time.time())
-                }
-                
-                if match['home_team'] != 'Unknown' and match['away_team'] != 'Unknown':
-                    matches.append(match)
-            
-            except Exception as e:
-                pass
+            match = self.parse_row(item)
+            if match is not None:
+                matches.append(match)
         
         output = {
             'type': 'odds_update',
@@ -128,6 +297,156 @@ class CSportOddsParser:
         }
         
         return output
+    
+    def parse_delta(self, api_response: dict) -> dict:
+        """
+        Incremental parse: bandingkan dengan snapshot sebelumnya (key = item[0]).
+        Row dengan fingerprint sama di-skip sebelum dict dibuat.
+        Output: added / changed / removed (match_id) terhadap poll sebelumnya.
+        """
+        previous = self._snapshot
+        current = {}
+        added = []
+        changed = []
+        
+        for item in api_response.get('data', []):
+            if not isinstance(item, list) or len(item) < 44:
+                continue
+            
+            match_id = str(item[0])
+            fingerprint = row_fingerprint(item)
+            entry = previous.get(match_id)
+            
+            if entry is not None and entry[0] == fingerprint:
+                current[match_id] = entry
+                continue
+            
+            match = self.parse_row(item)
+            current[match_id] = (fingerprint, match)
+            
+            if match is None:
+                continue
+            if entry is not None and entry[1] is not None:
+                changed.append(match)
+            else:
+                added.append(match)
+        
+        removed = [
+            match_id for match_id, entry in previous.items()
+            if entry[1] is not None and (match_id not in current or current[match_id][1] is None)
+        ]
+        self._snapshot = current
+        
+        return {
+            'type': 'odds_delta',
+            'provider': self.provider,
+            'timestamp': int(time.time()),
+            'total_matches': sum(1 for entry in current.values() if entry[1] is not None),
+            'added': added,
+            'changed': changed,
+            'removed': removed
+        }
+    
+    def parse_delta_bytes(self, body: bytes) -> dict:
+        """parse_delta langsung dari body HTTP (bytes), tanpa decode ke str dulu"""
+        return self.parse_delta(_loads(body))
+    
+    def unchanged_delta(self) -> dict:
+        """Delta kosong untuk poll tanpa perubahan (mis. HTTP 304), snapshot tetap"""
+        return {
+            'type': 'odds_delta',
+            'provider': self.provider,
+            'timestamp': int(time.time()),
+            'total_matches': sum(1 for entry in self._snapshot.values() if entry[1] is not None),
+            'added': [],
+            'changed': [],
+            'removed': []
+        }
+    
+    def snapshot(self) -> list:
+        """Semua match valid dari snapshot terakhir parse_delta"""
+        return [entry[1] for entry in self._snapshot.values() if entry[1] is not None]
+    
+    def reset_snapshot(self):
+        """Lupakan snapshot - parse_delta berikutnya mengirim semua match sebagai added"""
+        self._snapshot = {}
+    
+    def parse_response_columnar(self, api_response: dict) -> dict:
+        """
+        Columnar parse: semua kolom diambil dalam satu pass ke NumPy array,
+        -999 di-mask dan opposite odds dihitung sebagai satu vector op.
+        Output sama dengan parse_response, tapi 'matches' berupa ColumnarMatches (lazy).
+        """
+        if np is None:
+            return self.parse_response(api_response)
+        
+        rows = [
+            item if len(item) >= _ROW_WIDTH else item + [None] * (_ROW_WIDTH - len(item))
+            for item in api_response.get('data', [])
+            if isinstance(item, list) and len(item) >= 44
+        ]
+        columns = list(zip(*map(_extract_columns, rows))) or [()] * len(COLUMN_INDICES)
+        (ids, home_raw, away_raw, leagues, home_names, away_names,
+         ft_hdp, ft_ou, ht_hdp, ht_ou, statuses, times) = columns
+        
+        home_scores = _to_int_column(home_raw)
+        away_scores = _to_int_column(away_raw)
+        
+        keep = []
+        home_teams = []
+        away_teams = []
+        for r, (home_score, away_score, home, away) in enumerate(zip(home_scores, away_scores, home_names, away_names)):
+            if home_score is None or away_score is None:
+                continue
+            try:
+                home = self._normalize_team_cached(home)
+                away = self._normalize_team_cached(away)
+            except Exception:
+                continue
+            if home != 'Unknown' and away != 'Unknown':
+                keep.append(r)
+                home_teams.append(home)
+                away_teams.append(away)
+        
+        odds = _odds_block([ft_hdp, ft_ou, ht_hdp, ht_ou])
+        odds[~(odds > 0)] = np.nan
+        opposite = 2.00 - odds
+        
+        now = int(time.time())
+        matches = ColumnarMatches(
+            rows=np.array(keep, dtype=np.int64),
+            match_ids=ids,
+            leagues=leagues,
+            home_teams=home_teams,
+            away_teams=away_teams,
+            home_scores=home_scores,
+            away_scores=away_scores,
+            statuses=statuses,
+            times=times,
+            odds=odds,
+            opposite=opposite,
+            last_update=now
+        )
+        
+        return {
+            'type': 'odds_update',
+            'provider': self.provider,
+            'ping': 18,
+            'healthy': True,
+            'timestamp': now,
+            'total_matches': len(matches),
+            'matches': matches
+        }
+
+    
+    def parse_response_encoded(self, api_response: dict, codec, columnar: bool = True):
+        """
+        Parse + serialize odds_update langsung ke format codec (utils.codec: json/orjson/msgpack).
+        Columnar path: encoder tetap membangun list dict match lewat ColumnarMatches.to_list()
+        (di codec _default), jadi hematnya cuma dari parse columnar, bukan dari encode.
+        """
+        parse = self.parse_response_columnar if columnar else self.parse_response
+        return codec.dumps(parse(api_response))
 
 
 def test_parser():
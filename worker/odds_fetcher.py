@@ -0,0 +1,272 @@
+"""
+Odds fetcher: HTTP polling feed provider (async)
+Satu aiohttp ClientSession (keep-alive pool) per provider, cookie dari ProviderSession,
+gzip/deflate (+ brotli kalau package Brotli ada), conditional request ETag /
+If-Modified-Since. fetch() return body bytes mentah untuk parser, None kalau 304.
+
+Stub server lokal (stdlib, tanpa dependency) untuk test:
+    python odds_fetcher.py stub [port]
+    python odds_fetcher.py self-test
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    import brotli  # noqa: F401 - aiohttp auto_decompress pakai ini untuk 'br'
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+# Contoh row feed C-Sport (payload default stub server)
+SAMPLE_ROW = [23230149, 0, 0, 64991, "Soccer", "00995000", 0, "1", "2", 0,
+    0.25, 0, 6.25, 0, -999, "4.5/5", -999, -999, -999, -999, -999, -999, -999, 1, 0, 1, 0, 0, 0, 0,
+    "1", "00000000", "639008818800000000", 1, "a1409798", "", ["00995000"],
+    "ESOCCER BATTLE - 8 MINS PLAY", "Chelsea (hotShot)", "Tottenham Hotspur (GianniKid)",
+    0.72, 0.98, 0.95, 0.65, -999, -999, -999, -999, -999, -999, 0, "S", "Live", "1H 3"]
+
+
+class FetchError(Exception):
+    """Response non-2xx/304 dari feed (401/403 biasanya berarti session expired)"""
+
+    def __init__(self, status: int, url: str):
+        super().__init__(f"HTTP {status} from {url}")
+        self.status = status
+
+
+class OddsFetcher:
+    """HTTP poller satu feed provider dengan connection reuse + conditional GET"""
+
+    def __init__(self, provider: str, url: str, session_manager=None, timeout: float = 5.0,
+                 headers: Dict = None, pool_size: int = 4):
+        self.provider = provider
+        self.url = url
+        self.session_manager = session_manager
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.headers = {'Accept': 'application/json', 'Accept-Encoding': ACCEPT_ENCODING}
+        self.headers.update(headers or {})
+
+        self.etag = None
+        self.last_modified = None
+        self.last_fetch_ms = 0.0
+        self.last_status = None
+        self.stats = {'requests': 0, 'not_modified': 0, 'errors': 0, 'bytes': 0}
+
+        self._client = None
+        self._cookie_source = None   # session dict terakhir yang dipakai untuk Cookie header
+        self._cookie_header = None
+
+    def _get_client(self):
+        if self._client is None or self._client.closed:
+            if aiohttp is None:
+                raise RuntimeError("aiohttp is required for OddsFetcher (pip install aiohttp)")
+            connector = aiohttp.TCPConnector(limit_per_host=self.pool_size, keepalive_timeout=60, ttl_dns_cache=300)
+            self._client = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                # Cookie dari ProviderSession dikirim manual per request, jar tidak dipakai
+                cookie_jar=aiohttp.DummyCookieJar()
+            )
+        return self._client
+
+    async def _request_headers(self) -> Dict:
+        headers = dict(self.headers)
+        session = await self.session_manager.load_session() if self.session_manager else None
+        if session is not None:
+            # Build ulang Cookie header hanya kalau session berganti (re-login / refresh)
+            if session is not self._cookie_source:
+                self._cookie_source = session
+                cookies = session.get('cookies') or {}
+                self._cookie_header = '; '.join(f"{name}={value}" for name, value in cookies.items())
+            if self._cookie_header:
+                headers['Cookie'] = self._cookie_header
+            if session.get('user_agent'):
+                headers['User-Agent'] = session['user_agent']
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    async def fetch(self) -> Optional[bytes]:
+        """
+        Satu GET ke feed.
+        Return body (sudah di-decompress) atau None kalau 304 Not Modified.
+        Raise FetchError untuk status lain.
+        """
+        client = self._get_client()
+        start = time.perf_counter()
+        self.stats['requests'] += 1
+        try:
+            async with client.get(self.url, headers=await self._request_headers()) as response:
+                self.last_status = response.status
+                if response.status == 304:
+                    self.stats['not_modified'] += 1
+                    return None
+                if response.status >= 400:
+                    raise FetchError(response.status, self.url)
+                body = await response.read()
+                self.etag = response.headers.get('ETag')
+                self.last_modified = response.headers.get('Last-Modified')
+                self.stats['bytes'] += len(body)
+                return body
+        except Exception:
+            self.stats['errors'] += 1
+            raise
+        finally:
+            self.last_fetch_ms = (time.perf_counter() - start) * 1000
+
+    def reset_validators(self):
+        """Lupakan ETag/Last-Modified - fetch berikutnya pasti full body (mis. setelah parser reset)"""
+        self.etag = None
+        self.last_modified = None
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def do_GET(self):
+        server = self.server
+        server.requests += 1
+        with server.lock:
+            body, etag, last_modified = server.body, server.etag, server.last_modified
+
+        if self.headers.get('If-None-Match') == etag or (
+                not self.headers.get('If-None-Match') and self.headers.get('If-Modified-Since') == last_modified):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        server.last_cookie = self.headers.get('Cookie')
+        encoding = None
+        if 'gzip' in (self.headers.get('Accept-Encoding') or ''):
+            body = gzip.compress(body, compresslevel=5)
+            encoding = 'gzip'
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', last_modified)
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubOddsServer:
+    """HTTP server lokal yang melayani satu payload feed (ETag = hash body, gzip, keep-alive)"""
+
+    def __init__(self, port: int = 0, payload: Dict = None):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), _StubHandler)
+        self.httpd.lock = threading.Lock()
+        self.httpd.requests = 0
+        self.httpd.last_cookie = None
+        self.set_payload(payload or {'data': []})
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/odds"
+
+    def set_payload(self, payload: Dict):
+        body = json.dumps(payload, separators=(',', ':')).encode()
+        with self.httpd.lock:
+            self.httpd.body = body
+            self.httpd.etag = '"' + hashlib.md5(body).hexdigest() + '"'
+            self.httpd.last_modified = formatdate(usegmt=True)
+
+    def start(self) -> 'StubOddsServer':
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+async def self_test():
+    """Round trip fetcher <-> stub: full body, 304, body baru setelah payload berubah, cookie terkirim"""
+    from csport_parser_final_fixed import CSportOddsParser
+    from session_store import FileSessionStore, ProviderSession
+    import tempfile
+
+    row = SAMPLE_ROW
+    server = StubOddsServer(payload={'data': [row]}).start()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        session_manager = ProviderSession('C-Sport', 'test', store=FileSessionStore(f"{tmp}/sessions.json"))
+        await session_manager.save_session({'PHPSESSID': 'abc'})
+        fetcher = OddsFetcher('C-Sport', server.url, session_manager)
+        parser = CSportOddsParser()
+        try:
+            body = await fetcher.fetch()
+            first = parser.parse_delta_bytes(body)
+            print(f"200: {len(body)} bytes, {first['total_matches']} matches, {fetcher.last_fetch_ms:.1f}ms")
+
+            assert await fetcher.fetch() is None
+            print(f"304: {fetcher.last_fetch_ms:.1f}ms")
+
+            server.set_payload({'data': [row[:40] + [0.80] + row[41:]]})
+            delta = parser.parse_delta_bytes(await fetcher.fetch())
+            print(f"200: {len(delta['changed'])} changed, {fetcher.last_fetch_ms:.1f}ms")
+        finally:
+            await fetcher.close()
+            server.stop()
+
+    assert first['total_matches'] == 1 and len(delta['changed']) == 1, delta
+    assert server.httpd.last_cookie == 'PHPSESSID=abc', server.httpd.last_cookie
+    assert fetcher.stats['not_modified'] == 1, fetcher.stats
+    print(f"OK: {fetcher.stats}")
+
+
+def main():
+    """CLI tool for odds fetcher"""
+    import sys
+
+    if len(sys.argv) < 2 or sys.argv[1] not in ('stub', 'self-test'):
+        print("Usage:")
+        print("  python odds_fetcher.py stub [port]")
+        print("  python odds_fetcher.py self-test")
+        sys.exit(1)
+
+    if sys.argv[1] == 'self-test':
+        asyncio.run(self_test())
+        return
+
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8099
+    server = StubOddsServer(port, payload={'data': [SAMPLE_ROW]}).start()
+    print(f"Serving sample feed at {server.url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
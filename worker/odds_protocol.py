@@ -0,0 +1,175 @@
+"""
+Odds wire protocol: odds_delta + periodic odds_snapshot
+Worker hanya mengirim field yang berubah per match, backend merekonstruksi state.
+
+odds_snapshot: {'type', 'provider', 'seq', 'timestamp', 'total_matches', 'matches': [match, ...]}
+odds_delta:    {'type', 'provider', 'seq', 'timestamp', 'total_matches',
+                'upserts': [{'match_id': ..., <field yang berubah>}, ...], 'removed': [match_id, ...]}
+                + 'base_seq' kalau delta seq base_seq..seq digabung (buffer transport selama putus)
+"""
+
+import time
+from typing import Dict, List, Optional
+
+
+def diff_match(old: Dict, new: Dict) -> Dict:
+    """Field yang berubah dari old ke new (nested 'odds' di-diff per market/side)"""
+    changes = {}
+    for key, value in new.items():
+        old_value = old.get(key)
+        if value == old_value:
+            continue
+        if key == 'odds' and isinstance(value, dict) and isinstance(old_value, dict):
+            odds_changes = {}
+            for market, sides in value.items():
+                old_sides = old_value.get(market) or {}
+                market_changes = {side: v for side, v in sides.items() if side not in old_sides or old_sides[side] != v}
+                if market_changes:
+                    odds_changes[market] = market_changes
+            changes['odds'] = odds_changes
+        else:
+            changes[key] = value
+    return changes
+
+
+def merge_match(target: Dict, changes: Dict):
+    """Apply hasil diff_match ke match dict (in-place)"""
+    for key, value in changes.items():
+        if key == 'odds' and isinstance(target.get('odds'), dict):
+            for market, sides in value.items():
+                target['odds'].setdefault(market, {}).update(sides)
+        else:
+            target[key] = value
+
+
+class OddsDeltaEncoder:
+    """Worker side: ubah hasil CSportOddsParser.parse_delta jadi odds_delta / odds_snapshot"""
+
+    def __init__(self, provider: str, snapshot_interval: float = 30.0):
+        self.provider = provider
+        self.snapshot_interval = snapshot_interval
+        self.seq = 0
+        self.state = {}  # match_id -> match (yang sudah diketahui backend)
+        self.last_snapshot_at = None
+
+    def force_snapshot(self):
+        """Message berikutnya pasti odds_snapshot (mis. setelah reconnect)"""
+        self.last_snapshot_at = None
+
+    def send_failed(self):
+        """
+        Message dari encode() tidak sampai ke backend (dan tidak di-buffer transport).
+        State + seq sudah maju, jadi delta berikutnya akan gap di base_seq: encode() berikutnya
+        langsung kirim odds_snapshot (juga kalau tidak ada perubahan) supaya backend sync lagi.
+        """
+        self.force_snapshot()
+
+    def snapshot_due(self) -> bool:
+        if self.last_snapshot_at is None:
+            return True
+        return time.monotonic() - self.last_snapshot_at >= self.snapshot_interval
+
+    def encode(self, delta: Dict) -> Optional[Dict]:
+        """
+        delta = output parse_delta (added / changed / removed).
+        Return message untuk dikirim, atau None kalau tidak ada perubahan dan snapshot belum due.
+        State dianggap sudah diterima backend: kalau message gagal terkirim, panggil send_failed().
+        """
+        upserts = []
+        for match in delta['added'] + delta['changed']:
+            match_id = match['match_id']
+            old = self.state.get(match_id)
+            if old is None:
+                upserts.append(match)
+            else:
+                changes = diff_match(old, match)
+                if changes:
+                    changes['match_id'] = match_id
+                    upserts.append(changes)
+            self.state[match_id] = match
+
+        removed = [match_id for match_id in delta['removed'] if self.state.pop(match_id, None) is not None]
+
+        if self.snapshot_due():
+            return self.build_snapshot()
+
+        if not upserts and not removed:
+            return None
+
+        self.seq += 1
+        return {
+            'type': 'odds_delta',
+            'provider': self.provider,
+            'seq': self.seq,
+            'timestamp': int(time.time()),
+            'total_matches': len(self.state),
+            'upserts': upserts,
+            'removed': removed
+        }
+
+    def build_snapshot(self) -> Dict:
+        self.seq += 1
+        self.last_snapshot_at = time.monotonic()
+        return {
+            'type': 'odds_snapshot',
+            'provider': self.provider,
+            'seq': self.seq,
+            'timestamp': int(time.time()),
+            'total_matches': len(self.state),
+            'matches': list(self.state.values())
+        }
+
+
+class OddsStateReceiver:
+    """
+    Backend side: rekonstruksi state match per provider dari odds_snapshot / odds_delta.
+    Match dict di message dipakai langsung sebagai state (tanpa copy) dan di-merge in-place oleh
+    delta berikutnya: message harus milik receiver - frame hasil decode, bukan dict yang masih
+    dipakai pengirim (in-process: kirim hasil OddsDeltaEncoder lewat codec, atau copy dulu).
+    """
+
+    def __init__(self):
+        self.matches = {}   # provider -> {match_id: match}
+        self.last_seq = {}  # provider -> seq terakhir yang di-apply
+
+    def apply(self, message: Dict) -> bool:
+        """
+        Apply satu message (match di dalamnya jadi milik receiver). Return False kalau delta
+        out-of-order / belum ada snapshot (state provider tidak bisa dipercaya sampai snapshot berikutnya).
+        """
+        provider = message['provider']
+        msg_type = message.get('type')
+
+        if msg_type in ('odds_snapshot', 'odds_update'):
+            self.matches[provider] = {m['match_id']: m for m in message.get('matches', [])}
+            self.last_seq[provider] = message.get('seq', 0)
+            return True
+
+        if msg_type != 'odds_delta':
+            return False
+
+        base_seq = message.get('base_seq', message['seq'])
+        if provider not in self.matches or base_seq != self.last_seq.get(provider, 0) + 1:
+            self.matches.pop(provider, None)
+            self.last_seq.pop(provider, None)
+            return False
+
+        state = self.matches[provider]
+        for changes in message.get('upserts', []):
+            match_id = changes['match_id']
+            if match_id in state:
+                merge_match(state[match_id], changes)
+            else:
+                state[match_id] = changes
+        for match_id in message.get('removed', []):
+            state.pop(match_id, None)
+
+        self.last_seq[provider] = message['seq']
+        return True
+
+    def get_matches(self, provider: str) -> List[Dict]:
+        return list(self.matches.get(provider, {}).values())
+
+    def odds_by_provider(self) -> Dict[str, List[Dict]]:
+        """Format input BackendEngine.process_odds"""
+        return {provider: list(state.values()) for provider, state in self.matches.items()}
@@ -0,0 +1,80 @@
+"""
+Adaptive polling scheduler
+Fixed-rate clock (deadline dihitung dari awal tick, bukan setelah poll selesai -> tidak drift),
+interval per provider mengikuti change rate feed (live = cepat, pre-match/sepi = lambat),
+tidak lebih cepat dari latency response, dan exponential backoff + jitter saat error.
+"""
+
+import asyncio
+import random
+import time
+
+
+class AdaptivePollScheduler:
+    """Satu instance per provider/feed"""
+
+    def __init__(self, base_interval: float = 2.5, min_interval: float = 0.5, max_interval: float = 15.0,
+                 latency_factor: float = 2.0, max_backoff: float = 60.0, alpha: float = 0.3):
+        """
+        base_interval: interval awal (sebelum ada data change rate)
+        min_interval / max_interval: batas interval untuk feed paling aktif / paling sepi
+        latency_factor: interval minimal = latency_factor x latency rata-rata
+        max_backoff: batas delay saat error beruntun
+        alpha: bobot EWMA change rate / latency (besar = cepat bereaksi)
+        """
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.latency_factor = latency_factor
+        self.max_backoff = max_backoff
+        self.alpha = alpha
+
+        base_interval = min(max(base_interval, self.min_interval), self.max_interval)
+        span = self.max_interval - self.min_interval
+        # EWMA fraksi poll yang membawa perubahan (0 = tidak pernah, 1 = setiap poll)
+        self.change_rate = (self.max_interval - base_interval) / span if span else 1.0
+        self.latency = 0.0  # EWMA detik
+        self.interval = base_interval
+        self.errors = 0
+
+        self._next = None
+        self.stats = {'ticks': 0, 'missed': 0, 'errors': 0}
+
+    def start(self):
+        """Anchor clock ke sekarang (panggil tepat sebelum poll pertama)"""
+        self._next = time.monotonic()
+
+    def record(self, changed: bool, latency: float = 0.0, error: bool = False):
+        """Hasil satu poll: ada perubahan odds?, latency response (detik), gagal?"""
+        if error:
+            self.errors += 1
+            self.stats['errors'] += 1
+            return
+        self.errors = 0
+
+        a = self.alpha
+        self.change_rate = a * (1.0 if changed else 0.0) + (1 - a) * self.change_rate
+        self.latency = latency if self.latency == 0.0 else a * latency + (1 - a) * self.latency
+
+        interval = self.max_interval - (self.max_interval - self.min_interval) * self.change_rate
+        floor = max(self.min_interval, self.latency * self.latency_factor)
+        self.interval = min(max(interval, floor), self.max_interval)
+
+    def next_delay(self) -> float:
+        if self.errors:
+            backoff = min(self.max_backoff, self.interval * (2 ** self.errors))
+            return backoff * random.uniform(0.5, 1.0)  # jitter supaya worker tidak retry serentak
+        return self.interval
+
+    async def wait(self):
+        """Tidur sampai tick berikutnya (deadline = tick sebelumnya + delay)"""
+        now = time.monotonic()
+        if self._next is None:
+            self._next = now
+        self._next += self.next_delay()
+        self.stats['ticks'] += 1
+
+        if self._next < now:
+            # Poll lebih lama dari interval: skip tick yang terlewat, jangan burst
+            self.stats['missed'] += 1
+            self._next = now
+        await asyncio.sleep(self._next - now)
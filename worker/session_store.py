@@ -0,0 +1,335 @@
+"""
+Session store untuk worker polling (worker_websocket_v2 / worker_integration_v1)
+In-process cache di depan backend: file lokal (satu container) atau Redis
+(session terenkripsi per provider/account, TTL native Redis). Replica lain
+di-invalidate lewat Redis pub/sub setiap kali session disimpan/dihapus.
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+SESSION_KEY_PREFIX = 'session:enc'
+INVALIDATE_CHANNEL = 'session:invalidate'
+
+
+class SessionStore(ABC):
+    """
+    Interface backend session (async: dipanggil dari event loop poll worker).
+    session = {'cookies', 'user_agent', 'saved_at', 'expire_at'} (epoch seconds)
+    """
+
+    @abstractmethod
+    async def get(self, provider: str, account: str) -> Optional[Dict]:
+        ...
+
+    @abstractmethod
+    async def put(self, provider: str, account: str, session: Dict, ttl: float):
+        ...
+
+    @abstractmethod
+    async def delete(self, provider: str, account: str):
+        ...
+
+    async def close(self):
+        pass
+
+
+class FileSessionStore(SessionStore):
+    """
+    Satu file JSON {provider:account: session} - fallback tanpa Redis (tidak di-share antar container).
+    File I/O jalan di thread (asyncio.to_thread) supaya event loop tidak ke-block.
+    """
+
+    def __init__(self, path: str = '/app/session_backup.json'):
+        self.path = path
+
+    def _read(self) -> Dict:
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, sessions: Dict):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(sessions, f)
+        os.replace(tmp_path, self.path)
+
+    def _put(self, key: str, session: Dict):
+        now = time.time()
+        # Buang yang sudah expired sekalian
+        sessions = {k: s for k, s in self._read().items() if s.get('expire_at', 0) > now}
+        sessions[key] = session
+        self._write(sessions)
+
+    def _delete(self, key: str):
+        sessions = self._read()
+        if sessions.pop(key, None) is not None:
+            self._write(sessions)
+
+    async def get(self, provider: str, account: str) -> Optional[Dict]:
+        session = (await asyncio.to_thread(self._read)).get(f"{provider}:{account}")
+        if session and time.time() < session.get('expire_at', 0):
+            return session
+        return None
+
+    async def put(self, provider: str, account: str, session: Dict, ttl: float):
+        await asyncio.to_thread(self._put, f"{provider}:{account}", session)
+
+    async def delete(self, provider: str, account: str):
+        await asyncio.to_thread(self._delete, f"{provider}:{account}")
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Session terenkripsi (Fernet) di Redis, key session:enc:{provider}:{account}, TTL native (SET PX).
+    put/delete publish ke INVALIDATE_CHANNEL supaya cache replica lain dibuang.
+    """
+
+    def __init__(self, client, cipher, origin: str = None, prefix: str = SESSION_KEY_PREFIX,
+                 channel: str = INVALIDATE_CHANNEL):
+        self.client = client            # redis.asyncio client
+        self.cipher = cipher            # cryptography.fernet.Fernet (encrypt/decrypt bytes)
+        self.origin = origin or uuid.uuid4().hex
+        self.prefix = prefix
+        self.channel = channel
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+
+    def _key(self, provider: str, account: str) -> str:
+        return f"{self.prefix}:{provider}:{account}"
+
+    async def get(self, provider: str, account: str) -> Optional[Dict]:
+        key = self._key(provider, account)
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.get(key)
+            pipe.pttl(key)
+            token, ttl_ms = await pipe.execute()
+        if token is None:
+            return None
+        session = json.loads(self.cipher.decrypt(token))
+        if ttl_ms and ttl_ms > 0:
+            session['expire_at'] = time.time() + ttl_ms / 1000
+        return session
+
+    async def put(self, provider: str, account: str, session: Dict, ttl: float):
+        token = self.cipher.encrypt(json.dumps(session).encode())
+        await self.client.set(self._key(provider, account), token, px=max(1, int(ttl * 1000)))
+        await self._publish(provider, account)
+
+    async def delete(self, provider: str, account: str):
+        await self.client.delete(self._key(provider, account))
+        await self._publish(provider, account)
+
+    async def _publish(self, provider: str, account: str):
+        message = json.dumps({'provider': provider, 'account': account, 'origin': self.origin})
+        await self.client.publish(self.channel, message)
+
+    async def subscribe(self, callback: Callable[[str, str], None]):
+        """callback(provider, account) untuk perubahan dari replica lain (task listener di event loop)"""
+        self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(self.channel)
+        self._listener = asyncio.create_task(self._listen(callback))
+
+    async def _listen(self, callback: Callable[[str, str], None]):
+        async for message in self._pubsub.listen():
+            try:
+                data = json.loads(message['data'])
+            except (TypeError, ValueError):
+                continue
+            if data.get('origin') != self.origin:
+                callback(data.get('provider'), data.get('account'))
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.close()
+            self._pubsub = None
+        await self.client.close()
+
+
+class CachedSessionStore(SessionStore):
+    """
+    In-process cache; backend hanya dibaca saat miss, expired atau di-invalidate.
+    Expiry di-track pakai monotonic clock (tidak terpengaruh NTP / jam sistem loncat).
+    """
+
+    def __init__(self, backend: SessionStore):
+        self.backend = backend
+        self._cache: Dict[Tuple[str, str], Tuple[int, Dict]] = {}  # key -> (deadline monotonic_ns, session)
+        self._listeners: List[Callable[[str, str], None]] = []
+        self._subscribed = not hasattr(backend, 'subscribe')
+
+    def add_listener(self, callback: Callable[[str, str], None]):
+        """callback(provider, account) setiap kali cache satu session dibuang"""
+        self._listeners.append(callback)
+
+    async def _subscribe(self):
+        # Lazy: store dibuat di luar event loop, listener pub/sub butuh loop yang jalan
+        if not self._subscribed:
+            self._subscribed = True
+            await self.backend.subscribe(self.invalidate_local)
+
+    async def get(self, provider: str, account: str) -> Optional[Dict]:
+        key = (provider, account)
+        cached = self._cache.get(key)
+        if cached is not None and time.monotonic_ns() < cached[0]:
+            return cached[1]
+
+        await self._subscribe()
+        session = await self.backend.get(provider, account)
+        self._remember(key, session)
+        return session
+
+    async def put(self, provider: str, account: str, session: Dict, ttl: float):
+        await self._subscribe()
+        await self.backend.put(provider, account, session, ttl)
+        self._remember((provider, account), session)
+
+    def _remember(self, key: Tuple[str, str], session: Optional[Dict]):
+        if session is None:
+            self._cache.pop(key, None)
+        else:
+            self._cache[key] = (monotonic_deadline(session), session)
+
+    async def delete(self, provider: str, account: str):
+        await self.backend.delete(provider, account)
+        self.invalidate_local(provider, account)
+
+    def invalidate_local(self, provider: str, account: str):
+        self._cache.pop((provider, account), None)
+        for callback in self._listeners:
+            callback(provider, account)
+
+    async def close(self):
+        await self.backend.close()
+
+
+def monotonic_deadline(session: Dict) -> int:
+    """expire_at (epoch, untuk disimpan/di-share) -> deadline time.monotonic_ns() lokal"""
+    return time.monotonic_ns() + int((session['expire_at'] - time.time()) * 1e9)
+
+
+_default_store: Optional[SessionStore] = None
+
+
+def default_session_store() -> SessionStore:
+    """
+    Store per proses (di-share semua ProviderSession):
+    SESSION_STORE=redis (butuh REDIS_URL + SESSION_ENCRYPTION_KEY) atau file (SESSION_FILE).
+    Default redis kalau REDIS_URL dan key ada, selain itu file.
+    """
+    global _default_store
+    if _default_store is not None:
+        return _default_store
+
+    redis_url = os.getenv('REDIS_URL')
+    key = os.getenv('SESSION_ENCRYPTION_KEY')
+    mode = os.getenv('SESSION_STORE') or ('redis' if redis_url and key else 'file')
+
+    if mode == 'redis':
+        if aioredis is None or not redis_url or not key:
+            raise ValueError("SESSION_STORE=redis needs the redis package, REDIS_URL and SESSION_ENCRYPTION_KEY")
+        from cryptography.fernet import Fernet
+        backend = RedisSessionStore(aioredis.from_url(redis_url), Fernet(key.encode()))
+    else:
+        backend = FileSessionStore(os.getenv('SESSION_FILE', '/app/session_backup.json'))
+
+    _default_store = CachedSessionStore(backend)
+    return _default_store
+
+
+class ProviderSession:
+    """
+    Login session (cookies + user agent) satu provider/account lewat SessionStore.
+    Session terakhir + deadline monotonic disimpan di memory: cek di poll loop cuma satu
+    perbandingan integer, store (file/Redis) hanya disentuh saat save, cold start,
+    expired atau di-invalidate replica lain.
+    (Bukan utils.session.SessionManager, itu enkripsi/cache storage_state browser worker.py)
+    """
+
+    def __init__(self, provider: str = 'default', account: str = 'default',
+                 store: SessionStore = None, session_ttl: float = 300):
+        self.provider = provider
+        self.account = account
+        self.store = store or default_session_store()
+        self.session_ttl = session_ttl
+        self._session: Optional[Dict] = None
+        self._deadline_ns = 0
+        if hasattr(self.store, 'add_listener'):
+            self.store.add_listener(self._on_invalidate)
+
+    def _on_invalidate(self, provider: str, account: str):
+        if provider == self.provider and account == self.account:
+            self._deadline_ns = 0
+
+    def _remember(self, session: Optional[Dict]):
+        self._session = session
+        self._deadline_ns = monotonic_deadline(session) if session else 0
+
+    async def save_session(self, cookies: Dict, user_agent: str = ""):
+        now = time.time()
+        session = {
+            'cookies': cookies,
+            'user_agent': user_agent,
+            'saved_at': now,
+            'expire_at': now + self.session_ttl
+        }
+        await self.store.put(self.provider, self.account, session, self.session_ttl)
+        self._remember(session)
+
+    async def load_session(self) -> Optional[Dict]:
+        if time.monotonic_ns() < self._deadline_ns:
+            return self._session
+        # Cold start / expired / di-invalidate: baca store sekali
+        self._remember(await self.store.get(self.provider, self.account))
+        return self._session
+
+    async def is_valid(self) -> bool:
+        return time.monotonic_ns() < self._deadline_ns or await self.load_session() is not None
+
+    def ttl_remaining(self) -> float:
+        """Detik sampai session di memory expired (0 kalau tidak ada / sudah expired)"""
+        return max(0.0, (self._deadline_ns - time.monotonic_ns()) / 1e9)
+
+    async def invalidate(self):
+        await self.store.delete(self.provider, self.account)
+        self._remember(None)
+
+    async def keep_fresh(self, renew: Callable[[], Awaitable[bool]], margin: float = 60.0,
+                         retry_delay: float = 5.0):
+        """
+        Background refresher: panggil renew() (re-login + save_session) sebelum session expired
+        supaya poll loop tidak pernah ketemu session invalid. Jalankan sebagai task, cancel untuk stop.
+        """
+        margin = min(margin, self.session_ttl / 2)
+        while True:
+            await asyncio.sleep(max(0.0, self.ttl_remaining() - margin))
+            # Mungkin sudah di-renew replica lain
+            await self.load_session()
+            if self.ttl_remaining() > margin:
+                continue
+            try:
+                renewed = await renew()
+            except Exception as e:
+                print(f"[SESSION] Refresh failed: {str(e)}")
+                renewed = False
+            if not renewed:
+                await asyncio.sleep(retry_delay)
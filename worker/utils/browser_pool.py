@@ -0,0 +1,305 @@
+"""
+Browser Pool Utilities
+Keeps a fixed number of browsers and warm per-account contexts/pages
+
+A page checked in after a job stays open (cookies, loaded site) so the next
+job for the same account gets it back without new_context()/new_page() or a
+browser launch. Idle pages are evicted LRU when max_contexts is reached.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PooledPage:
+    """One warm context + page owned by an account"""
+
+    __slots__ = ('account', 'browser', 'context', 'page', 'created', 'last_used', 'uses')
+
+    def __init__(self, account: str, browser, context, page):
+        self.account = account
+        self.browser = browser
+        self.context = context
+        self.page = page
+        self.created = self.last_used = time.monotonic()
+        self.uses = 0
+
+
+class BrowserPool:
+    """
+    Fixed set of browsers with an LRU pool of per-account contexts
+    """
+
+    def __init__(self, playwright, size: int = 1, max_contexts: int = 8,
+                 launch_options: Dict[str, Any] = None, context_options: Dict[str, Any] = None,
+                 health_check_interval: float = 30.0, idle_ttl: float = 900.0,
+                 on_evict: Callable[[str], None] = None):
+        """
+        Initialize browser pool
+
+        Args:
+            playwright: Started async Playwright instance
+            size: Number of browser processes
+            max_contexts: Max contexts (idle + checked out) across all browsers
+            launch_options: chromium.launch() kwargs
+            context_options: browser.new_context() kwargs
+            health_check_interval: Seconds between idle page probes / browser reconnects
+            idle_ttl: Idle pages unused this long are closed
+            on_evict: Called with the account when its last page is closed
+        """
+        self.playwright = playwright
+        self.size = max(1, size)
+        self.max_contexts = max(1, max_contexts)
+        self.launch_options = launch_options or {'headless': True}
+        self.context_options = context_options or {}
+        self.health_check_interval = health_check_interval
+        self.idle_ttl = idle_ttl
+        self.on_evict = on_evict
+
+        self.browsers: List = []
+        self._idle: set = set()                  # idle entries (LRU by last_used)
+        self._by_account: Dict[str, set] = {}    # account -> idle + checked out entries
+        self._total = 0                          # entries incl. ones being created
+        self._cond = asyncio.Condition()
+        self._launch_lock = asyncio.Lock()
+        self._health_task: Optional[asyncio.Task] = None
+        self.stats = {'warm': 0, 'cold': 0, 'evicted': 0, 'unhealthy': 0}
+
+    async def start(self):
+        """Launch browsers and start the health check loop"""
+        for _ in range(self.size):
+            self.browsers.append(await self.playwright.chromium.launch(**self.launch_options))
+        self._health_task = asyncio.create_task(self._health_loop())
+        logger.info(f"Browser pool started: {self.size} browsers, max {self.max_contexts} contexts")
+
+    def has_account(self, account: str) -> bool:
+        return bool(self._by_account.get(account or ''))
+
+    def has_idle(self, account: str) -> bool:
+        """True if checkout() would get a warm page of this account right now (not one checked out)"""
+        return any(entry in self._idle for entry in self._by_account.get(account or '', ()))
+
+    async def checkout(self, account: str = None, create: bool = True,
+                       storage_state: Dict = None) -> Optional[PooledPage]:
+        """
+        Get a page for an account: warm idle page first, otherwise a new context
+
+        Args:
+            account: Session owner (None = shared anonymous pool)
+            create: False = only return existing pages of this account
+            storage_state: Cookies/localStorage for a new context (ignored for warm pages)
+
+        Returns:
+            PooledPage (must be passed to checkin), or None if create=False and the account has no pages
+        """
+        key = account or ''
+        async with self._cond:
+            while True:
+                entry = self._take_idle(key)
+                if entry is not None:
+                    if self._is_healthy(entry):
+                        entry.uses += 1
+                        self.stats['warm'] += 1
+                        return entry
+                    self.stats['unhealthy'] += 1
+                    await self._discard(entry)
+                    continue
+
+                if not create:
+                    if not self._by_account.get(key):
+                        return None
+                elif self._total < self.max_contexts:
+                    self._total += 1
+                    break
+                elif self._idle:
+                    lru = min(self._idle, key=lambda e: e.last_used)
+                    self.stats['evicted'] += 1
+                    await self._discard(lru)
+                    continue
+
+                # Everything checked out: wait for a checkin
+                await self._cond.wait()
+
+        try:
+            entry = await self._create(key, storage_state)
+        except BaseException:
+            async with self._cond:
+                self._total -= 1
+                self._cond.notify_all()
+            raise
+        entry.uses += 1
+        self.stats['cold'] += 1
+        return entry
+
+    async def checkin(self, entry: PooledPage, healthy: bool = True):
+        """Return a page; unhealthy (or crashed) pages are closed instead of kept warm"""
+        async with self._cond:
+            if healthy and self._is_healthy(entry):
+                entry.last_used = time.monotonic()
+                self._idle.add(entry)
+            else:
+                self.stats['unhealthy'] += 1
+                await self._discard(entry)
+            self._cond.notify_all()
+
+    @asynccontextmanager
+    async def page(self, account: str = None, create: bool = True, storage_state: Dict = None) -> AsyncIterator:
+        """
+        Checkout/checkin around a block; the page is dropped if the block raises
+
+        Raises:
+            LookupError: create=False and the account has no warm page
+        """
+        entry = await self.checkout(account, create, storage_state)
+        if entry is None:
+            raise LookupError(f"No warm page for account {account}")
+        healthy = False
+        try:
+            yield entry.page
+            healthy = True
+        finally:
+            await self.checkin(entry, healthy)
+
+    async def evict(self, account: str):
+        """Close all idle pages of an account (e.g. logout / credentials changed)"""
+        async with self._cond:
+            for entry in [e for e in self._by_account.get(account or '', ()) if e in self._idle]:
+                await self._discard(entry)
+            self._cond.notify_all()
+
+    def _take_idle(self, key: str) -> Optional[PooledPage]:
+        """Most recently used idle page of the account"""
+        best = None
+        for entry in self._by_account.get(key, ()):
+            if entry in self._idle and (best is None or entry.last_used > best.last_used):
+                best = entry
+        if best is not None:
+            self._idle.discard(best)
+        return best
+
+    def _is_healthy(self, entry: PooledPage) -> bool:
+        return (entry.browser in self.browsers
+                and entry.browser.is_connected()
+                and not entry.page.is_closed())
+
+    async def _ensure_browsers(self):
+        """Relaunch disconnected browsers (their pages fail _is_healthy and get dropped)"""
+        async with self._launch_lock:
+            for i, browser in enumerate(self.browsers):
+                if not browser.is_connected():
+                    logger.warning(f"Browser {i} disconnected, relaunching")
+                    self.browsers[i] = await self.playwright.chromium.launch(**self.launch_options)
+
+    async def _browser(self):
+        """Least loaded connected browser"""
+        await self._ensure_browsers()
+
+        load = {id(browser): 0 for browser in self.browsers}
+        for entries in self._by_account.values():
+            for entry in entries:
+                if id(entry.browser) in load:
+                    load[id(entry.browser)] += 1
+        return min(self.browsers, key=lambda browser: load[id(browser)])
+
+    async def _create(self, key: str, storage_state: Dict = None) -> PooledPage:
+        browser = await self._browser()
+        options = self.context_options
+        if storage_state:
+            options = {**options, 'storage_state': storage_state}
+        context = await browser.new_context(**options)
+        try:
+            page = await context.new_page()
+        except BaseException:
+            await context.close()
+            raise
+        entry = PooledPage(key, browser, context, page)
+        self._by_account.setdefault(key, set()).add(entry)
+        return entry
+
+    async def _discard(self, entry: PooledPage):
+        """Close an entry (caller holds the condition lock)"""
+        self._idle.discard(entry)
+        entries = self._by_account.get(entry.account)
+        if entries is not None:
+            entries.discard(entry)
+            if not entries:
+                del self._by_account[entry.account]
+                if self.on_evict and entry.account:
+                    self.on_evict(entry.account)
+        self._total -= 1
+        try:
+            await entry.context.close()
+        except Exception as e:
+            logger.debug(f"Context close failed: {e}")
+
+    async def health_check(self):
+        """Relaunch dead browsers, close expired idle pages, probe the rest (checked out while probed)"""
+        await self._ensure_browsers()
+        now = time.monotonic()
+        async with self._cond:
+            probe = []
+            for entry in list(self._idle):
+                if now - entry.last_used > self.idle_ttl:
+                    await self._discard(entry)
+                else:
+                    self._idle.discard(entry)
+                    probe.append(entry)
+            self._cond.notify_all()
+
+        for entry in probe:
+            healthy = self._is_healthy(entry)
+            if healthy:
+                try:
+                    await asyncio.wait_for(entry.page.evaluate('1'), timeout=5)
+                except Exception:
+                    healthy = False
+            async with self._cond:
+                if healthy:
+                    # last_used untouched: probing is not a use
+                    self._idle.add(entry)
+                else:
+                    self.stats['unhealthy'] += 1
+                    await self._discard(entry)
+                self._cond.notify_all()
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            try:
+                await self.health_check()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Browser pool health check failed: {e}")
+
+    async def close(self):
+        """Close all contexts and browsers"""
+        if self._health_task:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+
+        for entries in list(self._by_account.values()):
+            for entry in list(entries):
+                try:
+                    await entry.context.close()
+                except Exception:
+                    pass
+        self._idle.clear()
+        self._by_account.clear()
+        self._total = 0
+
+        for browser in self.browsers:
+            try:
+                await browser.close()
+            except Exception:
+                pass
+        self.browsers = []
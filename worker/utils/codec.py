@@ -0,0 +1,121 @@
+"""
+Codec Utilities
+Pluggable serialization for worker -> backend messages (json / orjson / msgpack)
+
+Both sides advertise the codecs they have installed; negotiate() picks the
+first one in the client's preference order that the server also supports,
+falling back to plain json. orjson and msgpack are optional dependencies.
+"""
+
+import json
+from collections.abc import Sequence
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def _default(obj: Any):
+    """Fallback for types the encoders don't know (parser's lazy ColumnarMatches, numpy, datetime)"""
+    if hasattr(obj, 'to_list'):
+        return obj.to_list()
+    if isinstance(obj, (set, frozenset, Sequence)):
+        return list(obj)
+    if hasattr(obj, 'item'):  # numpy scalar
+        return obj.item()
+    return str(obj)
+
+
+class JsonCodec:
+    """stdlib json, compact separators (text frames)"""
+
+    name = 'json'
+    binary = False
+
+    def dumps(self, obj: Any) -> str:
+        return json.dumps(obj, separators=(',', ':'), default=_default)
+
+    def loads(self, data) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec:
+    """orjson: same JSON document as json, but bytes out"""
+
+    name = 'orjson'
+    binary = True  # bytes -> websockets sends a binary frame (loads() takes bytes or str)
+
+    def dumps(self, obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+
+    def loads(self, data) -> Any:
+        return orjson.loads(data)
+
+
+class MsgpackCodec:
+    """msgpack: binary, smallest payload for float-heavy odds"""
+
+    name = 'msgpack'
+    binary = True
+
+    def dumps(self, obj: Any) -> bytes:
+        return msgpack.packb(obj, default=_default, use_bin_type=True)
+
+    def loads(self, data) -> Any:
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+CODECS = {
+    'msgpack': MsgpackCodec,
+    'orjson': OrjsonCodec,
+    'json': JsonCodec,
+}
+
+# Preference order when the peer supports several
+DEFAULT_PREFERENCE = ('msgpack', 'orjson', 'json')
+
+
+def available_codecs(preference: Iterable[str] = DEFAULT_PREFERENCE) -> List[str]:
+    """Installed codecs in preference order (json is always available)"""
+    installed = {'json': True, 'orjson': orjson is not None, 'msgpack': msgpack is not None}
+    names = [name for name in preference if installed.get(name)]
+    if 'json' not in names:
+        names.append('json')
+    return names
+
+
+def get_codec(name: str = 'json'):
+    """
+    Codec instance by name
+
+    Raises:
+        ValueError: Unknown codec or its package is not installed
+    """
+    if name not in CODECS or name not in available_codecs(CODECS):
+        raise ValueError(f"Codec not available: {name}")
+    return CODECS[name]()
+
+
+def negotiate(offered: Iterable[str], supported: Optional[Iterable[str]] = None):
+    """First codec from the peer's offer (its preference order) that we support, else json"""
+    supported = set(supported if supported is not None else available_codecs())
+    for name in offered or ():
+        if name in supported:
+            return get_codec(name)
+    return JsonCodec()
+
+
+def hello_message(preference: Iterable[str] = DEFAULT_PREFERENCE, **fields) -> Dict[str, Any]:
+    """Client hello (always sent as json): {'type': 'hello', 'codecs': [...], ...}"""
+    return {'type': 'hello', 'codecs': available_codecs(preference), **fields}
+
+
+# Fastest installed JSON parser (job payloads, engine messages)
+json_loads = orjson.loads if orjson is not None else json.loads
@@ -0,0 +1,437 @@
+"""
+Reliable Queue Utilities
+At-least-once job consumption on top of Redis lists (Redis >= 6.2)
+
+A popped job is atomically moved into a per-worker processing list and only
+removed on ack. Two things return unacked jobs to their queue:
+
+- Per-job visibility deadline: every claim records a deadline (now +
+  visibility_timeout) in a sorted set and the owner's heartbeat keeps moving
+  it forward while the job runs. A deadline only passes when the owner stops
+  heartbeating (crash, blocked event loop) or the job exceeds max_runtime
+  (hung handler on a live worker); any worker's reclaim loop requeues it then.
+- Dead workers: each worker keeps an alive key with a TTL of
+  visibility_timeout; when a worker stops heartbeating (crash, hung loop,
+  node lost), any other worker moves its whole processing list back.
+
+A slow job on a live worker is therefore never delivered twice; only one
+running past max_runtime is.
+
+Shared by worker/ and minimal-worker/ (minimal-worker's image copies this file).
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Move first job from the first non-empty queue (priority order) into its processing list
+# KEYS = queue1, processing1, deadlines1, queue2, ...; ARGV = worker id, deadline (ms)
+CLAIM_SCRIPT = """
+for i = 1, #KEYS, 3 do
+    local job = redis.call('LMOVE', KEYS[i], KEYS[i + 1], 'LEFT', 'LEFT')
+    if job then
+        redis.call('ZADD', KEYS[i + 2], ARGV[2], ARGV[1] .. '\\n' .. job)
+        return {KEYS[i], job}
+    end
+end
+return false
+"""
+
+# Requeue a dead worker's processing list (no-op while its alive key exists)
+# KEYS = queue, processing, alive key, workers set, deadlines; ARGV = worker id, force (1/0)
+RECLAIM_SCRIPT = """
+if ARGV[2] ~= '1' and redis.call('EXISTS', KEYS[3]) == 1 then
+    return -1
+end
+local moved = 0
+while true do
+    local job = redis.call('LMOVE', KEYS[2], KEYS[1], 'LEFT', 'LEFT')
+    if not job then
+        break
+    end
+    redis.call('ZREM', KEYS[5], ARGV[1] .. '\\n' .. job)
+    moved = moved + 1
+end
+redis.call('SREM', KEYS[4], ARGV[1])
+return moved
+"""
+
+# Requeue jobs past their visibility deadline, whichever worker holds them
+# (processing keys are derived from the member, so this is single-node Redis only)
+# KEYS = queue, deadlines; ARGV = now (ms), processing key prefix, max jobs
+EXPIRE_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[3]))
+local moved = 0
+for _, member in ipairs(expired) do
+    local sep = string.find(member, '\\n', 1, true)
+    local job = string.sub(member, sep + 1)
+    if redis.call('LREM', ARGV[2] .. string.sub(member, 1, sep - 1), 1, job) > 0 then
+        redis.call('LPUSH', KEYS[1], job)
+        moved = moved + 1
+    end
+    redis.call('ZREM', KEYS[2], member)
+end
+return moved
+"""
+
+
+class ReliableQueue:
+    """
+    Consumer for one or more Redis list queues with in-flight tracking
+    """
+
+    def __init__(self, redis_client, queues: Sequence[str], worker_id: str,
+                 visibility_timeout: float = 60.0, reclaim_interval: float = None,
+                 max_runtime: float = None):
+        """
+        Initialize reliable queue
+
+        Args:
+            redis_client: redis.asyncio client (decode_responses=True)
+            queues: Queue keys in priority order (first = highest)
+            worker_id: Unique, stable id of this worker process
+            visibility_timeout: Seconds without heartbeat after which a dead worker's jobs are requeued
+            reclaim_interval: Seconds between heartbeat/reclaim runs (default visibility_timeout / 3)
+            max_runtime: Seconds after which a job still running on a live worker is
+                considered hung and requeued (None = never)
+        """
+        self.redis = redis_client
+        self.queues = list(queues)
+        self.worker_id = worker_id
+        self.visibility_timeout = visibility_timeout
+        self.reclaim_interval = reclaim_interval or visibility_timeout / 3
+        self.max_runtime = max_runtime
+
+        self._claim = redis_client.register_script(CLAIM_SCRIPT)
+        self._reclaim = redis_client.register_script(RECLAIM_SCRIPT)
+        self._expire = redis_client.register_script(EXPIRE_SCRIPT)
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        # queue -> blocking BLMOVE task; reused across pops, never cancelled mid-move
+        self._waiters: Dict[str, asyncio.Task] = {}
+        # (queue, raw) -> claim time (monotonic) of jobs this worker holds unacked
+        self._inflight: Dict[Tuple[str, str], float] = {}
+
+    def processing_key(self, queue: str, worker_id: str = None) -> str:
+        return f"{queue}:processing:{worker_id or self.worker_id}"
+
+    def alive_key(self, queue: str, worker_id: str = None) -> str:
+        return f"{queue}:alive:{worker_id or self.worker_id}"
+
+    def workers_key(self, queue: str) -> str:
+        return f"{queue}:workers"
+
+    def deadlines_key(self, queue: str) -> str:
+        return f"{queue}:deadlines"
+
+    def _member(self, raw: str) -> str:
+        return f"{self.worker_id}\n{raw}"
+
+    def _deadline(self) -> int:
+        return int((time.time() + self.visibility_timeout) * 1000)
+
+    def _reclaim_keys(self, queue: str, worker_id: str = None) -> List[str]:
+        return [queue, self.processing_key(queue, worker_id), self.alive_key(queue, worker_id),
+                self.workers_key(queue), self.deadlines_key(queue)]
+
+    async def start(self):
+        """Register worker, requeue leftovers from a previous run with the same id, start heartbeat"""
+        for queue in self.queues:
+            moved = await self._reclaim(keys=self._reclaim_keys(queue), args=[self.worker_id, 1])
+            if moved:
+                logger.warning(f"Requeued {moved} unacked jobs from previous run on {queue}")
+
+        await self.heartbeat()
+        for queue in self.queues:
+            await self.redis.sadd(self.workers_key(queue), self.worker_id)
+
+        self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+
+    async def pop(self, timeout: float = 5) -> Optional[Tuple[str, str]]:
+        """
+        Claim the next job, highest priority queue first
+
+        Args:
+            timeout: Seconds to block when all queues are empty
+
+        Returns:
+            (queue, raw job) or None on timeout; must be passed to ack() when done
+        """
+        return await self.pop_from(self.queues, timeout)
+
+    async def pop_from(self, queues: List[str], timeout: float = 5) -> Optional[Tuple[str, str]]:
+        """pop() restricted to a subset of queues (e.g. queues below their concurrency cap)"""
+        if not queues:
+            return None
+        await self._release_idle(queues)
+
+        keys = []
+        for queue in queues:
+            keys += [queue, self.processing_key(queue), self.deadlines_key(queue)]
+        job = await self._claim(keys=keys, args=[self.worker_id, self._deadline()])
+        if job:
+            self._inflight[(job[0], job[1])] = time.monotonic()
+            return job[0], job[1]
+
+        # Nothing queued: block on every queue at once. BLMOVE takes one source, so each
+        # queue gets its own waiter; a waiter outlives this call instead of being cancelled
+        # (a cancelled BLMOVE can move a job whose reply is never read)
+        waiters = [self._waiter(queue, timeout) for queue in queues]
+        await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+        claimed = None
+        error = None
+        for queue in queues:
+            try:
+                raw = self._take(queue)
+            except Exception as e:
+                error = error or e
+                continue
+            if raw is None:
+                continue
+            if claimed is None:
+                claimed = (queue, raw)
+            else:
+                # Arrived together with a higher priority job: back to the head of its queue
+                await self.nack(queue, raw)
+        if claimed is None and error is not None:
+            raise error
+        return claimed
+
+    def _waiter(self, queue: str, timeout: float) -> asyncio.Task:
+        task = self._waiters.get(queue)
+        if task is None:
+            task = self._waiters[queue] = asyncio.create_task(self._block_claim(queue, timeout))
+        return task
+
+    async def _block_claim(self, queue: str, timeout: float) -> Optional[str]:
+        raw = await self.redis.blmove(queue, self.processing_key(queue), timeout, 'LEFT', 'LEFT')
+        if raw is not None:
+            self._inflight[(queue, raw)] = time.monotonic()
+            await self.redis.zadd(self.deadlines_key(queue), {self._member(raw): self._deadline()})
+        return raw
+
+    def _take(self, queue: str) -> Optional[str]:
+        """Result of a finished waiter (None if still blocking or it timed out)"""
+        task = self._waiters.get(queue)
+        if task is None or not task.done():
+            return None
+        del self._waiters[queue]
+        if task.cancelled():
+            return None
+        return task.result()
+
+    async def _release_idle(self, queues: List[str]):
+        """Jobs claimed by waiters of queues the caller no longer pops (capped) go back"""
+        for queue in [q for q in self._waiters if q not in queues]:
+            try:
+                raw = self._take(queue)
+            except Exception:
+                continue
+            if raw is not None:
+                await self.nack(queue, raw)
+
+    async def ack(self, queue: str, raw: str):
+        """Job finished (success or final failure): drop it from the processing list"""
+        self._inflight.pop((queue, raw), None)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.lrem(self.processing_key(queue), -1, raw)
+            pipe.zrem(self.deadlines_key(queue), self._member(raw))
+            await pipe.execute()
+
+    async def nack(self, queue: str, raw: str):
+        """Give a job back to the queue head for another worker to retry"""
+        self._inflight.pop((queue, raw), None)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.lrem(self.processing_key(queue), -1, raw)
+            pipe.zrem(self.deadlines_key(queue), self._member(raw))
+            pipe.lpush(queue, raw)
+            await pipe.execute()
+
+    async def heartbeat(self):
+        """Refresh the alive keys and push the deadline of every job still running here forward"""
+        ttl_ms = int(self.visibility_timeout * 1000)
+        for queue in self.queues:
+            await self.redis.set(self.alive_key(queue), int(time.time()), px=ttl_ms)
+
+        deadline = self._deadline()
+        now = time.monotonic()
+        extend: Dict[str, Dict[str, int]] = {}
+        for (queue, raw), claimed_at in list(self._inflight.items()):
+            if self.max_runtime is not None and now - claimed_at > self.max_runtime:
+                continue  # hung: let the deadline pass so expire() requeues it
+            extend.setdefault(queue, {})[self._member(raw)] = deadline
+        for queue, members in extend.items():
+            # XX: a job acked meanwhile is not added back
+            await self.redis.zadd(self.deadlines_key(queue), members, xx=True)
+
+    async def reclaim(self) -> int:
+        """
+        Requeue in-flight jobs of workers whose alive key has expired
+
+        Returns:
+            Number of jobs moved back to their queues
+        """
+        total = 0
+        for queue in self.queues:
+            for worker_id in await self.redis.smembers(self.workers_key(queue)):
+                if worker_id == self.worker_id:
+                    continue
+                moved = await self._reclaim(keys=self._reclaim_keys(queue, worker_id), args=[worker_id, 0])
+                if moved > 0:
+                    logger.warning(f"Reclaimed {moved} jobs from dead worker {worker_id} on {queue}")
+                    total += moved
+        return total
+
+    async def expire(self, limit: int = 100) -> int:
+        """
+        Requeue jobs whose deadline passed: owner stopped heartbeating or job exceeded max_runtime
+
+        Returns:
+            Number of jobs moved back to their queues
+        """
+        total = 0
+        now_ms = int(time.time() * 1000)
+        for queue in self.queues:
+            moved = await self._expire(keys=[queue, self.deadlines_key(queue)],
+                                       args=[now_ms, f"{queue}:processing:", limit])
+            if moved > 0:
+                logger.warning(f"Requeued {moved} jobs past their visibility timeout on {queue}")
+                total += moved
+        return total
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.reclaim_interval)
+            try:
+                await self.heartbeat()
+                await self.reclaim()
+                await self.expire()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Queue heartbeat failed: {e}")
+
+    async def close(self):
+        """Stop heartbeat and deregister; call after in-flight jobs are acked"""
+        tasks = [self._heartbeat_task, *self._waiters.values()]
+        self._heartbeat_task = None
+        self._waiters = {}
+        for task in tasks:
+            if task is None:
+                continue
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+        self._inflight.clear()
+        for queue in self.queues:
+            # Anything still unacked (incl. a job a cancelled waiter claimed) goes back now
+            await self._reclaim(keys=self._reclaim_keys(queue), args=[self.worker_id, 1])
+            await self.redis.delete(self.alive_key(queue))
+
+
+async def self_test(redis_url: str):
+    """Crash / slow job / hung job / multi-queue blocking round trip against a local Redis (throwaway keys)"""
+    import redis.asyncio as redis
+
+    client = redis.from_url(redis_url, decode_responses=True)
+    queue = f"reliable-queue-test:{int(time.time())}"
+    low = f"{queue}:low"
+    jobs = [f"job-{i}" for i in range(10)]
+    await client.rpush(queue, *jobs)
+
+    # Worker A claims 3 jobs and "dies" without acking
+    worker_a = ReliableQueue(client, [queue], 'worker-a', visibility_timeout=1)
+    await worker_a.start()
+    worker_a._heartbeat_task.cancel()
+    claimed_a = [await worker_a.pop(timeout=1) for _ in range(3)]
+
+    # Worker B processes the rest, then reclaims A's jobs after the timeout
+    # (its own loop is parked: heartbeat / reclaim / expire are driven by hand below)
+    worker_b = ReliableQueue(client, [queue, low], 'worker-b', visibility_timeout=1,
+                             reclaim_interval=60, max_runtime=2)
+    await worker_b.start()
+    done = []
+
+    async def run_for(seconds):
+        # Job "running" on worker B while it keeps heartbeating like its loop would
+        for _ in range(int(seconds / 0.25)):
+            await asyncio.sleep(0.25)
+            await worker_b.heartbeat()
+
+    async def drain():
+        while True:
+            job = await worker_b.pop(timeout=0.2)
+            if job is None:
+                return
+            done.append(job[1])
+            await worker_b.ack(*job)
+
+    await drain()
+    await asyncio.sleep(1.2)  # worker A's alive key expires
+    reclaimed = await worker_b.reclaim()
+    await drain()
+
+    # Slow job on a live worker outlives visibility_timeout but is not redelivered
+    await client.rpush(queue, 'job-slow')
+    slow = await worker_b.pop(timeout=1)
+    await run_for(1.5)
+    slow_expired = await worker_b.expire()
+    slow_queued = await client.llen(queue)
+    await worker_b.ack(*slow)
+
+    # Hung job: past max_runtime its deadline is no longer extended, so it is requeued
+    await client.rpush(queue, 'job-hung')
+    hung = await worker_b.pop(timeout=1)
+    await run_for(3.25)
+    expired = await worker_b.expire()
+    retried = await worker_b.pop(timeout=1)
+    await worker_b.ack(*retried)
+
+    # Blocking pop wakes up for a job on the lower priority queue too
+    async def push_later():
+        await asyncio.sleep(0.2)
+        await client.rpush(low, 'job-low')
+    started = time.monotonic()
+    pusher = asyncio.create_task(push_later())
+    low_job = await worker_b.pop(timeout=3)
+    waited = time.monotonic() - started
+    await pusher
+    await worker_b.ack(*low_job)
+
+    await worker_b.close()
+    keys = [queue, low, worker_a.processing_key(queue), worker_b.processing_key(queue),
+            worker_b.processing_key(low), worker_a.alive_key(queue), worker_a.workers_key(queue),
+            worker_b.workers_key(low), worker_b.deadlines_key(queue), worker_b.deadlines_key(low)]
+    await client.delete(*keys)
+    await client.close()
+
+    assert sorted(done) == sorted(jobs), done
+    assert reclaimed == len(claimed_a), reclaimed
+    assert slow == (queue, 'job-slow') and slow_expired == 0 and slow_queued == 0, (slow, slow_expired, slow_queued)
+    assert hung == (queue, 'job-hung') and expired == 1 and retried == hung, (hung, expired, retried)
+    assert low_job == (low, 'job-low') and waited < 1, (low_job, waited)
+    print(f"OK: {len(jobs)} jobs, {reclaimed} reclaimed from dead worker, no loss / no duplicates; "
+          f"slow job not redelivered, hung job requeued; low priority job picked up after {waited * 1000:.0f} ms")
+
+
+def main():
+    """CLI tool for reliable queue"""
+    import sys
+
+    if len(sys.argv) < 2 or sys.argv[1] != 'self-test':
+        print("Usage:")
+        print("  python reliable_queue.py self-test [redis_url]")
+        sys.exit(1)
+
+    redis_url = sys.argv[2] if len(sys.argv) > 2 else 'redis://localhost:6379'
+    asyncio.run(self_test(redis_url))
+
+
+if __name__ == '__main__':
+    main()
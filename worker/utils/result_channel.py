@@ -0,0 +1,177 @@
+"""
+Result Channel Utilities
+Pushes job results to the engine over the worker's persistent Redis connection
+
+Results are XADDed to a Redis Stream (default 'jobs:results') that the engine
+reads with a consumer group. Concurrent jobs' results are pipelined into one
+round trip; a result counts as acked once Redis returns its stream entry id.
+Unacked results stay in memory and are replayed in order after a connection
+error, so delivery is at-least-once: consumers dedupe on job_id. A publish()
+that is not acked within ack_timeout gives up (the result is dropped from the
+replay backlog) so the caller can return the job to its queue.
+
+Stream entry fields:
+    job_id, worker_id, success ('1'/'0'), result (encoded with codec), codec (utils.codec name),
+    enqueued_at, reported_at (epoch ms)
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from utils.codec import JsonCodec
+
+logger = logging.getLogger(__name__)
+
+
+class ResultChannel:
+    """
+    Pipelined, acked result publisher on a Redis Stream
+    """
+
+    def __init__(self, redis_client, worker_id: str, stream: str = 'jobs:results',
+                 maxlen: int = 100000, batch_size: int = 100,
+                 retry_delay: float = 0.2, max_retry_delay: float = 10.0, codec=None,
+                 ack_timeout: float = 30.0):
+        """
+        Initialize result channel
+
+        Args:
+            redis_client: redis.asyncio client
+            worker_id: Id stamped on every result
+            stream: Stream key the engine consumes
+            maxlen: Approximate stream cap (MAXLEN ~)
+            batch_size: Max results per pipelined round trip
+            retry_delay: First reconnect delay in seconds (doubles up to max_retry_delay, jittered)
+            max_retry_delay: Reconnect delay cap
+            codec: utils.codec codec for the result field (default json)
+            ack_timeout: Seconds publish() waits for the ack before raising ConnectionError
+        """
+        self.redis = redis_client
+        self.worker_id = worker_id
+        self.stream = stream
+        self.maxlen = maxlen
+        self.batch_size = max(1, batch_size)
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.codec = codec or JsonCodec()
+        self.ack_timeout = ack_timeout
+
+        self._pending: Deque[Tuple[Dict[str, Any], asyncio.Future]] = deque()  # unacked, in order
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.latencies: Deque[float] = deque(maxlen=1000)  # enqueue -> ack (ms)
+        self.stats = {'acked': 0, 'round_trips': 0, 'replays': 0, 'timeouts': 0}
+
+    async def start(self):
+        """Start the sender task"""
+        self._task = asyncio.create_task(self._sender())
+
+    async def publish(self, job_id: str, result: Dict[str, Any], enqueued_at: float = None) -> str:
+        """
+        Send one result and wait for its ack
+
+        Args:
+            job_id: Job the result belongs to
+            result: Result dict (JSON serializable)
+            enqueued_at: When the job was enqueued (epoch seconds), for end-to-end latency
+
+        Returns:
+            Stream entry id
+
+        Raises:
+            ConnectionError: Not acked within ack_timeout, or channel closed first
+        """
+        fields = {
+            'job_id': job_id or '',
+            'worker_id': self.worker_id,
+            'success': '1' if result.get('success') else '0',
+            'result': self.codec.dumps(result),
+            'codec': self.codec.name,
+            'enqueued_at': int(enqueued_at * 1000) if enqueued_at else '',
+            'reported_at': int(time.time() * 1000)
+        }
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((fields, future))
+        self._wakeup.set()
+
+        try:
+            entry_id = await asyncio.wait_for(future, self.ack_timeout)
+        except asyncio.TimeoutError:
+            # wait_for cancelled the future: the sender drops it from the backlog
+            self.stats['timeouts'] += 1
+            raise ConnectionError(f"Result for job {job_id} not acked within {self.ack_timeout}s") from None
+        if enqueued_at:
+            self.latencies.append((time.time() - enqueued_at) * 1000)
+        return entry_id
+
+    def latency_summary(self) -> Dict[str, float]:
+        """p50/p95/p99/max of recent enqueue -> ack latencies (ms)"""
+        if not self.latencies:
+            return {}
+        ordered = sorted(self.latencies)
+        pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+        return {'p50': pick(0.50), 'p95': pick(0.95), 'p99': pick(0.99), 'max': ordered[-1]}
+
+    async def _sender(self):
+        delay = self.retry_delay
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+
+            while self._pending:
+                if any(future.done() for _, future in self._pending):
+                    # Given up by publish() (timeout): don't send stale results after the job was requeued
+                    self._pending = deque(item for item in self._pending if not item[1].done())
+                    if not self._pending:
+                        break
+                batch = [self._pending[i] for i in range(min(self.batch_size, len(self._pending)))]
+                try:
+                    async with self.redis.pipeline(transaction=False) as pipe:
+                        for fields, _ in batch:
+                            pipe.xadd(self.stream, fields, maxlen=self.maxlen, approximate=True)
+                        entry_ids = await pipe.execute()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    # Nothing popped: the whole unacked backlog is resent after reconnect
+                    self.stats['replays'] += 1
+                    wait = delay * random.uniform(0.5, 1.0)
+                    logger.warning(f"Result channel send failed ({len(self._pending)} unacked), "
+                                   f"retrying in {wait:.2f}s: {e}")
+                    await asyncio.sleep(wait)
+                    delay = min(delay * 2, self.max_retry_delay)
+                    continue
+
+                delay = self.retry_delay
+                self.stats['round_trips'] += 1
+                for entry_id in entry_ids:
+                    _, future = self._pending.popleft()
+                    self.stats['acked'] += 1
+                    if not future.done():
+                        future.set_result(entry_id)
+
+    async def close(self, timeout: float = 5.0):
+        """Wait for unacked results (up to timeout), then stop; leftovers fail their publish()"""
+        deadline = time.monotonic() + timeout
+        while self._pending and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        while self._pending:
+            _, future = self._pending.popleft()
+            if not future.done():
+                future.set_exception(ConnectionError("Result channel closed before ack"))
+
+        if self.latencies:
+            logger.info(f"Job latency enqueue->ack (ms): {self.latency_summary()}")
@@ -5,8 +5,13 @@ Handles encryption/decryption of session tokens
 
 import os
 import json
-from typing import Dict, List
-from cryptography.fernet import Fernet
+import time
+import hashlib
+import logging
+from typing import Dict, List, Optional
+from cryptography.fernet import Fernet, InvalidToken
+
+logger = logging.getLogger(__name__)
 
 
 class SessionManager:
@@ -77,6 +82,94 @@ class SessionManager:
         return key.decode()
 
 
+def storage_state_to_session(storage_state: Dict) -> tuple:
+    """
+    Playwright storage_state -> (cookies, local_storage) for encrypt_session
+    
+    local_storage is {origin: {name: value}}
+    """
+    local_storage = {
+        origin['origin']: {item['name']: item['value'] for item in origin.get('localStorage', [])}
+        for origin in storage_state.get('origins', [])
+    }
+    return storage_state.get('cookies', []), local_storage
+
+
+def session_to_storage_state(session_data: Dict) -> Dict:
+    """decrypt_session output -> Playwright storage_state (new_context(storage_state=...))"""
+    return {
+        'cookies': session_data.get('cookies', []),
+        'origins': [
+            {'origin': origin, 'localStorage': [{'name': k, 'value': v} for k, v in items.items()]}
+            for origin, items in session_data.get('local_storage', {}).items()
+        ]
+    }
+
+
+class SessionCache:
+    """
+    Encrypted browser storage state per account, kept on disk so sessions
+    survive worker restarts
+    """
+    
+    def __init__(self, manager: SessionManager, directory: str = 'session_cache', ttl: float = 12 * 3600):
+        """
+        Initialize session cache
+        
+        Args:
+            manager: SessionManager used for encryption
+            directory: Cache directory (one file per account)
+            ttl: Seconds after which a cached session is ignored
+        """
+        self.manager = manager
+        self.directory = directory
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+    
+    def _path(self, account: str) -> str:
+        # Account keys contain usernames - don't put them in file names
+        digest = hashlib.sha256(account.encode()).hexdigest()[:32]
+        return os.path.join(self.directory, f"{digest}.session")
+    
+    def load(self, account: str) -> Optional[Dict]:
+        """
+        Get cached storage state
+        
+        Returns:
+            Playwright storage_state, or None if missing, expired or unreadable
+        """
+        path = self._path(account)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                self.invalidate(account)
+                return None
+            with open(path, 'r') as f:
+                token = f.read()
+            return session_to_storage_state(self.manager.decrypt_session(token))
+        except FileNotFoundError:
+            return None
+        except (InvalidToken, ValueError, OSError) as e:
+            logger.warning(f"Dropping unreadable cached session: {e}")
+            self.invalidate(account)
+            return None
+    
+    def save(self, account: str, storage_state: Dict):
+        """Encrypt and store storage state (atomic replace)"""
+        cookies, local_storage = storage_state_to_session(storage_state)
+        token = self.manager.encrypt_session(cookies, local_storage)
+        path = self._path(account)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(token)
+        os.replace(tmp_path, path)
+    
+    def invalidate(self, account: str):
+        try:
+            os.remove(self._path(account))
+        except FileNotFoundError:
+            pass
+
+
 def main():
     """CLI tool for session management"""
     import sys
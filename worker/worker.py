@@ -7,17 +7,22 @@ Consumes jobs from Redis queue and executes them using Playwright
 import os
 import sys
 import time
-import json
 import logging
 import signal
 import uuid
 import re
+import asyncio
 from typing import Dict, Any, Optional
 from datetime import datetime
 from dotenv import load_dotenv
-import redis
+import redis.asyncio as redis
 import websocket
-from playwright.sync_api import sync_playwright, Browser, BrowserContext, Page
+from playwright.async_api import async_playwright, Page, TimeoutError as PlaywrightTimeoutError
+from utils.browser_pool import BrowserPool
+from utils.codec import get_codec, json_loads
+from utils.reliable_queue import ReliableQueue
+from utils.result_channel import ResultChannel
+from utils.session import SessionManager, SessionCache
 
 # Configure logging
 logging.basicConfig(
@@ -30,6 +35,42 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+JOB_QUEUE = 'jobs:queue'
+
+# Click LOGIN/MASUK once it is rendered (wait_for_function polls until truthy)
+QQ188_CLICK_LOGIN_JS = """() => {
+    const elements = Array.from(document.querySelectorAll('a, button, span, div'));
+    const target = elements.find(el => {
+        const txt = el.innerText ? el.innerText.trim().toUpperCase() : '';
+        return txt === 'LOGIN' || txt === 'MASUK';
+    });
+    if (target) { target.click(); return true; }
+    return false;
+}"""
+
+# Balance candidates (IDR + format XXX,XXX.XX), null until one is rendered
+QQ188_BALANCE_JS = """() => {
+    const allElements = Array.from(document.querySelectorAll('span, div, b, strong'));
+    
+    const candidates = allElements.filter(el => {
+        const text = el.innerText;
+        if (!text) return false;
+        return text.includes('IDR') && 
+               /[\\d,]+\\.\\d{2}/.test(text) && 
+               text.length < 20;
+    });
+    
+    const texts = candidates.map(el => el.innerText.trim());
+    return texts.length > 0 ? texts : null;
+}"""
+
+CONTEXT_OPTIONS = {
+    'viewport': {'width': 1920, 'height': 1080},
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'locale': 'id-ID',
+    'timezone_id': 'Asia/Jakarta'
+}
+
 
 class WorkerBot:
     """
@@ -42,70 +83,117 @@ class WorkerBot:
         self.engine_ws_url = config.get('engine_ws_url')
         self.redis_url = config.get('redis_url')
         self.proxy_config = config.get('proxy', {})
+        self.concurrency = max(1, int(config.get('concurrency', 4)))
+        self.browser_count = max(1, int(config.get('browsers', 1)))
+        # Warm contexts kept across jobs (one per account + anonymous), at least one per job slot
+        self.max_contexts = max(self.concurrency, int(config.get('max_contexts', 2 * self.concurrency)))
+        # Per job type cap on top of the global concurrency limit (e.g. {'login': 2})
+        self.job_type_semaphores = {
+            job_type: asyncio.Semaphore(limit)
+            for job_type, limit in config.get('job_type_limits', {}).items()
+        }
+        
+        # 'reliable' = BLMOVE into a processing list + ack; 'simple' = plain BLPOP
+        self.queue_mode = config.get('queue_mode', 'reliable')
+        self.visibility_timeout = float(config.get('visibility_timeout', 60))
+        # A job running longer than this on a live worker is treated as hung and requeued
+        self.max_job_runtime = float(config.get('max_job_runtime', 600))
+        self.result_stream = config.get('result_stream', 'jobs:results')
+        self.result_codec = config.get('result_codec', 'json')
+        self.result_ack_timeout = float(config.get('result_ack_timeout', 30))
         
         self.redis_client: Optional[redis.Redis] = None
+        self.job_queue: Optional[ReliableQueue] = None
+        self.result_channel: Optional[ResultChannel] = None
         self.ws_client: Optional[websocket.WebSocket] = None
         self.playwright = None
-        self.browser: Optional[Browser] = None
-        self.context: Optional[BrowserContext] = None
+        self.browser_pool: Optional[BrowserPool] = None
         self.is_running = True
+        self._tasks = set()
+        
+        # Upper bounds (ms) for condition-based login waits
+        self.login_timeouts = {
+            'button': 10000,
+            'form': 10000,
+            'balance': 20000,
+            'restore': 5000,
+            **config.get('login_timeouts', {})
+        }
+        # Balance/wallet XHR seen after submit (timing only)
+        self.balance_url_pattern = re.compile(config.get('balance_url_pattern') or r'balance|wallet|getmember', re.I)
+        
+        # Encrypted storage-state cache; logins try it before the UI flow
+        self.session_cache: Optional[SessionCache] = None
+        self.session_check_url = config.get('session_check_url')
+        try:
+            self.session_cache = SessionCache(
+                SessionManager(config.get('session_encryption_key')),
+                directory=config.get('session_cache_dir', 'session_cache'),
+                ttl=float(config.get('session_cache_ttl', 12 * 3600))
+            )
+        except ValueError as e:
+            logger.warning(f"Session cache disabled: {e}")
         
         logger.info(f"Worker initialized: {self.worker_id}")
     
-    def start(self):
+    async def start(self):
         """Start the worker bot"""
-        logger.info(f"Starting worker {self.worker_id}")
+        logger.info(f"Starting worker {self.worker_id} (concurrency={self.concurrency})")
         
         try:
             # Connect to Redis
-            self._connect_redis()
+            await self._connect_redis()
             
-            # Connect to Engine via WebSocket
-            self._connect_engine()
+            # Result channel to the engine (Redis Stream on the same connection pool)
+            await self._connect_engine()
             
             # Initialize browser
-            self._init_browser()
+            await self._init_browser()
             
             # Start consuming jobs
-            self._consume_jobs()
+            await self._consume_jobs()
             
-        except KeyboardInterrupt:
+        except asyncio.CancelledError:
             logger.info("Received interrupt signal")
-            self.shutdown()
         except Exception as e:
             logger.error(f"Worker startup failed: {e}", exc_info=True)
-            self.shutdown()
+            await self.shutdown()
             sys.exit(1)
+        
+        await self.shutdown()
     
-    def _connect_redis(self):
+    async def _connect_redis(self):
         """Connect to Redis"""
         try:
+            # socket_timeout must outlive the blpop timeout
             self.redis_client = redis.from_url(
                 self.redis_url,
                 decode_responses=True,
-                socket_timeout=5,
+                socket_timeout=10,
                 socket_connect_timeout=5
             )
-            self.redis_client.ping()
+            await self.redis_client.ping()
             logger.info("Redis connected successfully")
+            
+            if self.queue_mode == 'reliable':
+                self.job_queue = ReliableQueue(
+                    self.redis_client, [JOB_QUEUE], self.worker_id,
+                    visibility_timeout=self.visibility_timeout,
+                    max_runtime=self.max_job_runtime
+                )
+                await self.job_queue.start()
+                logger.info(f"Reliable queue mode (visibility timeout {self.visibility_timeout}s)")
         except Exception as e:
             logger.error(f"Redis connection failed: {e}")
             raise
     
-    def _connect_engine(self):
-        """Connect to Engine via WebSocket"""
-        try:
-            logger.info(f"Connecting to engine: {self.engine_ws_url}")
-            
-            # For now, just log - WebSocket will be implemented in Phase 2
-            logger.info("WebSocket connection (stub) - to be implemented")
-            
-            # TODO: Implement WebSocket connection
-            # self.ws_client = websocket.create_connection(self.engine_ws_url)
-            # self._register_worker()
-            
-        except Exception as e:
-            logger.warning(f"WebSocket connection failed (expected in Phase 1): {e}")
+    async def _connect_engine(self):
+        """Open the result channel to the engine (pipelined XADDs, acked per job)"""
+        self.result_channel = ResultChannel(self.redis_client, self.worker_id, stream=self.result_stream,
+                                            codec=get_codec(self.result_codec),
+                                            ack_timeout=self.result_ack_timeout)
+        await self.result_channel.start()
+        logger.info(f"Reporting results to stream {self.result_stream} ({self.result_codec})")
     
     def _register_worker(self):
         """Register worker with engine"""
@@ -119,12 +207,12 @@ class WorkerBot:
         logger.info(f"Worker registration message: {registration_msg}")
         # TODO: Send via WebSocket when implemented
     
-    def _init_browser(self):
-        """Initialize Playwright browser"""
+    async def _init_browser(self):
+        """Initialize Playwright browser pool"""
         try:
             logger.info("Initializing Playwright browser...")
             
-            self.playwright = sync_playwright().start()
+            self.playwright = await async_playwright().start()
             
             # Browser launch options
             browser_args = {
@@ -146,15 +234,14 @@ class WorkerBot:
                     'password': self.proxy_config.get('password')
                 }
             
-            self.browser = self.playwright.chromium.launch(**browser_args)
-            
-            # Create browser context
-            self.context = self.browser.new_context(
-                viewport={'width': 1920, 'height': 1080},
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                locale='id-ID',
-                timezone_id='Asia/Jakarta'
+            self.browser_pool = BrowserPool(
+                self.playwright,
+                size=self.browser_count,
+                max_contexts=self.max_contexts,
+                launch_options=browser_args,
+                context_options=CONTEXT_OPTIONS
             )
+            await self.browser_pool.start()
             
             logger.info("Browser initialized successfully")
             
@@ -162,36 +249,94 @@ class WorkerBot:
             logger.error(f"Browser initialization failed: {e}")
             raise
     
-    def _consume_jobs(self):
-        """Main job consumption loop"""
+    async def _consume_jobs(self):
+        """
+        Main job consumption loop.
+        Only pops a job when a concurrency slot is free, then runs it as a task
+        so slow jobs (logins) don't block the rest of the queue.
+        """
         logger.info("Starting job consumption loop...")
+        slots = asyncio.Semaphore(self.concurrency)
         
         while self.is_running:
+            await slots.acquire()
             try:
                 # Blocking pop from Redis queue (5 second timeout)
-                job_data = self.redis_client.blpop('jobs:queue', timeout=5)
+                if self.job_queue is not None:
+                    job_data = await self.job_queue.pop(timeout=5)
+                else:
+                    job_data = await self.redis_client.blpop(JOB_QUEUE, timeout=5)
                 
                 if job_data is None:
                     # No job available, continue
+                    slots.release()
                     continue
                 
-                # Parse job data
-                _, job_json = job_data
-                job = json.loads(job_json)
-                
-                logger.info(f"Received job: {job.get('job_id')} type={job.get('type')}")
-                
-                # Execute job
-                result = self._execute_job(job)
-                
-                # Report result
-                self._report_result(job.get('job_id'), result)
+                task = asyncio.create_task(self._run_job(job_data, slots))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
                 
+            except asyncio.CancelledError:
+                slots.release()
+                raise
             except Exception as e:
+                slots.release()
                 logger.error(f"Job consumption error: {e}", exc_info=True)
-                time.sleep(1)  # Brief pause before retry
+                await asyncio.sleep(1)  # Brief pause before retry
+        
+        # Let in-flight jobs finish
+        if self._tasks:
+            logger.info(f"Waiting for {len(self._tasks)} running jobs...")
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+    
+    async def _run_job(self, job_data: tuple, slots: asyncio.Semaphore):
+        """Execute and report one job, holding its global and job type slots"""
+        queue, job_json = job_data
+        popped_at = time.time()
+        job = {}
+        delivered = True
+        try:
+            # Parse job data
+            job = json_loads(job_json)
+            
+            logger.info(f"Received job: {job.get('job_id')} type={job.get('type')}")
+            
+            type_semaphore = self.job_type_semaphores.get(job.get('type'))
+            started = time.perf_counter()
+            if type_semaphore is None:
+                result = await self._execute_job(job)
+            else:
+                async with type_semaphore:
+                    result = await self._execute_job(job)
+            logger.info(f"Job {job.get('job_id')} finished in {time.perf_counter() - started:.2f}s")
+            
+            # Report result (waits for the engine channel ack)
+            try:
+                await self._report_result(job.get('job_id'), result, self._enqueued_at(job) or popped_at)
+            except Exception as e:
+                delivered = False
+                logger.error(f"Job {job.get('job_id')} result not delivered: {e}")
+        except Exception as e:
+            logger.error(f"Job {job.get('job_id')} crashed: {e}", exc_info=True)
+        finally:
+            slots.release()
+        
+        # Ack only after the result is acked; a process crash before this point
+        # leaves the job in the processing list for reclaim
+        if self.job_queue is None:
+            return
+        try:
+            if delivered:
+                await self.job_queue.ack(queue, job_json)
+            else:
+                # Result never reached the engine: give the job back for another attempt
+                await self.job_queue.nack(queue, job_json)
+                logger.warning(f"Job {job.get('job_id')} returned to {queue}")
+        except Exception as e:
+            # Still in the processing list; requeued by close() or reclaimed by another worker
+            logger.error(f"Job {job.get('job_id')} {'ack' if delivered else 'nack'} failed: {e}")
     
-    def _execute_job(self, job: Dict[str, Any]) -> Dict[str, Any]:
+    async def _execute_job(self, job: Dict[str, Any]) -> Dict[str, Any]:
         """Execute a job"""
         job_type = job.get('type')
         job_id = job.get('job_id')
@@ -202,13 +347,13 @@ class WorkerBot:
         try:
             # Route to appropriate handler
             if job_type == 'test':
-                return self._handle_test_job(payload)
+                return await self._handle_test_job(payload)
             elif job_type == 'login':
-                return self._handle_login(payload)
+                return await self._handle_login(payload)
             elif job_type == 'place_bet':
-                return self._handle_place_bet(payload)
+                return await self._handle_place_bet(payload)
             elif job_type == 'check_odds':
-                return self._handle_check_odds(payload)
+                return await self._handle_check_odds(payload)
             else:
                 return {
                     'success': False,
@@ -222,21 +367,19 @@ class WorkerBot:
                 'error': str(e)
             }
     
-    def _handle_test_job(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+    async def _handle_test_job(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         """Handle test job"""
         logger.info(f"Test job payload: {payload}")
         
         # Simple test: open a page and take screenshot
         try:
-            page = self.context.new_page()
-            page.goto('https://example.com')
-            page.wait_for_load_state('networkidle')
-            
-            screenshot_path = f'screenshots/test_{int(time.time())}.png'
-            os.makedirs('screenshots', exist_ok=True)
-            page.screenshot(path=screenshot_path)
-            
-            page.close()
+            async with self.browser_pool.page() as page:
+                await page.goto('https://example.com')
+                await page.wait_for_load_state('networkidle')
+                
+                screenshot_path = f'screenshots/test_{int(time.time())}_{uuid.uuid4().hex[:6]}.png'
+                os.makedirs('screenshots', exist_ok=True)
+                await page.screenshot(path=screenshot_path)
             
             return {
                 'success': True,
@@ -251,7 +394,7 @@ class WorkerBot:
                 'error': str(e)
             }
     
-    def _handle_place_bet(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+    async def _handle_place_bet(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         """Handle place bet job (stub)"""
         logger.info(f"Place bet job (stub): {payload}")
         
@@ -265,7 +408,7 @@ class WorkerBot:
             'note': 'Full implementation pending in Phase 3'
         }
     
-    def _handle_check_odds(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+    async def _handle_check_odds(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         """Handle check odds job (stub)"""
         logger.info(f"Check odds job (stub): {payload}")
         
@@ -279,7 +422,7 @@ class WorkerBot:
             'note': 'Full implementation pending in Phase 3'
         }
     
-    def _handle_login(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+    async def _handle_login(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         """Handle login for various sportsbooks"""
         bookmaker = payload.get('bookmaker', '').lower()
         username = payload.get('username')
@@ -292,28 +435,68 @@ class WorkerBot:
                 'message': 'Missing credentials or URL'
             }
         
+        account = f"{bookmaker or url}:{username}"
         try:
-            # Create a new page for login
-            page = self.context.new_page()
-            page.goto(url, wait_until='networkidle')
-            
-            balance = None
-            
-            # Detect bookmaker and use appropriate login method
-            if 'qq188' in bookmaker or 'qq188' in url:
-                balance = self._login_qq188(page, username, password)
-            elif 'bet365' in bookmaker or 'bet365' in url:
-                balance = self._login_bet365(page, username, password)
-            elif 'pinnacle' in bookmaker or 'pinnacle' in url:
-                balance = self._login_pinnacle(page, username, password)
-            elif 'betfair' in bookmaker or 'betfair' in url:
-                balance = self._login_betfair(page, username, password)
-            else:
-                # Fallback to QQ188 logic for unknown bookmakers
-                logger.info(f"Unknown bookmaker '{bookmaker}', trying QQ188 login logic")
-                balance = self._login_qq188(page, username, password)
+            # Idle warm page of this account if the pool has one, else a new
+            # context restored from the session cache (also when the account's
+            # warm page is checked out by another job)
+            storage_state = None
+            warm = self.browser_pool.has_idle(account)
+            if not warm and self.session_cache:
+                storage_state = self.session_cache.load(account)
+            
+            async with self.browser_pool.page(account, storage_state=storage_state) as page:
+                # Fresh contexts start blank: the idle page may have been taken meanwhile
+                warm = warm and page.url != 'about:blank'
+                
+                # DOM is enough: each login step waits for its own element
+                await page.goto(url, wait_until='domcontentloaded')
+                
+                balance = None
+                timings = {}
+                session = 'login'
+                
+                # Detect bookmaker and use appropriate login method
+                if 'qq188' in bookmaker or 'qq188' in url:
+                    login = self._login_qq188
+                elif 'bet365' in bookmaker or 'bet365' in url:
+                    login = self._login_bet365
+                elif 'pinnacle' in bookmaker or 'pinnacle' in url:
+                    login = self._login_pinnacle
+                elif 'betfair' in bookmaker or 'betfair' in url:
+                    login = self._login_betfair
+                else:
+                    # Fallback to QQ188 logic for unknown bookmakers
+                    logger.info(f"Unknown bookmaker '{bookmaker}', trying QQ188 login logic")
+                    login = self._login_qq188
+                
+                if login == self._login_qq188:
+                    # Reuse the existing session when it is still logged in
+                    if warm or storage_state:
+                        balance = await self._restore_qq188(page, timings)
+                        if balance is not None:
+                            session = 'warm' if warm else 'restored'
+                        else:
+                            logger.info(f"Session for {username} expired, doing UI login")
+                            if self.session_cache:
+                                self.session_cache.invalidate(account)
+                            await page.context.clear_cookies()
+                            await page.goto(url, wait_until='domcontentloaded')
+                    
+                    if balance is None:
+                        balance = await self._login_qq188(page, username, password, timings)
+                else:
+                    balance = await login(page, username, password)
+                
+                if balance is not None and session == 'login' and self.session_cache:
+                    try:
+                        self.session_cache.save(account, await page.context.storage_state())
+                    except Exception as e:
+                        logger.warning(f"Session cache save failed: {e}")
             
-            page.close()
+            if balance is None:
+                # Don't keep a logged-out page warm for this account
+                await self.browser_pool.evict(account)
             
             if balance is not None:
                 return {
@@ -321,12 +504,15 @@ class WorkerBot:
                     'bookmaker': bookmaker,
                     'username': username,
                     'balance': balance,
+                    'session': session,
+                    'timings': timings,
                     'timestamp': datetime.now().isoformat()
                 }
             else:
                 return {
                     'status': 'error',
-                    'message': 'Failed to extract balance'
+                    'message': 'Failed to extract balance',
+                    'timings': timings
                 }
         
         except Exception as e:
@@ -336,122 +522,191 @@ class WorkerBot:
                 'message': str(e)
             }
     
-    def _login_qq188(self, page: Page, username: str, password: str) -> Optional[float]:
-        """Login to QQ188 and extract balance"""
+    async def _login_qq188(self, page: Page, username: str, password: str,
+                           timings: Dict[str, int] = None) -> Optional[float]:
+        """
+        Login to QQ188 and extract balance.
+        Every step waits for its condition (bounded by self.login_timeouts) instead of
+        sleeping; timings gets the ms offset of each step since the start.
+        """
+        timings = {} if timings is None else timings
+        started = time.perf_counter()
+        
+        def mark(step: str):
+            timings.setdefault(step, int((time.perf_counter() - started) * 1000))
+        
         try:
             # Page already loaded by caller
-            page.wait_for_timeout(2000)
-            
             # 1. Find and click LOGIN/MASUK button
-            login_clicked = page.evaluate("""() => {
-                const elements = Array.from(document.querySelectorAll('a, button, span, div'));
-                const target = elements.find(el => {
-                    const txt = el.innerText ? el.innerText.trim().toUpperCase() : '';
-                    return txt === 'LOGIN' || txt === 'MASUK';
-                });
-                if (target) { target.click(); return true; }
-                return false;
-            }""")
-            
-            if not login_clicked:
+            try:
+                await page.wait_for_function(QQ188_CLICK_LOGIN_JS, timeout=self.login_timeouts['button'])
+            except PlaywrightTimeoutError:
                 logger.warning("QQ188: Login button not found")
                 return None
+            mark('login_button')
             
-            page.wait_for_timeout(3000)
-            
-            # 2. Input username & password
-            page.wait_for_selector('input[type="text"]', timeout=10000)
-            text_inputs = page.query_selector_all('input[type="text"]')
+            # 2. Input username & password once the form is visible
+            await page.wait_for_selector('input[type="password"]', state='visible', timeout=self.login_timeouts['form'])
+            text_inputs = await page.query_selector_all('input[type="text"]')
             
             if text_inputs:
-                text_inputs[0].fill(username)
+                await text_inputs[0].fill(username)
             
-            page.fill('input[type="password"]', password)
-            page.keyboard.press('Enter')
+            await page.fill('input[type="password"]', password)
+            mark('login_form')
             
-            logger.info("QQ188: Login processing...")
-            page.wait_for_timeout(10000)
+            # 3. Submit, then wait until the balance is rendered
+            login_url = page.url
             
-            # 3. Find balance (IDR + format XXX,XXX.XX)
-            saldo_data = page.evaluate("""() => {
-                const allElements = Array.from(document.querySelectorAll('span, div, b, strong'));
-                
-                const candidates = allElements.filter(el => {
-                    const text = el.innerText;
-                    if (!text) return false;
-                    return text.includes('IDR') && 
-                           /[\d,]+\.\d{2}/.test(text) && 
-                           text.length < 20;
-                });
-                
-                const texts = candidates.map(el => el.innerText.trim());
-                return texts.length > 0 ? texts : ["Saldo Tidak Ketemu"];
-            }""")
-            
-            logger.info(f"QQ188: Balance candidates: {saldo_data}")
+            def on_response(response):
+                if self.balance_url_pattern.search(response.url):
+                    mark('balance_response')
             
-            if saldo_data and saldo_data[0] != "Saldo Tidak Ketemu":
-                # Extract number from "IDR 1,234.56" format
-                match = re.search(r'[\d,]+\.\d{2}', saldo_data[0])
-                if match:
-                    balance_str = match.group().replace(',', '')
-                    return float(balance_str)
+            def on_navigated(frame):
+                if frame == page.main_frame and frame.url != login_url:
+                    mark('url_change')
             
-            return None
+            page.on('response', on_response)
+            page.on('framenavigated', on_navigated)
+            try:
+                await page.keyboard.press('Enter')
+                mark('submit')
+                logger.info("QQ188: Login processing...")
+                
+                handle = await page.wait_for_function(QQ188_BALANCE_JS, timeout=self.login_timeouts['balance'])
+                saldo_data = await handle.json_value()
+            except PlaywrightTimeoutError:
+                saldo_data = None
+            finally:
+                page.remove_listener('response', on_response)
+                page.remove_listener('framenavigated', on_navigated)
+            mark('balance')
+            
+            logger.info(f"QQ188: Balance candidates: {saldo_data} (timings ms: {timings})")
+            
+            return self._parse_balance(saldo_data)
         
         except Exception as e:
             logger.error(f"QQ188 login error: {str(e)}", exc_info=True)
             return None
     
-    def _login_bet365(self, page: Page, username: str, password: str) -> Optional[float]:
+    async def _restore_qq188(self, page: Page, timings: Dict[str, int]) -> Optional[float]:
+        """Balance if the page's cookies are still logged in to QQ188, None otherwise"""
+        started = time.perf_counter()
+        try:
+            # Cheap authenticated request first, if the site has one configured
+            if self.session_check_url:
+                response = await page.context.request.get(self.session_check_url, max_redirects=0)
+                if not response.ok:
+                    return None
+            
+            handle = await page.wait_for_function(QQ188_BALANCE_JS, timeout=self.login_timeouts['restore'])
+            return self._parse_balance(await handle.json_value())
+        except PlaywrightTimeoutError:
+            return None
+        except Exception as e:
+            logger.warning(f"QQ188 session check failed: {e}")
+            return None
+        finally:
+            timings['restore'] = int((time.perf_counter() - started) * 1000)
+    
+    def _parse_balance(self, saldo_data) -> Optional[float]:
+        if saldo_data:
+            # Extract number from "IDR 1,234.56" format
+            match = re.search(r'[\d,]+\.\d{2}', saldo_data[0])
+            if match:
+                balance_str = match.group().replace(',', '')
+                return float(balance_str)
+        return None
+    
+    async def _login_bet365(self, page: Page, username: str, password: str) -> Optional[float]:
         """Login to Bet365 and extract balance (stub)"""
         logger.info("Bet365 login (stub - not implemented)")
         # TODO: Implement Bet365 login logic
         return None
     
-    def _login_pinnacle(self, page: Page, username: str, password: str) -> Optional[float]:
+    async def _login_pinnacle(self, page: Page, username: str, password: str) -> Optional[float]:
         """Login to Pinnacle and extract balance (stub)"""
         logger.info("Pinnacle login (stub - not implemented)")
         # TODO: Implement Pinnacle login logic
         return None
     
-    def _login_betfair(self, page: Page, username: str, password: str) -> Optional[float]:
+    async def _login_betfair(self, page: Page, username: str, password: str) -> Optional[float]:
         """Login to Betfair and extract balance (stub)"""
         logger.info("Betfair login (stub - not implemented)")
         # TODO: Implement Betfair login logic
         return None
     
-    def _report_result(self, job_id: str, result: Dict[str, Any]):
-        """Report job result back to engine"""
-        logger.info(f"Job {job_id} result: {result.get('success')}")
+    @staticmethod
+    def _enqueued_at(job: Dict[str, Any]) -> Optional[float]:
+        """Job enqueue time in epoch seconds ('enqueued_at', seconds or ms), if the producer set it"""
+        value = job.get('enqueued_at')
+        if not isinstance(value, (int, float)) or value <= 0:
+            return None
+        return value / 1000 if value > 1e11 else float(value)
+    
+    async def _report_result(self, job_id: str, result: Dict[str, Any], enqueued_at: float = None):
+        """
+        Report job result back to engine
         
-        # TODO: Send result via WebSocket or HTTP callback
-        # For now, just log
-        logger.info(f"Result for job {job_id}: {json.dumps(result, indent=2)}")
+        Args:
+            job_id: Job id
+            result: Handler result
+            enqueued_at: Job enqueue (or pop) time, epoch seconds
+        
+        Raises:
+            ConnectionError: Not acked within the ack timeout, or channel closed first (caller requeues the job)
+        """
+        entry_id = await self.result_channel.publish(job_id, result, enqueued_at)
+        latency = f", end-to-end {(time.time() - enqueued_at) * 1000:.0f}ms" if enqueued_at else ""
+        logger.info(f"Job {job_id} result acked: success={result.get('success')} entry={entry_id}{latency}")
+    
+    def stop(self):
+        """Stop popping new jobs; running jobs are allowed to finish"""
+        self.is_running = False
     
-    def shutdown(self):
+    async def shutdown(self):
         """Graceful shutdown"""
         logger.info("Shutting down worker...")
         
         self.is_running = False
         
         # Close browser
-        if self.context:
-            self.context.close()
-        if self.browser:
-            self.browser.close()
+        if self.browser_pool:
+            logger.info(f"Browser pool stats: {self.browser_pool.stats}")
+            await self.browser_pool.close()
+            self.browser_pool = None
         if self.playwright:
-            self.playwright.stop()
+            await self.playwright.stop()
+            self.playwright = None
         
-        # Close connections
+        # Close connections (unacked results first, then the queue requeues unacked jobs)
+        if self.result_channel:
+            await self.result_channel.close()
+            self.result_channel = None
+        if self.job_queue:
+            await self.job_queue.close()
+            self.job_queue = None
         if self.redis_client:
-            self.redis_client.close()
+            await self.redis_client.close()
+            self.redis_client = None
         if self.ws_client:
             self.ws_client.close()
+            self.ws_client = None
         
         logger.info("Worker shutdown complete")
 
 
+def parse_job_type_limits(value: str) -> Dict[str, int]:
+    """'login=2,place_bet=4' -> {'login': 2, 'place_bet': 4}"""
+    limits = {}
+    for item in (value or '').split(','):
+        job_type, _, limit = item.partition('=')
+        if job_type.strip() and limit.strip():
+            limits[job_type.strip()] = max(1, int(limit))
+    return limits
+
+
 def load_config() -> Dict[str, Any]:
     """Load configuration from environment"""
     load_dotenv()
@@ -461,6 +716,26 @@ def load_config() -> Dict[str, Any]:
         'engine_url': os.getenv('ENGINE_URL', 'http://localhost:3000'),
         'engine_ws_url': os.getenv('ENGINE_WS_URL', 'ws://localhost:3001/ws'),
         'redis_url': os.getenv('REDIS_URL', 'redis://localhost:6379'),
+        'concurrency': int(os.getenv('WORKER_CONCURRENCY', '4')),
+        'browsers': int(os.getenv('WORKER_BROWSERS', '1')),
+        'max_contexts': int(os.getenv('WORKER_MAX_CONTEXTS', '8')),
+        'login_timeouts': {
+            'button': int(os.getenv('LOGIN_BUTTON_TIMEOUT_MS', '10000')),
+            'form': int(os.getenv('LOGIN_FORM_TIMEOUT_MS', '10000')),
+            'balance': int(os.getenv('LOGIN_BALANCE_TIMEOUT_MS', '20000'))
+        },
+        'balance_url_pattern': os.getenv('QQ188_BALANCE_URL_PATTERN'),
+        'session_encryption_key': os.getenv('SESSION_ENCRYPTION_KEY'),
+        'session_cache_dir': os.getenv('SESSION_CACHE_DIR', 'session_cache'),
+        'session_cache_ttl': float(os.getenv('SESSION_CACHE_TTL', str(12 * 3600))),
+        'session_check_url': os.getenv('SESSION_CHECK_URL'),
+        'queue_mode': os.getenv('QUEUE_MODE', 'reliable'),
+        'visibility_timeout': float(os.getenv('QUEUE_VISIBILITY_TIMEOUT', '60')),
+        'max_job_runtime': float(os.getenv('QUEUE_MAX_RUNTIME', '600')),
+        'result_stream': os.getenv('RESULT_STREAM', 'jobs:results'),
+        'result_codec': os.getenv('RESULT_CODEC', 'json'),
+        'result_ack_timeout': float(os.getenv('RESULT_ACK_TIMEOUT', '30')),
+        'job_type_limits': parse_job_type_limits(os.getenv('WORKER_JOB_LIMITS', 'login=2')),
         'proxy': {
             'server': os.getenv('PROXY_SERVER'),
             'username': os.getenv('PROXY_USERNAME'),
@@ -479,20 +754,19 @@ def main():
     # Load configuration
     config = load_config()
     
-    # Create worker
-    worker = WorkerBot(config)
-    
-    # Setup signal handlers
-    def signal_handler(signum, frame):
-        logger.info(f"Received signal {signum}")
-        worker.shutdown()
-        sys.exit(0)
-    
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
+    async def run():
+        # Create worker (inside the loop: semaphores bind to it)
+        worker = WorkerBot(config)
+        
+        # Setup signal handlers
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, worker.stop)
+        
+        # Start worker
+        await worker.start()
     
-    # Start worker
-    worker.start()
+    asyncio.run(run())
 
 
 if __name__ == '__main__':
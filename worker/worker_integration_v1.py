@@ -1,11 +1,9 @@
 import asyncio
-import json
-import time
 import os
+import time
 from typing import Dict, Optional
-from datetime import datetime, timedelta
+from datetime import datetime
 import hashlib
-import base64
 
 # Import parser
 import sys
@@ -17,107 +15,25 @@ except:
     print("[WARN] Parser belum tersedia, akan di-load di runtime")
     CSportOddsParser = None
 
-
-class SessionManager:
-    """Manage login session + cookies (memory + file backup)"""
-    
-    def __init__(self, session_file: str = '/app/session_backup.json'):
-        self.session_file = session_file
-        self.memory_session = {}
-        self.session_expire = None
-        self.session_ttl = 300  # 5 menit
-    
-    def simple_encrypt(self, data: str, key: str = "arb_session_key") -> str:
-        """Simple encryption untuk backup file"""
-        try:
-            encoded = base64.b64encode(data.encode()).decode()
-            return encoded
-        except:
-            return data
-    
-    def simple_decrypt(self, data: str, key: str = "arb_session_key") -> str:
-        """Simple decryption"""
-        try:
-            decoded = base64.b64decode(data.encode()).decode()
-            return decoded
-        except:
-            return data
-    
-    def save_session(self, cookies: Dict, user_agent: str = ""):
-        """Save session ke memory + backup file"""
-        
-        self.memory_session = {
-            'cookies': cookies,
-            'user_agent': user_agent,
-            'saved_at': time.time(),
-            'expire_at': time.time() + self.session_ttl
-        }
-        
-        # Backup ke file (encrypted)
-        try:
-            backup = {
-                'cookies': cookies,
-                'user_agent': user_agent,
-                'saved_at': datetime.now().isoformat(),
-                'expire_at': (datetime.now() + timedelta(seconds=self.session_ttl)).isoformat()
-            }
-            
-            with open(self.session_file, 'w') as f:
-                json.dump(backup, f, indent=2)
-            
-            print(f"[SESSION] Saved to memory + backup file: {self.session_file}")
-        except Exception as e:
-            print(f"[WARN] Failed to backup session: {str(e)}")
-    
-    def load_session(self) -> Optional[Dict]:
-        """Load session dari memory atau file"""
-        
-        # Check memory first
-        if self.memory_session:
-            if time.time() < self.memory_session.get('expire_at', 0):
-                print("[SESSION] Loaded from memory (fresh)")
-                return self.memory_session
-            else:
-                print("[SESSION] Memory session expired")
-                self.memory_session = {}
-        
-        # Try file backup
-        try:
-            if os.path.exists(self.session_file):
-                with open(self.session_file, 'r') as f:
-                    backup = json.load(f)
-                
-                expire_at = datetime.fromisoformat(backup['expire_at']).timestamp()
-                if time.time() < expire_at:
-                    print("[SESSION] Loaded from backup file")
-                    self.memory_session = {
-                        'cookies': backup['cookies'],
-                        'user_agent': backup['user_agent'],
-                        'saved_at': time.time(),
-                        'expire_at': expire_at
-                    }
-                    return self.memory_session
-                else:
-                    print("[SESSION] Backup file expired")
-                    os.remove(self.session_file)
-        except Exception as e:
-            print(f"[WARN] Failed to load backup: {str(e)}")
-        
-        return None
-    
-    def is_valid(self) -> bool:
-        """Check session validity"""
-        session = self.load_session()
-        return session is not None
+from odds_fetcher import FetchError, OddsFetcher
+from odds_protocol import OddsDeltaEncoder
+from session_store import ProviderSession
+from utils.codec import available_codecs, get_codec
 
 
 class WorkerIntegration:
     """Worker dengan parser + session management"""
     
-    def __init__(self, provider: str = "C-Sport", backend_url: str = "ws://localhost:8000"):
+    def __init__(self, provider: str = "C-Sport", backend_url: str = "ws://localhost:8000",
+                 snapshot_interval: float = 30.0, odds_url: str = None, codec: str = None):
         self.provider = provider
         self.backend_url = backend_url
-        self.session_manager = SessionManager()
+        self.session_manager = ProviderSession(provider)
+        # Feed HTTP real kalau odds_url di-set, selain itu mock api_response
+        self.fetcher = OddsFetcher(provider, odds_url, self.session_manager) if odds_url else None
+        self.encoder = OddsDeltaEncoder(provider, snapshot_interval=snapshot_interval)
+        # Serialisasi message ke backend (default: codec tercepat yang ter-install)
+        self.codec = get_codec(codec or available_codecs()[0])
         self.parser = None
         self.ws_connected = False
         self.last_odds_send = 0
@@ -157,7 +73,8 @@ class WorkerIntegration:
             }
             
             # Save session
-            self.session_manager.save_session(mock_cookies, user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64)")
+            self.session_manager.account = credentials.get('username') or self.session_manager.account
+            await self.session_manager.save_session(mock_cookies, user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64)")
             
             print("[✓] Login successful")
             print(f"[✓] Session saved (TTL: 5 min)")
@@ -169,20 +86,27 @@ class WorkerIntegration:
     
     async def poll_odds(self, api_response: Optional[Dict] = None) -> Optional[Dict]:
         """
-        Poll odds dari API atau mock data
+        Poll odds dari feed HTTP (odds_url), api_response yang diberikan, atau mock data
         """
         
         try:
-            # Check session validity
-            if not self.session_manager.is_valid():
+            # Session dari memory (deadline monotonic), store cuma dibaca saat cold start / expired
+            session = await self.session_manager.load_session()
+            if session is None:
                 print("[✗] Session invalid - need to re-login")
                 return None
             
-            session = self.session_manager.load_session()
-            print(f"[POLL] Using session from {datetime.fromtimestamp(session['saved_at']).strftime('%H:%M:%S')}")
-            
-            # API response (akan di-replace dengan real API call)
-            if api_response is None:
+            body = None
+            if api_response is None and self.fetcher:
+                try:
+                    body = await self.fetcher.fetch()
+                except FetchError as e:
+                    print(f"[✗] Fetch failed: {str(e)}")
+                    if e.status in (401, 403):
+                        await self.session_manager.invalidate()
+                    return None
+                print(f"[POLL] Fetch {self.fetcher.last_status} in {self.fetcher.last_fetch_ms:.1f}ms")
+            elif api_response is None:
                 api_response = {
                     'data': [
                         [23230149, 0, 0, 64991, "Soccer", "00995000", 0, "1", "2", 0, 
@@ -198,8 +122,15 @@ class WorkerIntegration:
                 self._init_parser()
             
             if self.parser:
-                odds = self.parser.parse_response(api_response)
-                print(f"[✓] Parsed {odds['total_matches']} matches")
+                if api_response is not None:
+                    odds = self.parser.parse_delta(api_response)
+                elif body is not None:
+                    odds = self.parser.parse_delta_bytes(body)
+                else:
+                    # 304 Not Modified
+                    odds = self.parser.unchanged_delta()
+                print(f"[✓] Parsed {odds['total_matches']} matches "
+                      f"(+{len(odds['added'])} ~{len(odds['changed'])} -{len(odds['removed'])})")
                 return odds
             
             return None
@@ -218,34 +149,32 @@ class WorkerIntegration:
             print(f"\n[2] SEND TO BACKEND")
             print("="*60)
             
-            # Format untuk WebSocket
-            ws_message = {
-                'type': 'odds_update',
-                'provider': self.provider,
-                'timestamp': int(time.time()),
-                'total_matches': odds['total_matches'],
-                'matches': odds['matches'][:2]  # Send first 2 matches
-            }
+            # Format untuk WebSocket: odds_delta, atau odds_snapshot kalau sudah due
+            ws_message = self.encoder.encode(odds)
+            if ws_message is None:
+                print("[=] No changes - nothing to send\n")
+                return True
+            
+            payload = self.codec.dumps(ws_message)
             
             # Mock WebSocket send (akan di-replace dengan real)
             print(f"[→] Sending to {self.backend_url}")
-            print(f"    Type: {ws_message['type']}")
+            print(f"    Type: {ws_message['type']} (seq {ws_message['seq']})")
             print(f"    Provider: {ws_message['provider']}")
             print(f"    Matches: {ws_message['total_matches']}")
+            print(f"    Size: {len(payload)} bytes ({self.codec.name})")
             
             # Simulate latency
             await asyncio.sleep(0.1)
             
             print(f"[✓] Sent successfully\n")
             
-            # Save to file for debugging
-            with open('/app/last_odds_sent.json', 'w') as f:
-                json.dump(ws_message, f, indent=2)
-            
             return True
         
         except Exception as e:
             print(f"[✗] Send failed: {str(e)}")
+            # Delta hilang -> backend gap di seq: cycle berikutnya kirim snapshot
+            self.encoder.send_failed()
             return False
     
     async def run_cycle(self, poll_interval: int = 250):
@@ -282,7 +211,9 @@ async def main():
     print("[WORKER INTEGRATION TEST]")
     print("="*70 + "\n")
     
-    worker = WorkerIntegration(provider="C-Sport", backend_url="ws://localhost:8000")
+    worker = WorkerIntegration(provider="C-Sport", backend_url="ws://localhost:8000",
+                               odds_url=os.getenv('CSPORT_ODDS_URL'),
+                               codec=os.getenv('ODDS_CODEC'))
     
     # 1. Login & save session
     print("\n[PHASE 1] Login & Session Management")
@@ -296,6 +227,11 @@ async def main():
         print("[✗] Login failed - exiting")
         return
     
+    # Re-login di background sebelum session expired
+    refresher = asyncio.create_task(worker.session_manager.keep_fresh(
+        lambda: worker.login_and_save_session({'username': 'gt1888', 'password': 'Menang123'})
+    ))
+    
     # 2. Run 3 polling cycles
     print("\n[PHASE 2] Polling Cycles")
     print("-"*70)
@@ -305,17 +241,21 @@ async def main():
         if success and i < 2:
             await asyncio.sleep(1)  # Wait between cycles
     
+    refresher.cancel()
+    if worker.fetcher:
+        await worker.fetcher.close()
+    
     # 3. Check session persistence
     print("\n[PHASE 3] Session Persistence Check")
     print("-"*70)
     
-    if worker.session_manager.is_valid():
+    session = await worker.session_manager.load_session()
+    if session is not None:
         print("[✓] Session is valid")
-        session = worker.session_manager.load_session()
         created = datetime.fromtimestamp(session['saved_at']).strftime('%H:%M:%S')
         expire = datetime.fromtimestamp(session['expire_at']).strftime('%H:%M:%S')
         print(f"  Created: {created}")
-        print(f"  Expire: {expire}")
+        print(f"  Expire: {expire} ({worker.session_manager.ttl_remaining():.0f}s left)")
     else:
         print("[✗] Session invalid")
     
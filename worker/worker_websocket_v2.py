@@ -1,9 +1,8 @@
 import asyncio
-import json
-import time
 import os
-from typing import Dict, Optional
-from datetime import datetime, timedelta
+import time
+from typing import Dict, Iterable, Optional
+from datetime import datetime
 import sys
 
 sys.path.append('/app')
@@ -13,76 +12,33 @@ try:
 except:
     CSportOddsParser = None
 
-try:
-    import websockets
-except:
-    websockets = None
-
-
-class SessionManager:
-    """Manage login session"""
-    
-    def __init__(self, session_file: str = '/app/session_backup.json'):
-        self.session_file = session_file
-        self.memory_session = {}
-        self.session_ttl = 300
-    
-    def save_session(self, cookies: Dict):
-        self.memory_session = {
-            'cookies': cookies,
-            'saved_at': time.time(),
-            'expire_at': time.time() + self.session_ttl
-        }
-        
-        try:
-            backup = {
-                'cookies': cookies,
-                'saved_at': datetime.now().isoformat(),
-                'expire_at': (datetime.now() + timedelta(seconds=self.session_ttl)).isoformat()
-            }
-            with open(self.session_file, 'w') as f:
-                json.dump(backup, f, indent=2)
-        except:
-            pass
-    
-    def load_session(self) -> Optional[Dict]:
-        if self.memory_session:
-            if time.time() < self.memory_session.get('expire_at', 0):
-                return self.memory_session
-        
-        try:
-            if os.path.exists(self.session_file):
-                with open(self.session_file, 'r') as f:
-                    backup = json.load(f)
-                expire_at = datetime.fromisoformat(backup['expire_at']).timestamp()
-                if time.time() < expire_at:
-                    self.memory_session = {
-                        'cookies': backup['cookies'],
-                        'saved_at': time.time(),
-                        'expire_at': expire_at
-                    }
-                    return self.memory_session
-        except:
-            pass
-        
-        return None
-    
-    def is_valid(self) -> bool:
-        return self.load_session() is not None
+from odds_fetcher import FetchError, OddsFetcher
+from odds_protocol import OddsDeltaEncoder
+from poll_scheduler import AdaptivePollScheduler
+from session_store import ProviderSession
+from utils.codec import DEFAULT_PREFERENCE
+from ws_transport import OddsTransport
 
 
 class WorkerWebSocket:
-    """Worker dengan WebSocket + Mock fallback"""
+    """Worker dengan WebSocket (auto reconnect + buffer selama backend tidak terhubung)"""
     
-    def __init__(self, provider: str = "C-Sport", backend_url: str = "ws://localhost:8000/ws"):
+    def __init__(self, provider: str = "C-Sport", backend_url: str = "ws://localhost:8000/ws",
+                 snapshot_interval: float = 30.0, odds_url: str = None,
+                 codecs: Iterable[str] = DEFAULT_PREFERENCE):
         self.provider = provider
         self.backend_url = backend_url
-        self.session_manager = SessionManager()
+        self.session_manager = ProviderSession(provider)
+        # Feed HTTP real kalau odds_url di-set, selain itu mock api_response
+        self.fetcher = OddsFetcher(provider, odds_url, self.session_manager) if odds_url else None
+        self.encoder = OddsDeltaEncoder(provider, snapshot_interval=snapshot_interval)
         self.parser = None
-        self.ws = None
-        self.connected = False
+        # Resync = snapshot state encoder terkini (setelah buffer overflow / backend restart)
+        # Codec dinegosiasi saat connect (msgpack/orjson kalau backend support, selain itu json)
+        self.transport = OddsTransport(backend_url, resync=self.encoder.build_snapshot,
+                                       codecs=codecs, hello_fields={'provider': provider})
         self.msg_count = 0
-        self.mode = "mock"  # websocket atau mock
+        self.last_changed = False  # poll terakhir membawa perubahan odds (input scheduler)
         
         self._init_parser()
     
@@ -94,55 +50,41 @@ class WorkerWebSocket:
         except Exception as e:
             print(f"[!] Parser load failed: {str(e)}")
     
-    async def connect_websocket(self) -> bool:
-        """Connect ke backend WebSocket"""
-        if not websockets:
-            print("[!] websockets module not available - using mock mode")
-            return False
-        
-        try:
-            print(f"[🔗] Connecting to {self.backend_url}...")
-            self.ws = await websockets.connect(self.backend_url, ping_interval=None)
-            self.connected = True
-            self.mode = "websocket"
-            print(f"[✓] WebSocket connected")
-            return True
-        except Exception as e:
-            print(f"[!] WebSocket failed: {str(e)}")
-            print(f"[!] Fallback to mock mode (save to file)")
-            self.connected = False
-            self.mode = "mock"
-            return False
+    @property
+    def mode(self) -> str:
+        return "websocket" if self.transport.is_connected else "buffering"
+    
+    async def connect_websocket(self, timeout: float = 2.0) -> bool:
+        """Start transport (reconnect jalan terus di background), tunggu connect pertama sebentar"""
+        print(f"[🔗] Connecting to {self.backend_url}...")
+        await self.transport.start()
+        connected = await self.transport.wait_connected(timeout)
+        if not connected:
+            print(f"[!] Backend not reachable yet - buffering until it is")
+        return connected
     
     async def disconnect_websocket(self):
-        if self.ws:
-            try:
-                await self.ws.close()
-                self.connected = False
-            except:
-                pass
+        await self.transport.close()
     
     async def send_message(self, message: Dict) -> bool:
-        """Send message ke backend atau save to file"""
+        """
+        Send message ke backend; selama putus di-buffer (delta digabung per match).
+        send() False = di-buffer transport (dikirim / resync saat reconnect), bukan hilang.
+        """
         
         try:
-            if self.mode == "websocket" and self.connected and self.ws:
-                # Send via WebSocket
-                await self.ws.send(json.dumps(message))
-            else:
-                # Mock: save to file
-                timestamp = int(time.time() * 1000)
-                filename = f'/app/odds_sent_{self.provider.lower()}_{timestamp}.json'
-                with open(filename, 'w') as f:
-                    json.dump(message, f, indent=2)
-            
-            self.msg_count += 1
-            print(f"[{self.msg_count:02d}] [{self.mode.upper()}] Sent {message['total_matches']} matches")
-            return True
-        
+            sent = await self.transport.send(message)
         except Exception as e:
             print(f"[✗] Send failed: {str(e)}")
+            # Tidak sampai ke transport -> backend gap di seq: message berikutnya snapshot
+            self.encoder.send_failed()
             return False
+        
+        self.msg_count += 1
+        count = len(message.get('matches', message.get('upserts', [])))
+        action = "Sent" if sent else "Buffered"
+        print(f"[{self.msg_count:02d}] [{self.mode.upper()}] {action} {message['type']} #{message['seq']}: {count}/{message['total_matches']} matches")
+        return True
     
     async def login_and_save_session(self, credentials: Dict) -> bool:
         try:
@@ -151,7 +93,8 @@ class WorkerWebSocket:
                 'PHPSESSID': 'session_' + hashlib.md5(str(time.time()).encode()).hexdigest()[:16],
                 'user_token': 'token_' + hashlib.md5(credentials.get('username', '').encode()).hexdigest()[:16],
             }
-            self.session_manager.save_session(mock_cookies)
+            self.session_manager.account = credentials.get('username') or self.session_manager.account
+            await self.session_manager.save_session(mock_cookies)
             return True
         except Exception as e:
             print(f"[✗] Login failed: {str(e)}")
@@ -160,55 +103,76 @@ class WorkerWebSocket:
     async def poll_and_send(self) -> bool:
         """Poll odds dan send"""
         
-        if not self.session_manager.is_valid():
+        self.last_changed = False
+        if not await self.session_manager.is_valid():
             print("[✗] Session invalid - need re-login")
             return False
         
         try:
-            # Mock API response (real: akan dari API C-Sport)
-            api_response = {
-                'data': [
-                    [23230149, 0, 0, 64991, "Soccer", "00995000", 0, "1", "2", 0, 
-                     0.25, 0, 6.25, 0, -999, "4.5/5", -999, -999, -999, -999, -999, -999, -999, 1, 0, 1, 0, 0, 0, 0,
-                     "1", "00000000", "639008818800000000", 1, "a1409798", "", ["00995000"], 
-                     "ESOCCER BATTLE - 8 MINS PLAY", "Chelsea (hotShot)", "Tottenham Hotspur (GianniKid)",
-                     0.72, 0.98, 0.95, 0.65, -999, -999, -999, -999, -999, -999, 0, "S", "Live", "1H 3"],
-                    [23230014, 0, 0, 155529, "Soccer", "00998000", 0, "0", "0", 0, 
-                     0.25, 0, 3.75, 0, -999, "4.5/5", -999, -999, -999, -999, -999, -999, -999, 1, 0, 1, 0, 0, 0, 0,
-                     "1", "00000000", "639008820000000000", 1, "e232c9dc", "", ["00998000"], 
-                     "ESOCCER GT LEAGUES - 12 MINS PLAY", "Galatasaray (Professor)", "Sporting Lisbon (Jetli)",
-                     0.82, 0.88, 0.95, 0.65, -999, -999, -999, -999, 0.95, 0.95, 0, "S", "Live", "1H 1"]
-                ]
-            }
+            if self.fetcher:
+                try:
+                    body = await self.fetcher.fetch()
+                except FetchError as e:
+                    print(f"[✗] Fetch failed: {str(e)}")
+                    if e.status in (401, 403):
+                        await self.session_manager.invalidate()
+                    return False
+                print(f"[←] Fetch {self.fetcher.last_status} in {self.fetcher.last_fetch_ms:.1f}ms")
+            else:
+                # Mock API response (tanpa odds_url)
+                api_response = {
+                    'data': [
+                        [23230149, 0, 0, 64991, "Soccer", "00995000", 0, "1", "2", 0, 
+                         0.25, 0, 6.25, 0, -999, "4.5/5", -999, -999, -999, -999, -999, -999, -999, 1, 0, 1, 0, 0, 0, 0,
+                         "1", "00000000", "639008818800000000", 1, "a1409798", "", ["00995000"], 
+                         "ESOCCER BATTLE - 8 MINS PLAY", "Chelsea (hotShot)", "Tottenham Hotspur (GianniKid)",
+                         0.72, 0.98, 0.95, 0.65, -999, -999, -999, -999, -999, -999, 0, "S", "Live", "1H 3"],
+                        [23230014, 0, 0, 155529, "Soccer", "00998000", 0, "0", "0", 0, 
+                         0.25, 0, 3.75, 0, -999, "4.5/5", -999, -999, -999, -999, -999, -999, -999, 1, 0, 1, 0, 0, 0, 0,
+                         "1", "00000000", "639008820000000000", 1, "e232c9dc", "", ["00998000"], 
+                         "ESOCCER GT LEAGUES - 12 MINS PLAY", "Galatasaray (Professor)", "Sporting Lisbon (Jetli)",
+                         0.82, 0.88, 0.95, 0.65, -999, -999, -999, -999, 0.95, 0.95, 0, "S", "Live", "1H 1"]
+                    ]
+                }
             
-            # Parse
+            # Parse (incremental) -> odds_delta / odds_snapshot
             if self.parser:
-                odds = self.parser.parse_response(api_response)
+                if self.fetcher:
+                    # 304 Not Modified -> delta kosong (snapshot periodik tetap jalan)
+                    delta = self.parser.parse_delta_bytes(body) if body is not None else self.parser.unchanged_delta()
+                else:
+                    delta = self.parser.parse_delta(api_response)
+                self.last_changed = bool(delta['added'] or delta['changed'] or delta['removed'])
+                message = self.encoder.encode(delta)
                 
-                # Build message
-                message = {
-                    'type': 'odds_update',
-                    'provider': self.provider,
-                    'ping': 18,
-                    'healthy': True,
-                    'timestamp': int(time.time()),
-                    'total_matches': odds['total_matches'],
-                    'matches': odds['matches']
-                }
+                if message is None:
+                    print(f"[=] No changes ({delta['total_matches']} matches)")
+                    return True
                 
+                message['ping'] = round(self.fetcher.last_fetch_ms) if self.fetcher else 18
+                message['healthy'] = True
                 return await self.send_message(message)
         
         except Exception as e:
             print(f"[✗] Poll/send failed: {str(e)}")
             return False
     
-    async def run(self, duration: int = 10, poll_interval: float = 2.5):
-        """Run worker"""
+    async def run(self, duration: int = 10, poll_interval: float = 2.5,
+                  min_interval: float = 0.5, max_interval: float = 15.0):
+        """
+        Run worker
+        poll_interval = interval awal; scheduler menyesuaikan antara min_interval dan max_interval
+        """
         
         print("\n[PHASE 1] Login")
         print("-"*60)
-        await self.login_and_save_session({'username': 'gt1888'})
+        credentials = {'username': 'gt1888'}
+        await self.login_and_save_session(credentials)
         print("[✓] Session saved (TTL: 5 min)")
+        # Re-login di background sebelum session expired
+        refresher = asyncio.create_task(
+            self.session_manager.keep_fresh(lambda: self.login_and_save_session(credentials))
+        )
         
         print("\n[PHASE 2] Connect Backend")
         print("-"*60)
@@ -217,33 +181,44 @@ class WorkerWebSocket:
         print(f"\n[PHASE 3] Polling (Mode: {self.mode.upper()})")
         print("-"*60)
         
+        scheduler = AdaptivePollScheduler(poll_interval, min_interval, max_interval)
         start_time = time.time()
         cycles = 0
         
+        scheduler.start()
         while time.time() - start_time < duration:
             cycles += 1
             print(f"\n[Cycle {cycles}] {datetime.now().strftime('%H:%M:%S')}")
-            await self.poll_and_send()
-            await asyncio.sleep(poll_interval)
-        
+            poll_start = time.perf_counter()
+            ok = await self.poll_and_send()
+            latency = self.fetcher.last_fetch_ms / 1000 if self.fetcher else time.perf_counter() - poll_start
+            scheduler.record(self.last_changed, latency, error=not ok)
+            print(f"[⏱] Interval {scheduler.interval:.2f}s (change rate {scheduler.change_rate:.2f})")
+            await scheduler.wait()
+        
+        refresher.cancel()
+        if self.fetcher:
+            await self.fetcher.close()
         await self.disconnect_websocket()
         
         print(f"\n[SUMMARY]")
         print("-"*60)
         print(f"Mode: {self.mode.upper()}")
-        print(f"Cycles: {cycles}")
-        print(f"Messages sent: {self.msg_count}")
-        print(f"Session valid: {self.session_manager.is_valid()}")
+        print(f"Cycles: {cycles} (missed ticks: {scheduler.stats['missed']}, errors: {scheduler.stats['errors']})")
+        print(f"Messages sent: {self.msg_count} (transport: {self.transport.stats})")
+        print(f"Session valid: {await self.session_manager.is_valid()}")
 
 
 async def main():
     print("\n" + "="*70)
-    print("[WORKER WEBSOCKET V2 - WITH MOCK FALLBACK]")
+    print("[WORKER WEBSOCKET V2 - AUTO RECONNECT]")
     print("="*70)
     
     worker = WorkerWebSocket(
         provider="C-Sport",
-        backend_url="ws://localhost:8000/ws"
+        backend_url="ws://localhost:8000/ws",
+        odds_url=os.getenv('CSPORT_ODDS_URL'),
+        codecs=os.getenv('ODDS_CODECS', ','.join(DEFAULT_PREFERENCE)).split(',')
     )
     
     await worker.run(duration=15, poll_interval=2.5)
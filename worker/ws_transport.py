@@ -0,0 +1,313 @@
+"""
+WebSocket transport worker -> backend untuk odds_snapshot / odds_delta
+Reconnect otomatis (exponential backoff + jitter, max 0.5 s supaya backend yang restart
+tersambung lagi < 1 s; reset setelah connect), heartbeat
+ping/pong websockets untuk deteksi link mati, dan buffer di memory selama putus:
+odds_delta digabung per match jadi satu delta (base_seq..seq), message lain masuk
+ring buffer. Tidak ada fallback tulis file.
+
+Setelah (re)connect:
+- hello {'type': 'hello', 'codecs': [...]} (json), backend balas {'type': 'hello_ack', 'codec': ...};
+  semua frame berikutnya (dua arah) pakai codec itu. Tanpa balasan dalam hello_timeout -> json.
+- buffer overflow / ada snapshot yang tertahan -> kirim resync() (snapshot state terkini)
+- selain itu kirim delta gabungan; backend yang kehilangan state (restart) membalas
+  {'type': 'resync'} dan transport langsung mengirim snapshot.
+"""
+
+import asyncio
+import copy
+import json
+import random
+import sys
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, Optional
+
+from odds_protocol import merge_match
+from utils.codec import DEFAULT_PREFERENCE, JsonCodec, get_codec, hello_message
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+
+class OddsTransport:
+    def __init__(self, url: str, resync: Callable[[], Dict] = None, buffer_size: int = 1000,
+                 max_pending_matches: int = 20000, heartbeat_interval: float = 5.0,
+                 heartbeat_timeout: float = 5.0, backoff_base: float = 0.1, backoff_max: float = 0.5,
+                 codecs: Iterable[str] = DEFAULT_PREFERENCE, hello_timeout: float = 0.25,
+                 hello_fields: Dict = None, warn_interval: float = 30.0):
+        """
+        resync: return odds_snapshot state terkini (mis. OddsDeltaEncoder.build_snapshot)
+        buffer_size: kapasitas ring buffer message non-odds selama putus
+        max_pending_matches: batas match di delta gabungan, lewat dari ini buffer dibuang -> resync
+        heartbeat_interval / heartbeat_timeout: ping websockets, link dianggap mati kalau pong telat
+        backoff_base / backoff_max: delay reconnect (detik, dikali jitter 0.5-1.0). backoff_max
+            = worst case tambahan waktu recovery setelah backend hidup lagi, jadi tetap kecil
+        warn_interval: log "unavailable" paling sering sekali per interval ini selama putus
+        codecs: codec yang ditawarkan saat connect (urut preferensi, yang tidak ter-install di-skip)
+        hello_timeout: tunggu hello_ack (detik), backend lama tanpa negosiasi -> json
+        hello_fields: field tambahan di hello (mis. provider)
+        """
+        self.url = url
+        self.resync = resync
+        self.max_pending_matches = max_pending_matches
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.codecs = list(codecs)
+        self.hello_timeout = hello_timeout
+        self.hello_fields = hello_fields or {}
+        self.warn_interval = warn_interval
+        self.codec = JsonCodec()
+
+        self.ws = None
+        self.connected = asyncio.Event()
+        self._pending_delta: Optional[Dict] = None
+        self._pending_other = deque(maxlen=buffer_size)
+        self._need_resync = False
+        self._send_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {'sent': 0, 'buffered': 0, 'coalesced': 0, 'reconnects': 0, 'resyncs': 0}
+
+    @property
+    def is_connected(self) -> bool:
+        return self.connected.is_set()
+
+    async def start(self):
+        if websockets is None:
+            print("[!] websockets module not available - buffering only")
+            return
+        self._task = asyncio.create_task(self._connection_loop())
+
+    async def wait_connected(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self.connected.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def send(self, message: Dict) -> bool:
+        """Kirim sekarang kalau connected (True), selain itu buffer (False)"""
+        if self.is_connected:
+            async with self._send_lock:
+                if self.is_connected:
+                    try:
+                        await self.ws.send(self.codec.dumps(message))
+                        self.stats['sent'] += 1
+                        return True
+                    except Exception as e:
+                        print(f"[!] WebSocket send failed: {str(e)}")
+                        self.connected.clear()
+        self._buffer(message)
+        return False
+
+    def _buffer(self, message: Dict):
+        self.stats['buffered'] += 1
+        msg_type = message.get('type')
+        if msg_type == 'odds_snapshot':
+            # Snapshot tertahan sudah basi saat reconnect: kirim snapshot baru dari resync()
+            self._pending_delta = None
+            self._need_resync = True
+        elif msg_type == 'odds_delta':
+            if not self._need_resync:
+                self._coalesce(message)
+        else:
+            self._pending_other.append(message)
+
+    def _coalesce(self, message: Dict):
+        """Gabung delta ke delta tertunda: satu entry per match (upsert di-merge, removed menang)"""
+        pending = self._pending_delta
+        if pending is None:
+            pending = self._pending_delta = {
+                'type': 'odds_delta',
+                'provider': message['provider'],
+                'base_seq': message['seq'],
+                'upserts': {},
+                'removed': set()
+            }
+        else:
+            self.stats['coalesced'] += 1
+        pending['seq'] = message['seq']
+        pending['timestamp'] = message['timestamp']
+        pending['total_matches'] = message['total_matches']
+
+        upserts = pending['upserts']
+        for changes in message.get('upserts', []):
+            match_id = changes['match_id']
+            if match_id in upserts and match_id not in pending['removed']:
+                merge_match(upserts[match_id], changes)
+            else:
+                # Match baru / muncul lagi setelah removed: encoder mengirim match lengkap
+                pending['removed'].discard(match_id)
+                upserts[match_id] = copy.deepcopy(changes)
+        for match_id in message.get('removed', []):
+            upserts.pop(match_id, None)
+            pending['removed'].add(match_id)
+
+        if len(upserts) + len(pending['removed']) > self.max_pending_matches:
+            print(f"[!] Send buffer over {self.max_pending_matches} matches - resync on reconnect")
+            self._pending_delta = None
+            self._need_resync = True
+
+    async def _flush(self, ws):
+        """
+        Kirim isi buffer (setelah connect, sebelum send() langsung dibuka lagi).
+        Message yang masuk selama flush ikut di-flush di putaran berikutnya.
+        """
+        while self._need_resync or self._pending_delta is not None or self._pending_other:
+            pending, need_resync = self._pending_delta, self._need_resync
+            self._pending_delta, self._need_resync = None, False
+            try:
+                if need_resync and self.resync:
+                    await self._send_resync(ws)
+                elif pending is not None:
+                    message = dict(pending, upserts=list(pending['upserts'].values()),
+                                   removed=list(pending['removed']))
+                    await ws.send(self.codec.dumps(message))
+                    self.stats['sent'] += 1
+
+                while self._pending_other:
+                    await ws.send(self.codec.dumps(self._pending_other[0]))
+                    self._pending_other.popleft()
+                    self.stats['sent'] += 1
+            except Exception:
+                # Delta yang sudah diambil hilang: reconnect berikutnya kirim snapshot
+                self._need_resync = True
+                raise
+
+    async def _send_resync(self, ws):
+        self.stats['resyncs'] += 1
+        await ws.send(self.codec.dumps(self.resync()))
+        self.stats['sent'] += 1
+
+    async def _connection_loop(self):
+        delay = self.backoff_base
+        last_warning = None
+        while True:
+            try:
+                async with websockets.connect(self.url, ping_interval=self.heartbeat_interval,
+                                              ping_timeout=self.heartbeat_timeout) as ws:
+                    async with self._send_lock:
+                        self.ws = ws
+                        self.codec = await self._negotiate(ws)
+                        await self._flush(ws)
+                        self.connected.set()
+                    print(f"[✓] WebSocket connected to {self.url} (codec {self.codec.name})")
+                    delay = self.backoff_base
+                    last_warning = None
+                    await self._receive_loop(ws)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Retry tiap <= backoff_max detik: log sekali per warn_interval saja
+                now = time.monotonic()
+                if last_warning is None or now - last_warning >= self.warn_interval:
+                    last_warning = now
+                    print(f"[!] WebSocket unavailable ({str(e)}), retrying")
+
+            self.connected.clear()
+            self.ws = None
+            self.stats['reconnects'] += 1
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+            delay = min(delay * 2, self.backoff_max)
+
+    async def _negotiate(self, ws):
+        """Kirim hello, pakai codec dari hello_ack (json kalau backend tidak menjawab)"""
+        await ws.send(json.dumps(hello_message(self.codecs, **self.hello_fields)))
+        try:
+            reply = json.loads(await asyncio.wait_for(ws.recv(), self.hello_timeout))
+        except (asyncio.TimeoutError, TypeError, ValueError):
+            return JsonCodec()
+        if reply.get('type') != 'hello_ack':
+            return JsonCodec()
+        try:
+            return get_codec(reply.get('codec', 'json'))
+        except ValueError:
+            return JsonCodec()
+
+    async def _receive_loop(self, ws):
+        """Pesan dari backend: 'resync' = backend kehilangan state, kirim snapshot sekarang"""
+        async for raw in ws:
+            try:
+                message = self.codec.loads(raw)
+            except Exception:
+                continue
+            if message.get('type') == 'resync' and self.resync:
+                async with self._send_lock:
+                    await self._send_resync(ws)
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.connected.clear()
+        self.ws = None
+
+
+async def self_test(restarts: int = 5, downtime: float = 2.0):
+    """
+    Backend restart: server websockets in-process (jawab hello) dimatikan selama downtime detik
+    lalu dinyalakan lagi di port yang sama; waktu dari server up sampai transport connected
+    harus < 1 s. Delta yang dikirim selama putus harus sampai sebagai satu delta gabungan.
+    """
+    received = []
+
+    async def handler(ws, path: str = None):
+        async for raw in ws:
+            message = json.loads(raw)
+            if message.get('type') == 'hello':
+                await ws.send(json.dumps({'type': 'hello_ack', 'codec': 'json'}))
+            else:
+                received.append(message)
+
+    server = await websockets.serve(handler, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    transport = OddsTransport(f"ws://127.0.0.1:{port}", codecs=['json'])
+    await transport.start()
+    assert await transport.wait_connected(1.0), "first connect"
+
+    recoveries = []
+    seq = 0
+    for _ in range(restarts):
+        server.close()
+        await server.wait_closed()
+        await asyncio.sleep(downtime)  # backoff sudah naik ke backoff_max
+        for match_id in ('m1', 'm2', 'm1'):
+            seq += 1
+            await transport.send({'type': 'odds_delta', 'provider': 'test', 'seq': seq, 'timestamp': seq,
+                                  'total_matches': 2, 'upserts': [{'match_id': match_id, 'odds': {}}],
+                                  'removed': []})
+
+        server = await websockets.serve(handler, '127.0.0.1', port)
+        started = time.monotonic()
+        assert await transport.wait_connected(2.0), "reconnect"
+        recoveries.append(time.monotonic() - started)
+
+    await transport.close()
+    server.close()
+    await server.wait_closed()
+
+    worst = max(recoveries)
+    assert worst < 1.0, recoveries
+    assert len(received) == restarts and all(len(m['upserts']) == 2 for m in received), received
+    print(f"[✓] {restarts} backend restarts, reconnect after restart: "
+          f"max {worst * 1000:.0f} ms, avg {sum(recoveries) / len(recoveries) * 1000:.0f} ms; "
+          f"{transport.stats['coalesced']} buffered deltas coalesced")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] != 'self-test':
+        print("Usage:")
+        print("  python ws_transport.py self-test [restarts]")
+        sys.exit(1)
+    if websockets is None:
+        print("[!] websockets module not available (pip install websockets)")
+        sys.exit(1)
+    asyncio.run(self_test(int(sys.argv[2]) if len(sys.argv) > 2 else 5))